@@ -65,6 +65,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'jobs.context_processors.unread_messages',
             ],
         },
     },
@@ -84,6 +85,26 @@ DATABASES = {
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# "search" holds rendered search result pages; LocMemCache culls least recently used
+# entries once MAX_ENTRIES is reached. Point both aliases at a shared backend (Redis,
+# Memcached) when running several worker processes.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'jobfinder-default',
+    },
+    'search': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'jobfinder-search',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -134,3 +155,105 @@ LOGIN_URL = 'login'
 
 # Redirect after logout
 LOGOUT_REDIRECT_URL = '/login/'
+
+# Job search
+# Upper bound on how many ranked ids a keyword (q=) search pulls from the FTS index.
+JOB_SEARCH_MAX_RANKED = 1000
+# Keyset-paginated page size for the search results (?page_size= may ask for up to the max).
+JOB_SEARCH_PAGE_SIZE = 20
+JOB_SEARCH_MAX_PAGE_SIZE = 100
+# Result counts stop at this many rows and are shown as "1000+".
+JOB_SEARCH_COUNT_CAP = 1000
+# Radius (miles) used by ?near=lat,lng when no &radius= is given.
+JOB_SEARCH_DEFAULT_RADIUS_MILES = 25
+
+# Offline place list used to geocode posting locations on save.
+JOB_GEOCODER_GAZETTEER = BASE_DIR / 'jobs' / 'data' / 'gazetteer.csv'
+# Search result cache: which cache alias holds pages, and for how long (seconds).
+# Version counters and hit/miss stats live in JOB_COUNTERS_CACHE_ALIAS; in production
+# point it at a shared backend (Redis, Memcached, database) so every worker sees the
+# same versions. The default LocMemCache keeps separate counters per process; the
+# in-memory indexes (jobs/changelog.py) then poll the change log table instead.
+JOB_SEARCH_CACHE_ALIAS = 'search'
+JOB_SEARCH_CACHE_TIMEOUT = 300
+JOB_COUNTERS_CACHE_ALIAS = 'default'
+# Facets shown next to search results: salary bands as (low, high) with None for an
+# open end, and how many of the most common locations to list.
+JOB_SEARCH_SALARY_BANDS = [
+    (None, 50000),
+    (50000, 100000),
+    (100000, 150000),
+    (150000, None),
+]
+JOB_SEARCH_FACET_LOCATIONS = 10
+# Typo tolerance for search and recommendations (jobs/fuzzy.py). Terms used by at least
+# JOB_FUZZY_TRUSTED_COUNT postings/profiles are never rewritten; candidates must share
+# this fraction of trigrams (Jaccard) before edit distance is checked.
+JOB_FUZZY_MATCHING = True
+JOB_FUZZY_TRUSTED_COUNT = 2
+JOB_FUZZY_MIN_SIMILARITY = 0.2
+# How many postings are materialized per seeker in JobRecommendation (jobs/recommendations.py).
+JOB_RECOMMENDATIONS_PER_SEEKER = 25
+# Page sizes of the seeker recommendations page and the recruiter candidates page.
+JOB_RECOMMENDATIONS_PAGE_SIZE = 25
+JOB_CANDIDATES_PAGE_SIZE = 25
+# Scoring used by each recommendation view: 'overlap' counts shared skills, 'idf' weights
+# each shared skill by its rarity across postings and profiles, 'semantic' ranks by text
+# similarity of hashed embeddings (jobs/embeddings.py, needs NumPy). Changing the
+# 'recommended_jobs' mode between 'overlap' and 'idf' needs a
+# `manage.py compute_recommendations` run. IDF weights are frozen per skill between
+# full runs of that command, so schedule one periodically (e.g. nightly).
+JOB_RECOMMENDATION_SCORING = {
+    'recommended_jobs': 'idf',
+    'posting_recommendations': 'idf',
+}
+# Skill synonym dictionary (jobs/synonyms.py), plus SkillSynonym overrides from the admin.
+# Other processes pick up an override change within JOB_SKILL_SYNONYMS_RECHECK seconds.
+JOB_SKILL_SYNONYMS = BASE_DIR / 'jobs' / 'data' / 'skill_synonyms.csv'
+JOB_SKILL_SYNONYMS_RECHECK = 1.0
+# Hashed text embeddings for 'semantic' scoring. Each index holds dim * 4 bytes per
+# document in memory; changing the dimension needs a `manage.py embed_documents` run.
+# Queries scan the JOB_EMBEDDING_PROBES nearest of about sqrt(n) lists (see
+# `manage.py benchmark_embeddings` for the recall/latency trade-off).
+JOB_EMBEDDING_DIM = 256
+JOB_EMBEDDING_PROBES = 8
+# "Similar jobs" lists (jobs/similar.py): neighbours kept per posting, candidates scored
+# per refresh, and the distance at which location similarity reaches 0.
+JOB_SIMILAR_POSTINGS = 10
+JOB_SIMILAR_CANDIDATES = 200
+JOB_SIMILAR_RADIUS_MILES = 100
+# Trending page (jobs/trending.py): applications count half as much after each half-life.
+# Run `manage.py compact_trending` periodically; it also drops scores below the minimum.
+JOB_TRENDING_HALF_LIFE_HOURS = 24
+JOB_TRENDING_SIZE = 20
+JOB_TRENDING_MIN_SCORE = 0.01
+# Alerts feed for saved searches (jobs/alerts.py).
+JOB_ALERTS_PAGE_SIZE = 25
+# Conversation list page size (jobs/messaging.py).
+JOB_THREADS_PAGE_SIZE = 25
+# Inbox page size (jobs/views.py inbox_view).
+JOB_INBOX_PAGE_SIZE = 25
+# Live events over SSE (jobs/events.py). They need an ASGI server, e.g.
+#     uvicorn jobfinder2340.asgi:application
+# `manage.py runserver` and WSGI servers would hold a worker per open page, so pages
+# only open the event stream when this is True; otherwise the navbar badge updates on
+# page loads and /messages/events/ answers 404.
+JOB_EVENTS_ENABLED = False
+# The in-memory broker only reaches connections in the same process; use
+# 'jobs.events.DatabaseBroker' when running several workers.
+JOB_EVENTS_BROKER = 'jobs.events.InMemoryBroker'
+JOB_EVENTS_POLL_INTERVAL = 0.5
+JOB_EVENTS_RETENTION = 300
+JOB_EVENTS_KEEPALIVE = 15
+JOB_EVENTS_QUEUE_SIZE = 100
+# Messages written per bulk_create batch when messaging all of a posting's applicants.
+JOB_BULK_MESSAGE_CHUNK = 1000
+# Message search results per page (jobs/messaging.py search_messages).
+JOB_MESSAGE_SEARCH_PAGE_SIZE = 20
+# Message search ranks only this many of the newest matches, so its cost stays flat
+# as the message table grows.
+JOB_MESSAGE_SEARCH_CANDIDATES = 1000
+# Change log replayed by each process's in-memory indexes (jobs/changelog.py): rows are
+# kept this many seconds, and an index rebuilds instead of replaying more rows than the limit.
+JOB_CHANGE_LOG_RETENTION = 86400
+JOB_CHANGE_LOG_CATCH_UP_LIMIT = 5000
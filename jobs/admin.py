@@ -1,11 +1,32 @@
 from django.contrib import admin
-from .models import JobSeekerProfile, JobPosting
-from .models import Message
+from .models import JobSeekerProfile, JobPosting, Skill, SkillSynonym, GeocodeCache
+from .models import Message, SavedSearch
+
+@admin.register(Skill)
+class SkillAdmin(admin.ModelAdmin):
+    list_display = ['name']
+    search_fields = ['name']
+
+@admin.register(SkillSynonym)
+class SkillSynonymAdmin(admin.ModelAdmin):
+    list_display = ['alias', 'canonical', 'updated_at']
+    search_fields = ['alias', 'canonical']
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        self.message_user(request, 'Run "manage.py backfill_skills" to re-link existing postings and profiles.')
+
+@admin.register(GeocodeCache)
+class GeocodeCacheAdmin(admin.ModelAdmin):
+    list_display = ['query', 'latitude', 'longitude', 'created_at']
+    search_fields = ['query']
 
 @admin.register(JobSeekerProfile)
 class JobSeekerProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'headline', 'profile_visible', 'created_at']
     list_filter = ['profile_visible', 'show_email', 'created_at']
+    # skill_tags is derived from the skills text on save
+    exclude = ['skill_tags']
 
 @admin.register(JobPosting)
 class JobPostingAdmin(admin.ModelAdmin):
@@ -35,6 +56,12 @@ class JobPostingAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
 
 
+@admin.register(SavedSearch)
+class SavedSearchAdmin(admin.ModelAdmin):
+    list_display = ['name', 'user', 'created_at']
+    search_fields = ['name', 'user__username']
+
+
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
     list_display = ['subject', 'sender', 'recipient', 'is_read', 'created_at']
@@ -6,6 +6,8 @@ from django.utils import timezone
 from django.db.models import Count, Q
 from django.core.paginator import Paginator
 import csv
+from .alerts import percolate
+from .cache import reset_search_cache_stats, search_cache_stats
 from .models import JobPosting, JobSeekerProfile
 from accounts.models import CustomUser
 
@@ -116,6 +118,8 @@ def moderate_job_view(request, job_id):
         job.moderated_by = request.user
         job.moderated_at = timezone.now()
         job.save()
+        if action == 'approve':
+            percolate(job)
         
         return redirect('moderate_job', job_id=job.id)
     
@@ -303,8 +307,23 @@ def bulk_moderation_view(request):
                 job.moderated_by = request.user
                 job.moderated_at = timezone.now()
                 job.save()
+                if action == 'approve':
+                    percolate(job)
         
         messages.success(request, f'{count} job(s) have been {action}d.')
         return redirect('moderation_queue')
     
     return redirect('moderation_queue')
+
+
+@login_required
+@admin_required
+def search_cache_stats_view(request):
+    """Search cache hit/miss counters as seen by this server process (POST resets them).
+
+    With a per-process counters cache (LocMemCache) this is the only place the counters
+    can be read, and they cover this worker alone; `shared` says which case applies.
+    """
+    if request.method == 'POST':
+        reset_search_cache_stats()
+    return JsonResponse(search_cache_stats())
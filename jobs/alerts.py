@@ -0,0 +1,225 @@
+"""Saved searches and alerts: matching newly visible postings against stored searches.
+
+A saved search is the job search form's parameters (SEARCH_FIELDS). Re-running every
+saved search whenever a posting goes live would cost one query per search, so each
+search is instead indexed (SavedSearchTerm) under terms that every posting it can match
+is guaranteed to carry:
+
+* 'skill:<name>': its rarest required skill;
+* 'kw:<prefix>': the first three letters of a keyword (keywords match as word prefixes);
+* 'title:<trigram>' / 'loc:<trigram>': three letters of the title or location filter,
+  which match as substrings;
+* 'cell:<lat>:<lng>': the 1-degree grid cells covering a "near" radius, one term each;
+* 'flag:remote' / 'flag:visa';
+* '*' when none of the above applies (e.g. a salary-only search).
+
+Only the most selective of these is stored. Searches go through the same typo correction
+as the search page (jobs/fuzzy.py), so an anchor also covers the corrected spellings: a
+misspelled skill anchors on the skill it is corrected to, and a keyword or title anchor
+is stored once per spelling the search would accept. `percolate(posting)` lists the posting's own
+terms, reads the searches indexed under any of them with one indexed query, and runs
+only those candidates against the posting, using the same filters as the search page
+restricted to that one row. Matches go to the owners' alert feeds (SearchAlert), at most
+once per search and posting. The views call it when a posting becomes visible: on
+creation and when moderation approves it.
+"""
+import math
+
+from django.conf import settings
+from django.db import transaction
+
+from .autocomplete import get_autocomplete
+from .fuzzy import correct_skills, correct_title, keyword_expansions
+from .geocoding import bounding_box, parse_point, parse_radius
+from .models import SavedSearch, SavedSearchTerm, SearchAlert, Skill
+from .recommendations import is_visible
+from .search import FTS_COLUMNS, filter_postings, fts_available, keyword_filter, keyword_tokens, matches_keywords
+from .skills import parse_skills
+
+SEARCH_FIELDS = (
+    'q', 'title', 'location', 'skills', 'salary_min', 'is_remote', 'visa_sponsorship', 'near', 'radius',
+)
+
+WILDCARD = '*'
+
+# A "near" search covering more grid cells than this is indexed by its other filters.
+MAX_CELLS = 64
+
+
+def clean_params(params):
+    """The non-empty search fields of `params` (a QueryDict or dict), as a plain dict."""
+    cleaned = {}
+    for field in SEARCH_FIELDS:
+        value = (params.get(field) or '').strip()
+        if value:
+            cleaned[field] = value
+    return cleaned
+
+
+# -------------------------
+# TERMS
+# -------------------------
+def _trigrams(text):
+    text = ' '.join((text or '').lower().split())
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _trigram_anchor(text):
+    """One trigram of a substring filter, preferring one without spaces."""
+    text = ' '.join(text.lower().split())
+    grams = [text[i:i + 3] for i in range(len(text) - 2)]
+    return next((gram for gram in grams if ' ' not in gram), grams[0] if grams else None)
+
+
+def _words(text):
+    # FTS5 also splits words on underscores.
+    return [part for token in keyword_tokens(text) for part in token.split('_') if part]
+
+
+def _cell(lat, lng):
+    return f'cell:{math.floor(lat)}:{math.floor(lng)}'
+
+
+def _cells(lat, lng, radius):
+    (lat_low, lat_high), (lng_low, lng_high) = bounding_box(lat, lng, radius)
+    lats = range(math.floor(lat_low), math.floor(lat_high) + 1)
+    lngs = range(math.floor(lng_low), math.floor(lng_high) + 1)
+    if len(lats) * len(lngs) > MAX_CELLS:
+        return []
+    return [f'cell:{y}:{x}' for y in lats for x in lngs]
+
+
+def _word_anchor(token):
+    """The longest FTS word of a keyword token (FTS5 also splits on underscores)."""
+    return max(_words(token) or [''], key=len)
+
+
+def search_terms(params, vocabulary=None):
+    """The terms a saved search is indexed under: its most selective anchor.
+
+    With a `vocabulary` (as `matches` gets), the anchor is taken from the corrected
+    search, and the original spelling is kept alongside in case it stops being corrected.
+    """
+    skills = parse_skills(params.get('skills', ''))
+    if skills:
+        fixed = correct_skills(vocabulary, skills) if vocabulary is not None else {}
+        corrected = list(dict.fromkeys(fixed.get(name, name) for name in skills))
+        counts = dict(Skill.objects.filter(name__in=corrected).values_list('name', 'posting_count'))
+        # A skill no posting lists yet is the rarest of all.
+        rarest = min(corrected, key=lambda name: (counts.get(name, 0), name))
+        names = [rarest] + [name for name in skills if fixed.get(name) == rarest]
+        return [f'skill:{name}' for name in names]
+    # Without FTS keywords are matched as substrings, so no word prefix is guaranteed.
+    tokens = keyword_tokens(params.get('q', '')) if fts_available() else []
+    token = max(tokens, key=lambda token: len(_word_anchor(token)), default='')
+    if _word_anchor(token):
+        # A misspelled keyword also matches its corrections, so index under each.
+        expansions = keyword_expansions(vocabulary, [token]) if vocabulary is not None else {}
+        spellings = [token] + expansions.get(token, [])
+        return list(dict.fromkeys(f'kw:{_word_anchor(spelling)[:3]}' for spelling in spellings))
+    title = params.get('title', '')
+    titles = [title, correct_title(vocabulary, title)[0]] if vocabulary is not None and title else [title]
+    anchors = [_trigram_anchor(text) for text in titles]
+    if all(anchors):
+        return list(dict.fromkeys(f'title:{anchor}' for anchor in anchors))
+    anchor = _trigram_anchor(params.get('location', ''))
+    if anchor:
+        return [f'loc:{anchor}']
+    near = parse_point(params.get('near', ''))
+    if near:
+        radius = parse_radius(params.get('radius'))
+        if radius is None:
+            radius = settings.JOB_SEARCH_DEFAULT_RADIUS_MILES
+        cells = _cells(near[0], near[1], radius)
+        if cells:
+            return cells
+    if params.get('visa_sponsorship') == 'true':
+        return ['flag:visa']
+    if params.get('is_remote') == 'true':
+        return ['flag:remote']
+    return [WILDCARD]
+
+
+def posting_terms(posting):
+    """Every term a saved search matching this posting can be indexed under."""
+    terms = {WILDCARD}
+    terms.update(f'skill:{name}' for name in posting.skill_tags.values_list('name', flat=True))
+    if fts_available():
+        text = ' '.join(getattr(posting, column) or '' for column in FTS_COLUMNS)
+        for token in set(_words(text)):
+            # Short keywords are indexed whole, so add the one- and two-letter prefixes too.
+            terms.update(f'kw:{token[:length]}' for length in (1, 2, 3))
+    terms.update(f'title:{gram}' for gram in _trigrams(posting.title))
+    terms.update(f'loc:{gram}' for gram in _trigrams(posting.location))
+    if posting.latitude is not None and posting.longitude is not None:
+        terms.add(_cell(posting.latitude, posting.longitude))
+    if posting.is_remote:
+        terms.add('flag:remote')
+    if posting.visa_sponsorship:
+        terms.add('flag:visa')
+    return terms
+
+
+def index_search(search):
+    """Store the terms of a saved search, replacing any earlier ones."""
+    terms = search_terms(search.params, get_autocomplete())
+    with transaction.atomic():
+        SavedSearchTerm.objects.filter(search=search).delete()
+        SavedSearchTerm.objects.bulk_create([SavedSearchTerm(search=search, term=term) for term in terms])
+
+
+# -------------------------
+# PERCOLATION
+# -------------------------
+def matches(params, posting_id, vocabulary=None):
+    """Whether the visible posting `posting_id` is a result of the search `params`.
+
+    Pass the autocomplete `vocabulary` to correct typos the way the search page does.
+    """
+    q = params.get('q', '').strip()
+    jobs, _, _ = filter_postings({field: value for field, value in params.items() if field != 'q'}, vocabulary)
+    jobs = jobs.filter(pk=posting_id)
+    if q:
+        if fts_available():
+            expansions = keyword_expansions(vocabulary, keyword_tokens(q)) if vocabulary is not None else {}
+            if not matches_keywords(posting_id, q, expansions):
+                return False
+        else:
+            jobs = jobs.filter(keyword_filter(q))
+    return jobs.exists()
+
+
+def percolate(posting):
+    """Alert the owners of saved searches that a visible posting matches.
+
+    Returns the number of searches matched.
+    """
+    if not is_visible(posting):
+        return 0
+    candidate_ids = SavedSearchTerm.objects.filter(term__in=list(posting_terms(posting))).values('search_id')
+    candidates = (
+        SavedSearch.objects.filter(id__in=candidate_ids)
+        .exclude(user_id=posting.recruiter_id)
+        .order_by()
+        .values_list('id', 'user_id', 'params')
+    )
+    vocabulary = get_autocomplete()
+    alerts = [
+        SearchAlert(user_id=user_id, search_id=search_id, posting=posting)
+        for search_id, user_id, params in candidates
+        if matches(params, posting.pk, vocabulary)
+    ]
+    SearchAlert.objects.bulk_create(alerts, ignore_conflicts=True)
+    return len(alerts)
+
+
+# -------------------------
+# FEED
+# -------------------------
+def unread_alert_count(user):
+    return SearchAlert.objects.filter(user=user, is_read=False).count()
+
+
+def mark_alerts_read(user):
+    """Mark all of a user's alerts read in one UPDATE. Returns how many changed."""
+    return SearchAlert.objects.filter(user=user, is_read=False).update(is_read=True)
@@ -0,0 +1,283 @@
+"""In-process prefix index for skill and location autocomplete.
+
+Suggestions come from the distinct skills and locations of visible postings plus the
+skills on seeker profiles, ranked by how many of those documents use them. The index
+lives in memory as a sorted array searched with `bisect`, so a keystroke never touches
+the database. It is built on first use and patched in place by the save signals.
+Writes made by other processes are replayed from the change log (jobs/changelog.py):
+only the postings and profiles named there are re-read.
+"""
+import heapq
+import sys
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+
+from .cache import POSTINGS, PROFILES
+from .changelog import LogFollower, is_current, keep_current
+from .fuzzy import WORD_RE, TrigramIndex
+from .models import JobPosting, JobSeekerProfile
+from .skills import parse_skills
+
+# Fields served by the autocomplete endpoint. `title_words` (distinct words of posting
+# titles) is kept only as a vocabulary for typo correction.
+FIELDS = ('skills', 'locations')
+INDEXES = FIELDS + ('title_words',)
+
+# Short prefixes match large slices of the array; remember their answers until the
+# index next changes.
+_HOT_PREFIX_LENGTH = 2
+
+
+def _normalize(text):
+    return ' '.join((text or '').lower().split())
+
+
+def _title_words(title):
+    return tuple(sorted({word for word in WORD_RE.findall((title or '').lower()) if len(word) > 2}))
+
+
+def _search_keys(key):
+    """The key itself plus every suffix that starts a word ("san francisco" -> "francisco")."""
+    keys = [key]
+    for i, char in enumerate(key):
+        if char in ' ,-/' and i + 1 < len(key) and key[i + 1] not in ' ,-/':
+            keys.append(key[i + 1:])
+    return keys
+
+
+class PrefixIndex:
+    """Sorted (search key, term) array with a per-term document count.
+
+    A trigram index over the same terms is kept alongside for typo correction.
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._counts = {}
+        self._labels = {}
+        self._hot = {}
+        self.trigrams = TrigramIndex()
+
+    def __len__(self):
+        return len(self._counts)
+
+    def count(self, term):
+        return self._counts.get(term, 0)
+
+    def load(self, counts, labels):
+        """Replace the contents with `counts` ({term: count}) in one sort."""
+        self._counts = {term: count for term, count in counts.items() if count > 0}
+        self._labels = {term: labels.get(term, term) for term in self._counts}
+        self._entries = sorted((key, term) for term in self._counts for key in _search_keys(term))
+        self._hot.clear()
+        self.trigrams = TrigramIndex()
+        for term in self._counts:
+            self.trigrams.add(term)
+
+    def add(self, term, label=None, count=1):
+        if count <= 0:
+            return
+        if term not in self._counts:
+            self._counts[term] = 0
+            self._labels[term] = label or term
+            for key in _search_keys(term):
+                insort(self._entries, (key, term))
+            self.trigrams.add(term)
+        self._counts[term] += count
+        self._hot.clear()
+
+    def remove(self, term, count=1):
+        if term not in self._counts:
+            return
+        self._counts[term] -= count
+        if self._counts[term] <= 0:
+            del self._counts[term]
+            del self._labels[term]
+            for key in _search_keys(term):
+                i = bisect_left(self._entries, (key, term))
+                if i < len(self._entries) and self._entries[i] == (key, term):
+                    del self._entries[i]
+            self.trigrams.remove(term)
+        self._hot.clear()
+
+    def complete(self, prefix, limit=10):
+        """Most frequent terms with a word starting with `prefix`, as (label, count)."""
+        prefix = _normalize(prefix)
+        if not prefix:
+            return []
+        cache_key = (prefix, limit)
+        if len(prefix) <= _HOT_PREFIX_LENGTH and cache_key in self._hot:
+            return self._hot[cache_key]
+        lo = bisect_left(self._entries, (prefix,))
+        hi = bisect_left(self._entries, (prefix + '\uffff',))
+        terms = {term for _, term in self._entries[lo:hi]}
+        best = heapq.nlargest(limit, terms, key=lambda term: (self._counts[term], term))
+        result = [(self._labels[term], self._counts[term]) for term in best]
+        if len(prefix) <= _HOT_PREFIX_LENGTH:
+            self._hot[cache_key] = result
+        return result
+
+    def memory_bytes(self):
+        """Approximate resident size of the index structures (containers and strings)."""
+        size = sys.getsizeof(self._entries) + sys.getsizeof(self._counts) + sys.getsizeof(self._labels)
+        for key, term in self._entries:
+            size += sys.getsizeof((key, term)) + sys.getsizeof(key)
+        for term, label in self._labels.items():
+            size += sys.getsizeof(term) + (sys.getsizeof(label) if label is not term else 0)
+        size += sys.getsizeof(self.trigrams._grams) + sys.getsizeof(self.trigrams._postings)
+        size += sum(sys.getsizeof(grams) for grams in self.trigrams._grams.values())
+        size += sum(sys.getsizeof(terms) for terms in self.trigrams._postings.values())
+        return size
+
+
+class Autocomplete(LogFollower):
+    """Skill, location and title-word indexes plus what each document contributed."""
+
+    kinds = (POSTINGS, PROFILES)
+
+    def __init__(self):
+        self.indexes = {field: PrefixIndex() for field in INDEXES}
+        self.postings = {}
+        self.profiles = {}
+        self.version = None
+        self.lock = threading.Lock()
+
+    @classmethod
+    def build(cls):
+        index = cls()
+        index.start_following()
+        skill_counts = Counter()
+        location_counts = Counter()
+        location_labels = {}
+        word_counts = Counter()
+        visible = JobPosting.objects.filter(status='active', moderation_status='approved')
+        rows = visible.values_list('id', 'required_skills', 'location', 'title')
+        for pk, required_skills, location, title in rows.iterator():
+            skills = tuple(parse_skills(required_skills))
+            location = location.strip()
+            words = _title_words(title)
+            index.postings[pk] = (skills, location, words)
+            skill_counts.update(skills)
+            word_counts.update(words)
+            if _normalize(location):
+                location_counts[_normalize(location)] += 1
+                location_labels.setdefault(_normalize(location), location)
+        for pk, text in JobSeekerProfile.objects.values_list('id', 'skills').iterator():
+            skills = tuple(parse_skills(text))
+            index.profiles[pk] = skills
+            skill_counts.update(skills)
+        index.indexes['skills'].load(skill_counts, {})
+        index.indexes['locations'].load(location_counts, location_labels)
+        index.indexes['title_words'].load(word_counts, {})
+        return index
+
+    def _add_posting(self, pk, skills, location, title):
+        location = location.strip()
+        words = _title_words(title)
+        self.postings[pk] = (tuple(skills), location, words)
+        for skill in skills:
+            self.indexes['skills'].add(skill)
+        if _normalize(location):
+            self.indexes['locations'].add(_normalize(location), label=location)
+        for word in words:
+            self.indexes['title_words'].add(word)
+
+    def _remove_posting(self, pk):
+        skills, location, words = self.postings.pop(pk, ((), '', ()))
+        for skill in skills:
+            self.indexes['skills'].remove(skill)
+        if _normalize(location):
+            self.indexes['locations'].remove(_normalize(location))
+        for word in words:
+            self.indexes['title_words'].remove(word)
+
+    def _add_profile(self, pk, skills):
+        self.profiles[pk] = tuple(skills)
+        for skill in skills:
+            self.indexes['skills'].add(skill)
+
+    def _remove_profile(self, pk):
+        for skill in self.profiles.pop(pk, ()):
+            self.indexes['skills'].remove(skill)
+
+    def posting_changed(self, posting):
+        with self.lock:
+            self._remove_posting(posting.pk)
+            if posting.status == 'active' and posting.moderation_status == 'approved':
+                self._add_posting(
+                    posting.pk, parse_skills(posting.required_skills), posting.location, posting.title
+                )
+
+    def posting_removed(self, pk):
+        with self.lock:
+            self._remove_posting(pk)
+
+    def profile_changed(self, profile):
+        with self.lock:
+            self._remove_profile(profile.pk)
+            self._add_profile(profile.pk, parse_skills(profile.skills))
+
+    def profile_removed(self, pk):
+        with self.lock:
+            self._remove_profile(pk)
+
+    def apply_changes(self, changed):
+        """Re-read the postings and profiles other processes wrote ({kind: {id, ...}})."""
+        posting_ids, profile_ids = changed[POSTINGS], changed[PROFILES]
+        postings = JobPosting.objects.filter(
+            id__in=posting_ids, status='active', moderation_status='approved'
+        ).values_list('id', 'required_skills', 'location', 'title')
+        profiles = JobSeekerProfile.objects.filter(id__in=profile_ids).values_list('id', 'skills')
+        postings, profiles = list(postings), list(profiles)
+        with self.lock:
+            # Deleted or hidden rows are simply not read back.
+            for pk in posting_ids:
+                self._remove_posting(pk)
+            for pk, required_skills, location, title in postings:
+                self._add_posting(pk, parse_skills(required_skills), location, title)
+            for pk in profile_ids:
+                self._remove_profile(pk)
+            for pk, text in profiles:
+                self._add_profile(pk, parse_skills(text))
+
+    def complete(self, field, prefix, limit=10):
+        return self.indexes[field].complete(prefix, limit)
+
+    def stats(self):
+        stats = {
+            field: {'terms': len(index), 'entries': len(index._entries), 'bytes': index.memory_bytes()}
+            for field, index in self.indexes.items()
+        }
+        # Per-document contributions kept so updates can subtract what a row added.
+        stats['documents'] = {
+            'postings': len(self.postings),
+            'profiles': len(self.profiles),
+            'bytes': sys.getsizeof(self.postings) + sys.getsizeof(self.profiles) + sum(
+                sys.getsizeof(value) for value in (*self.postings.values(), *self.profiles.values())
+            ),
+        }
+        return stats
+
+
+_autocomplete = None
+_build_lock = threading.Lock()
+
+
+def get_autocomplete():
+    """The process-wide index, caught up with writes made by other processes."""
+    global _autocomplete
+    current = _autocomplete
+    if current is None or not is_current(current):
+        with _build_lock:
+            if _autocomplete is None:
+                _autocomplete = Autocomplete.build()
+            else:
+                _autocomplete = keep_current(_autocomplete, Autocomplete.build)
+            current = _autocomplete
+    return current
+
+
+def loaded_autocomplete():
+    """The index if this process has built one, without building it."""
+    return _autocomplete
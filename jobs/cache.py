@@ -0,0 +1,172 @@
+"""Version counters and the job search result cache.
+
+Cached search pages are keyed on the canonicalized query *and* every version number
+the page depends on (SEARCH_VERSIONS): the postings themselves, and the profiles and
+skill synonyms that feed typo correction and skill matching. Any posting save,
+moderation change or delete, profile save or synonym edit bumps one of them, which
+orphans every older entry at once (O(1) invalidation); the orphans then age out through
+the cache backend's own TTL/LRU culling.
+
+The counters (versions and hit/miss stats) must live in a cache every process shares
+for invalidation to reach all workers. With a per-process backend such as LocMemCache
+each worker counts alone: the stats are then only visible from inside a serving process
+(the admin `search_cache_stats_view`), never from a management command.
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .geocoding import parse_point, parse_radius
+from .skills import parse_skills
+
+POSTINGS = 'postings'
+PROFILES = 'profiles'
+SYNONYMS = 'synonyms'
+
+# What a search page reads: postings, and the correction vocabulary (postings and
+# profiles, jobs/autocomplete.py) and skill synonyms the filters apply.
+SEARCH_VERSIONS = (POSTINGS, PROFILES, SYNONYMS)
+
+STATS_HITS_KEY = 'jobs:search:hits'
+STATS_MISSES_KEY = 'jobs:search:misses'
+
+
+def _counters():
+    return caches[getattr(settings, 'JOB_COUNTERS_CACHE_ALIAS', 'default')]
+
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def counters_shared():
+    """Whether the counters cache is visible to every process (not LocMem/Dummy)."""
+    alias = getattr(settings, 'JOB_COUNTERS_CACHE_ALIAS', 'default')
+    return settings.CACHES[alias]['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+
+def _results():
+    return caches[getattr(settings, 'JOB_SEARCH_CACHE_ALIAS', 'default')]
+
+
+def _version_key(name):
+    return f'jobs:version:{name}'
+
+
+def get_version(name):
+    """Current value of a named version counter."""
+    store = _counters()
+    version = store.get(_version_key(name))
+    if version is None:
+        # Seed from the clock so a counter that was evicted never restarts at a value
+        # that older cache entries were written under.
+        store.add(_version_key(name), time.time_ns(), timeout=None)
+        version = store.get(_version_key(name))
+    return version
+
+
+def bump_version(name):
+    """Invalidate everything cached under the named version counter."""
+    store = _counters()
+    try:
+        return store.incr(_version_key(name))
+    except ValueError:
+        get_version(name)
+        return store.incr(_version_key(name))
+
+
+def versioned(prefix, compute, *names):
+    """`compute()`, memoized in the counters cache until one of the named versions moves."""
+    key = ':'.join([prefix, *(str(get_version(name)) for name in names)])
+    return _counters().get_or_set(key, compute, getattr(settings, 'JOB_SEARCH_CACHE_TIMEOUT', 300))
+
+
+def _normalize_text(value):
+    return ' '.join(value.lower().split())
+
+
+def canonical_search_params(params):
+    """Reduce search GET parameters to a canonical dict of the filters that matter.
+
+    Equivalent queries (different case, spacing, parameter order, skill order, "050000"
+    vs "50000") map to the same dict. The search itself runs on this dict, so a cached
+    result always matches what a fresh query would return.
+    """
+    canonical = {}
+    for name in ('q', 'title', 'location'):
+        value = _normalize_text(params.get(name, ''))
+        if value:
+            canonical[name] = value
+    skills = parse_skills(params.get('skills', ''))
+    if skills:
+        canonical['skills'] = ', '.join(sorted(skills))
+    try:
+        canonical['salary_min'] = str(int(params.get('salary_min', '')))
+    except ValueError:
+        pass
+    for flag in ('is_remote', 'visa_sponsorship'):
+        if params.get(flag) == 'true':
+            canonical[flag] = 'true'
+    point = parse_point(params.get('near', ''))
+    if point:
+        canonical['near'] = f'{point[0]:.4f},{point[1]:.4f}'
+        radius = parse_radius(params.get('radius'))
+        if radius is not None:
+            canonical['radius'] = f'{radius:g}'
+    for name in ('page_size', 'cursor'):
+        if params.get(name):
+            canonical[name] = params.get(name)
+    return canonical
+
+
+def search_cache_key(canonical):
+    digest = hashlib.sha1(urlencode(sorted(canonical.items())).encode()).hexdigest()
+    versions = ':'.join(str(get_version(name)) for name in SEARCH_VERSIONS)
+    return f'jobs:search:{versions}:{digest}'
+
+
+def _count(key):
+    store = _counters()
+    try:
+        store.incr(key)
+    except ValueError:
+        store.add(key, 0, timeout=None)
+        store.incr(key)
+
+
+def cached_search_page(params, compute):
+    """Return `compute(canonical_params)`, served from the result cache when possible."""
+    canonical = canonical_search_params(params)
+    key = search_cache_key(canonical)
+    store = _results()
+    page = store.get(key)
+    if page is not None:
+        _count(STATS_HITS_KEY)
+        return page
+    _count(STATS_MISSES_KEY)
+    page = compute(canonical)
+    store.set(key, page, getattr(settings, 'JOB_SEARCH_CACHE_TIMEOUT', 300))
+    return page
+
+
+def search_cache_stats():
+    store = _counters()
+    hits = store.get(STATS_HITS_KEY) or 0
+    misses = store.get(STATS_MISSES_KEY) or 0
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / lookups if lookups else 0.0,
+        'postings_version': get_version(POSTINGS),
+        'shared': counters_shared(),
+    }
+
+
+def reset_search_cache_stats():
+    _counters().delete_many([STATS_HITS_KEY, STATS_MISSES_KEY])
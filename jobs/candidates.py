@@ -0,0 +1,229 @@
+"""In-memory candidate scoring for recruiter recommendations.
+
+Every seeker profile is a row of a profiles × skills matrix kept in CSR form (NumPy
+`indptr`/`indices` arrays). Scoring all candidates for a posting is then a single
+sparse matrix-vector product with the posting's skill weights, and the best page is
+picked with `argpartition`, so only that page is ever loaded through the ORM. The
+order (and paging position) is the same as the SQL ranking in jobs/recommendations.py.
+
+Like the autocomplete index, the matrix is built once per process and patched from the
+profile save signals. Profiles written by other processes are replayed from the change
+log (jobs/changelog.py), re-reading only those rows. Patched rows wait in a small
+pending set that is scored in Python and folded into the arrays once it grows.
+
+NumPy is optional: without it `get_candidate_matrix()` returns None and callers rank
+candidates in the database instead.
+"""
+import threading
+from collections import defaultdict
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy installed
+    np = None
+
+from .cache import PROFILES
+from .changelog import LogFollower, is_current, keep_current
+from .models import JobSeekerProfile
+
+ProfileSkill = JobSeekerProfile.skill_tags.through
+
+# Fold pending rows into the arrays once there are more than this many, or more than
+# 1/_COMPACT_FRACTION of the matrix, whichever is larger.
+_COMPACT_MIN = 64
+_COMPACT_FRACTION = 20
+
+
+class CandidateMatrix(LogFollower):
+    """Profiles × skills CSR matrix plus the per-row data used to filter and tie-break."""
+
+    kinds = (PROFILES,)
+
+    def __init__(self):
+        self.version = None
+        self.columns = {}
+        self.column_skills = []
+        self.pending = {}
+        self.lock = threading.Lock()
+        self._load([])
+
+    @classmethod
+    def build(cls):
+        matrix = cls()
+        matrix.start_following()
+        skills = defaultdict(list)
+        links = ProfileSkill.objects.values_list('jobseekerprofile_id', 'skill_id')
+        for profile_id, skill_id in links.iterator():
+            skills[profile_id].append(skill_id)
+        profiles = JobSeekerProfile.objects.order_by('id').values_list(
+            'id', 'user_id', 'profile_visible', 'updated_at'
+        )
+        matrix._load(
+            (pk, user_id, visible, updated_at.timestamp(), skills.get(pk, ()))
+            for pk, user_id, visible, updated_at in profiles.iterator()
+        )
+        return matrix
+
+    def _column(self, skill_id):
+        column = self.columns.get(skill_id)
+        if column is None:
+            column = self.columns[skill_id] = len(self.column_skills)
+            self.column_skills.append(skill_id)
+        return column
+
+    def _load(self, rows):
+        """Replace the arrays with `rows` of (profile id, user id, visible, updated, skill ids)."""
+        profile_ids, user_ids, visible, updated, indptr, indices = [], [], [], [], [0], []
+        for pk, user_id, is_visible, updated_ts, skill_ids in rows:
+            profile_ids.append(pk)
+            user_ids.append(user_id)
+            visible.append(is_visible)
+            updated.append(updated_ts)
+            indices.extend(sorted(self._column(skill_id) for skill_id in skill_ids))
+            indptr.append(len(indices))
+        self.profile_ids = np.array(profile_ids, dtype=np.int64)
+        self.user_ids = np.array(user_ids, dtype=np.int64)
+        self.visible = np.array(visible, dtype=bool)
+        self.updated = np.array(updated, dtype=np.float64)
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self.indices = np.array(indices, dtype=np.int32)
+        # Row number of each stored entry, for summing entries per row.
+        self.entry_rows = np.repeat(np.arange(len(profile_ids)), np.diff(self.indptr))
+        self.rows = {pk: row for row, pk in enumerate(profile_ids)}
+        self.user_rows = {user_id: row for row, user_id in enumerate(user_ids)}
+        self.pending = {}
+
+    def _row_skills(self, row):
+        return [self.column_skills[c] for c in self.indices[self.indptr[row]:self.indptr[row + 1]]]
+
+    def _current_rows(self):
+        for pk, row in self.rows.items():
+            if pk not in self.pending:
+                yield (pk, int(self.user_ids[row]), bool(self.visible[row]), float(self.updated[row]),
+                       self._row_skills(row))
+        for pk, data in self.pending.items():
+            if data is not None:
+                yield (pk, *data)
+
+    def _maybe_compact(self):
+        if len(self.pending) > max(_COMPACT_MIN, len(self.rows) // _COMPACT_FRACTION):
+            self._load(list(self._current_rows()))
+
+    def profile_changed(self, profile, skill_ids):
+        with self.lock:
+            self.pending[profile.pk] = (
+                profile.user_id, profile.profile_visible, profile.updated_at.timestamp(), list(skill_ids)
+            )
+            self._maybe_compact()
+
+    def profile_removed(self, pk):
+        with self.lock:
+            self.pending[pk] = None
+            self._maybe_compact()
+
+    def apply_changes(self, changed):
+        """Re-read the profiles other processes wrote ({PROFILES: {id, ...}})."""
+        ids = changed[PROFILES]
+        skills = defaultdict(list)
+        for profile_id, skill_id in ProfileSkill.objects.filter(jobseekerprofile_id__in=ids).values_list(
+            'jobseekerprofile_id', 'skill_id'
+        ):
+            skills[profile_id].append(skill_id)
+        rows = {
+            pk: (user_id, visible, updated_at.timestamp(), skills.get(pk, []))
+            for pk, user_id, visible, updated_at in JobSeekerProfile.objects.filter(id__in=ids).values_list(
+                'id', 'user_id', 'profile_visible', 'updated_at'
+            )
+        }
+        with self.lock:
+            for pk in ids:
+                # Deleted profiles are not read back and become removals.
+                self.pending[pk] = rows.get(pk)
+            self._maybe_compact()
+
+    def score(self, weights, exclude_user_ids=(), limit=25, after=None):
+        """Top `limit` visible candidates for {skill id: weight}, best first.
+
+        Returns (profile id, score, updated timestamp) tuples ordered by score, then most
+        recently updated, then id, all descending. `after` is such a tuple from a
+        previous page; only rows that sort after it are returned. Scores are rounded to
+        6 places like the SQL ranking, and profiles scoring 0 are never returned.
+        """
+        exclude_user_ids = set(exclude_user_ids)
+        with self.lock:
+            query = np.zeros(len(self.column_skills), dtype=np.float64)
+            for skill_id, weight in weights.items():
+                if skill_id in self.columns:
+                    query[self.columns[skill_id]] = weight
+
+            # CSR matrix-vector product: per-row sums of the query weights of its columns.
+            scores = np.round(np.bincount(
+                self.entry_rows, weights=query[self.indices], minlength=len(self.profile_ids)
+            ), 6)
+
+            mask = self.visible & (scores > 0)
+            stale = [self.rows[pk] for pk in self.pending if pk in self.rows]
+            excluded = [self.user_rows[u] for u in exclude_user_ids if u in self.user_rows]
+            mask[stale + excluded] = False
+            if after is not None:
+                score, updated, pk = after
+                mask &= (scores < score) | (scores == score) & (
+                    (self.updated < updated) | (self.updated == updated) & (self.profile_ids < pk)
+                )
+            candidates = np.flatnonzero(mask)
+            if len(candidates) > limit:
+                top = np.argpartition(-scores[candidates], limit - 1)[:limit]
+                # Keep every row tied with the cut-off score so the tie-breaks are exact.
+                cutoff = scores[candidates[top]].min()
+                candidates = candidates[scores[candidates] >= cutoff]
+
+            rows = list(zip(
+                self.profile_ids[candidates].tolist(),
+                scores[candidates].tolist(),
+                self.updated[candidates].tolist(),
+            ))
+            for pk, data in self.pending.items():
+                if data is None:
+                    continue
+                user_id, visible, updated_ts, skill_ids = data
+                row = (pk, round(sum(weights.get(s, 0.0) for s in skill_ids), 6), updated_ts)
+                if visible and user_id not in exclude_user_ids and row[1] > 0:
+                    if after is None or (row[1], row[2], pk) < tuple(after):
+                        rows.append(row)
+
+        rows.sort(key=lambda row: (row[1], row[2], row[0]), reverse=True)
+        return rows[:limit]
+
+
+def coverage_pct(scores, total):
+    """Share of a posting's `total` skill weight each score covers, as 0-100 integers."""
+    if np is None:
+        return [min(round(score * 100 / total), 100) if total else 0 for score in scores]
+    if not total:
+        return np.zeros(len(scores), dtype=np.int64)
+    return np.minimum(np.rint(np.asarray(scores) * 100.0 / total), 100).astype(np.int64)
+
+
+_matrix = None
+_build_lock = threading.Lock()
+
+
+def get_candidate_matrix():
+    """The process-wide matrix, caught up with other processes' writes; None without NumPy."""
+    global _matrix
+    if np is None:
+        return None
+    current = _matrix
+    if current is None or not is_current(current):
+        with _build_lock:
+            if _matrix is None:
+                _matrix = CandidateMatrix.build()
+            else:
+                _matrix = keep_current(_matrix, CandidateMatrix.build)
+            current = _matrix
+    return current
+
+
+def loaded_candidate_matrix():
+    """The matrix if this process has built one, without building it."""
+    return _matrix
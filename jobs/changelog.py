@@ -0,0 +1,140 @@
+"""Change log that lets each process's in-memory indexes catch up with other processes.
+
+The autocomplete index, the candidate matrix and the embedding indexes live in process
+memory and are patched by the save signals of the process that made the write. Other
+processes learn about it in two steps:
+
+* `record_change(kind, object_id)` appends a DocumentChange row in the writer's
+  transaction and, once that commits, bumps the kind's version counter (jobs/cache.py);
+* `keep_current(index, build)` compares the index's versions with the counters (a cache
+  read). When they moved it reads only the log rows after the last one the index
+  applied and hands the changed ids to `index.apply_changes`, which re-reads just those
+  rows.
+
+The counters only reach other processes through a shared cache. When
+JOB_COUNTERS_CACHE_ALIAS is per-process (LocMem, the default), the versions are instead
+the newest log id of each kind: one indexed query per kind and request, read from the
+database every process shares. The index is rebuilt from scratch only when a row says every object changed
+  (maintenance commands), when there are more than JOB_CHANGE_LOG_CATCH_UP_LIMIT rows
+  to replay, or when the index has not synced for half of JOB_CHANGE_LOG_RETENTION
+  (older rows may have been pruned).
+
+Log ids must become visible in id order, which SQLite guarantees by running one write
+transaction at a time.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import bump_version, counters_shared, get_version
+from .models import DocumentChange
+
+# Prune the log on every this-many-th write.
+_PRUNE_EVERY = 1000
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def record_change(kind, object_id=None):
+    """Log a write to one object of `kind` (None: every object) and bump its version on commit."""
+    change = DocumentChange.objects.create(kind=kind, object_id=object_id)
+    transaction.on_commit(lambda: bump_version(kind))
+    if change.pk % _PRUNE_EVERY == 0:
+        prune()
+
+
+def latest_change_id(kinds=None):
+    changes = DocumentChange.objects.all() if kinds is None else DocumentChange.objects.filter(kind__in=kinds)
+    return changes.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def prune():
+    cutoff = timezone.now() - timedelta(seconds=_setting('JOB_CHANGE_LOG_RETENTION', 86400))
+    DocumentChange.objects.filter(created_at__lt=cutoff).delete()
+
+
+def changes_since(kinds, after_id, synced_at):
+    """Ids changed after log row `after_id`, as ({kind: {id, ...}}, last row id).
+
+    Returns None when the caller has to rebuild instead (see the module docstring).
+    """
+    if time.time() - synced_at > _setting('JOB_CHANGE_LOG_RETENTION', 86400) / 2:
+        return None
+    limit = _setting('JOB_CHANGE_LOG_CATCH_UP_LIMIT', 5000)
+    rows = list(
+        DocumentChange.objects.filter(kind__in=kinds, id__gt=after_id)
+        .order_by('id').values_list('id', 'kind', 'object_id')[:limit + 1]
+    )
+    if len(rows) > limit:
+        return None
+    changed = {kind: set() for kind in kinds}
+    for _, kind, object_id in rows:
+        if object_id is None:
+            return None
+        changed[kind].add(object_id)
+    return changed, rows[-1][0] if rows else after_id
+
+
+class LogFollower:
+    """Bookkeeping for an in-memory index that follows the change log of `kinds`.
+
+    Subclasses set `kinds` and implement `apply_changes({kind: {id, ...}})`. Builders
+    call `start_following()` before reading the database, so writes committed while
+    they read are replayed afterwards.
+    """
+
+    kinds = ()
+
+    def start_following(self, position=None):
+        """Start from `position` (a `log_position()` taken before reading), or from now."""
+        self.version, self.position, self.synced_at = position or log_position(self.kinds)
+
+    def apply_changes(self, changed):
+        raise NotImplementedError
+
+
+def current_versions(kinds):
+    """The kinds' version counters, or their newest log ids when the counters are per-process."""
+    if counters_shared():
+        return tuple(get_version(kind) for kind in kinds)
+    return tuple(latest_change_id([kind]) for kind in kinds)
+
+
+def log_position(kinds):
+    """(versions, last log id, time) for an index about to read the database."""
+    # Versions first: a commit after this read bumps them again and gets replayed.
+    return current_versions(kinds), latest_change_id(), time.time()
+
+
+def is_current(index):
+    """Whether no write has committed since `index` last synced (a cache read, or one
+    query per kind when the counters are per-process)."""
+    if current_versions(index.kinds) != index.version:
+        return False
+    # Versions only move after a logged write commits, so nothing is left to replay.
+    index.synced_at = time.time()
+    return True
+
+
+def keep_current(index, build):
+    """`index` caught up with other processes' writes, or `build()` if it must be rebuilt.
+
+    Callers hold the lock that guards replacing `index`.
+    """
+    version = current_versions(index.kinds)
+    if version == index.version:
+        index.synced_at = time.time()
+        return index
+    pending = changes_since(index.kinds, index.position, index.synced_at)
+    if pending is None:
+        return build()
+    changed, position = pending
+    if any(changed.values()):
+        index.apply_changes(changed)
+    index.version, index.position, index.synced_at = version, position, time.time()
+    return index
@@ -0,0 +1,18 @@
+from django.conf import settings
+
+from .messaging import unread_count
+
+
+def unread_messages(request):
+    """The navbar's unread message badge: one primary-key read of UnreadCount.
+
+    `live_events` tells base.html whether to keep the badge current over SSE, which
+    only an ASGI deployment serves (jobs/events.py).
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {
+        'unread_messages': unread_count(user),
+        'live_events': getattr(settings, 'JOB_EVENTS_ENABLED', False),
+    }
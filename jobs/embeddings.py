@@ -0,0 +1,450 @@
+"""Semantic matching with hashed text embeddings and an approximate nearest-neighbour index.
+
+Skill scoring (jobs/recommendations.py) only sees the skill lists. Here the free text
+counts too: a posting's title, description and skills, and a seeker's headline, skills,
+education and work experience. Each document becomes a fixed-size vector by feature
+hashing. Its words and word bigrams are hashed (CRC-32, so every process agrees) into
+JOB_EMBEDDING_DIM signed buckets, weighted 1 + log(count), and the vector is
+L2-normalized. Skill names go in as whole tokens after synonym normalization, so "JS"
+and "JavaScript" land in the same bucket. Nothing is downloaded and no model is
+trained. Vectors are stored as packed float32 in PostingEmbedding / ProfileEmbedding,
+written from the save signals (`manage.py embed_documents` fills in existing rows).
+
+Similarity is the cosine, i.e. the dot product of two normalized vectors. `AnnIndex`
+answers top-k queries without scanning every vector. It is an inverted-file (IVF)
+index: spherical k-means splits the vectors into about sqrt(n) lists stored
+contiguously, and a query scans only the JOB_EMBEDDING_PROBES lists whose centroids are
+nearest to it. `manage.py benchmark_embeddings` measures its recall and latency against
+brute force.
+
+Like the candidate matrix, each index is built once per process and patched from the
+save signals. Rows written by other processes are replayed from the change log
+(jobs/changelog.py); a full rebuild keeps the centroids.
+The index needs NumPy. Without it `get_job_index()` / `get_profile_index()` return
+None and the views fall back to skill scoring.
+"""
+import math
+import re
+import threading
+import zlib
+from array import array
+from collections import Counter
+
+from django.conf import settings
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy installed
+    np = None
+
+from .cache import POSTINGS, PROFILES
+from .changelog import LogFollower, is_current, keep_current, log_position
+from .models import JobApplication, PostingEmbedding, ProfileEmbedding
+from .pagination import decode_cursor, encode_cursor
+from .skills import parse_skills
+
+# Fields whose text goes into each embedding; saving any of them re-embeds the row.
+POSTING_FIELDS = ('title', 'description', 'required_skills')
+PROFILE_FIELDS = ('headline', 'skills', 'education', 'work_experience')
+
+_WORD_RE = re.compile(r'[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*')
+_STOPWORDS = frozenset(
+    'a an and are as at be by for from has have in is it its of on or our that the this '
+    'to we will with you your'.split()
+)
+# A listed skill counts as much as a word used this many times.
+_SKILL_WEIGHT = 3
+
+# IVF layout: below this many vectors a single list (an exact scan) is used. Lists are
+# trained on at most _TRAIN_PER_LIST sample vectors each.
+_MIN_IVF_SIZE = 1000
+_TRAIN_PER_LIST = 64
+_TRAIN_ITERATIONS = 10
+_ASSIGN_CHUNK = 8192
+_COMPACT_MIN = 64
+_COMPACT_FRACTION = 20
+
+
+def embedding_dim():
+    return getattr(settings, 'JOB_EMBEDDING_DIM', 256)
+
+
+def default_probes():
+    return getattr(settings, 'JOB_EMBEDDING_PROBES', 8)
+
+
+# -------------------------
+# EMBEDDING
+# -------------------------
+def _features(text):
+    words = [word for word in _WORD_RE.findall(text.lower()) if word not in _STOPWORDS]
+    yield from words
+    for first, second in zip(words, words[1:]):
+        yield f'{first} {second}'
+
+
+def embed(texts, skills=(), dim=None):
+    """Unit float32 vector (an `array('f')`) for weighted texts plus skill names.
+
+    `texts` are (text, weight) pairs; a weight repeats every feature of that text.
+    """
+    dim = dim or embedding_dim()
+    counts = Counter()
+    for text, weight in texts:
+        for feature in _features(text or ''):
+            counts[feature] += weight
+    for name in skills:
+        counts[f'skill:{name}'] += _SKILL_WEIGHT
+    vector = array('f', bytes(4 * dim))
+    for feature, count in counts.items():
+        hashed = zlib.crc32(feature.encode())
+        # The top bit picks the sign, so colliding features tend to cancel out.
+        sign = -1.0 if hashed & 0x80000000 else 1.0
+        vector[hashed % dim] += sign * (1.0 + math.log(count))
+    norm = math.sqrt(sum(value * value for value in vector))
+    if norm:
+        for i, value in enumerate(vector):
+            vector[i] = value / norm
+    return vector
+
+
+def embed_posting(posting):
+    return embed(
+        [(posting.title, 2), (posting.description, 1)],
+        parse_skills(posting.required_skills),
+    )
+
+
+def embed_profile(profile):
+    return embed(
+        [(profile.headline, 2), (profile.education, 1), (profile.work_experience, 1)],
+        parse_skills(profile.skills),
+    )
+
+
+def save_posting_embedding(posting):
+    vector = embed_posting(posting)
+    PostingEmbedding.objects.update_or_create(posting_id=posting.pk, defaults={'vector': vector.tobytes()})
+    return vector
+
+
+def save_profile_embedding(profile):
+    vector = embed_profile(profile)
+    ProfileEmbedding.objects.update_or_create(profile_id=profile.pk, defaults={'vector': vector.tobytes()})
+    return vector
+
+
+# -------------------------
+# IVF INDEX
+# -------------------------
+def list_count(size):
+    """Number of IVF lists for `size` vectors: about sqrt(size), or 1 for small sets."""
+    return 1 if size < _MIN_IVF_SIZE else int(math.sqrt(size))
+
+
+def _assign(vectors, centroids):
+    """Nearest centroid of each vector, in chunks to bound the temporary score matrix."""
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), _ASSIGN_CHUNK):
+        labels[start:start + _ASSIGN_CHUNK] = np.argmax(vectors[start:start + _ASSIGN_CHUNK] @ centroids.T, axis=1)
+    return labels
+
+
+def train_centroids(vectors, lists, seed=0):
+    """Spherical k-means: `lists` unit centroids trained on a sample of `vectors`."""
+    dim = vectors.shape[1]
+    if lists <= 1 or len(vectors) <= lists:
+        centroid = vectors.sum(axis=0) if len(vectors) else np.zeros(dim, dtype=np.float32)
+        norm = np.linalg.norm(centroid)
+        return (centroid / norm if norm else centroid).reshape(1, dim).astype(np.float32)
+    rng = np.random.default_rng(seed)
+    sample = vectors
+    if len(vectors) > lists * _TRAIN_PER_LIST:
+        sample = vectors[rng.choice(len(vectors), lists * _TRAIN_PER_LIST, replace=False)]
+    centroids = sample[rng.choice(len(sample), lists, replace=False)].copy()
+    for _ in range(_TRAIN_ITERATIONS):
+        labels = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        norms = np.linalg.norm(sums, axis=1)
+        empty = norms == 0
+        # Re-seed lists that lost all their vectors.
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        norms[empty] = np.linalg.norm(sums[empty], axis=1)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms[:, None]).astype(np.float32)
+    return centroids
+
+
+class AnnIndex(LogFollower):
+    """IVF index over unit vectors, with the per-row data used to filter results.
+
+    Rows are (id, visible, user id, vector). The user id lets job -> candidate queries
+    leave out people who already applied; posting rows use 0.
+    """
+
+    def __init__(self, dim, kind=None):
+        self.dim = dim
+        self.kind = kind
+        self.kinds = (kind,) if kind else ()
+        self.version = None
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.centroids = np.zeros((1, dim), dtype=np.float32)
+        self._load(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool),
+                   np.zeros(0, dtype=np.int64), np.zeros((0, dim), dtype=np.float32))
+
+    @classmethod
+    def build(cls, ids, visible, user_ids, vectors, kind=None, centroids=None):
+        """Index the given arrays, training new centroids unless usable ones are passed.
+
+        `kind` is the change log kind (POSTINGS or PROFILES) the rows come from.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        index = cls(vectors.shape[1], kind)
+        index._load(np.asarray(ids, dtype=np.int64), np.asarray(visible, dtype=bool),
+                    np.asarray(user_ids, dtype=np.int64), vectors, centroids)
+        return index
+
+    def _load(self, ids, visible, user_ids, vectors, centroids=None):
+        if centroids is None or len(centroids) != list_count(len(ids)):
+            centroids = train_centroids(vectors, list_count(len(ids)))
+        labels = _assign(vectors, centroids) if len(vectors) else np.zeros(0, dtype=np.int64)
+        order = np.argsort(labels, kind='stable')
+        self.centroids = centroids
+        # List c holds rows offsets[c]:offsets[c + 1], stored contiguously.
+        self.offsets = np.searchsorted(labels[order], np.arange(len(centroids) + 1))
+        self.ids = ids[order]
+        self.visible = visible[order]
+        self.user_ids = user_ids[order]
+        self.vectors = np.ascontiguousarray(vectors[order])
+        # False for rows superseded by a pending change.
+        self.live = np.ones(len(ids), dtype=bool)
+        self.rows = {pk: row for row, pk in enumerate(self.ids.tolist())}
+        self.user_rows = {}
+        for row, user_id in enumerate(self.user_ids.tolist()):
+            if user_id:
+                self.user_rows.setdefault(user_id, []).append(row)
+        self.pending = {}
+
+    def __len__(self):
+        return int(self.live.sum()) + sum(1 for data in self.pending.values() if data is not None)
+
+    def nbytes(self):
+        return self.vectors.nbytes + self.centroids.nbytes + self.ids.nbytes + self.user_ids.nbytes
+
+    def _current(self):
+        """Arrays of every current row: stored rows still live, then pending ones."""
+        keep = np.flatnonzero(self.live)
+        added = [(pk, data) for pk, data in self.pending.items() if data is not None]
+        return (
+            np.concatenate([self.ids[keep], np.array([pk for pk, _ in added], dtype=np.int64)]),
+            np.concatenate([self.visible[keep], np.array([d[0] for _, d in added], dtype=bool)]),
+            np.concatenate([self.user_ids[keep], np.array([d[1] for _, d in added], dtype=np.int64)]),
+            np.vstack([self.vectors[keep]] + [d[2].reshape(1, -1) for _, d in added]),
+        )
+
+    def update(self, pk, visible, user_id=0, vector=None):
+        """Patch one row; without `vector` the row keeps the vector it has."""
+        with self.lock:
+            if vector is None:
+                if self.pending.get(pk) is not None:
+                    vector = self.pending[pk][2]
+                elif pk in self.rows:
+                    vector = self.vectors[self.rows[pk]]
+                else:
+                    return
+            if pk in self.rows:
+                self.live[self.rows[pk]] = False
+            self.pending[pk] = (bool(visible), user_id, np.asarray(vector, dtype=np.float32).copy())
+            self._maybe_compact()
+
+    def remove(self, pk):
+        with self.lock:
+            if pk in self.rows:
+                self.live[self.rows[pk]] = False
+            self.pending[pk] = None
+            self._maybe_compact()
+
+    def apply_changes(self, changed):
+        """Re-read the rows other processes wrote ({kind: {id, ...}})."""
+        ids = changed[self.kind]
+        rows = {pk: (vector, is_visible, user_id) for pk, vector, is_visible, user_id in _rows(self.kind, ids)}
+        with self.lock:
+            for pk in ids:
+                vector, is_visible, user_id = rows.get(pk, (b'', False, 0))
+                vector = bytes(vector)
+                if pk in self.rows:
+                    self.live[self.rows[pk]] = False
+                # Deleted rows, and rows embedded under another dimension, become removals.
+                self.pending[pk] = (
+                    (bool(is_visible), user_id, np.frombuffer(vector, dtype=np.float32).copy())
+                    if len(vector) == 4 * self.dim else None
+                )
+            self._maybe_compact()
+
+    def _maybe_compact(self):
+        if len(self.pending) > max(_COMPACT_MIN, len(self.rows) // _COMPACT_FRACTION):
+            # Keeps the centroids unless the size calls for a different number of lists.
+            self._load(*self._current(), self.centroids)
+
+    def search(self, query, limit=25, probes=None, exclude_user_ids=(), after=None, exact=False):
+        """Top `limit` visible rows by cosine similarity to `query`, as (id, score) pairs.
+
+        Results are ordered by score, then id, both descending. Only the `probes` lists
+        nearest the query are scanned (JOB_EMBEDDING_PROBES by default), or all of them
+        with `exact`. `after` is an (score, id) pair from a previous page; only rows that
+        sort after it are returned. Scores are rounded to 6 places, and rows scoring 0
+        or less (nothing in common) are never returned.
+        """
+        query = np.asarray(query, dtype=np.float32)
+        probes = probes or default_probes()
+        with self.lock:
+            lists = len(self.centroids)
+            if exact or probes >= lists:
+                segments = [(0, len(self.ids))]
+            else:
+                nearest = np.argpartition(-(self.centroids @ query), probes - 1)[:probes]
+                segments = [(int(self.offsets[c]), int(self.offsets[c + 1])) for c in nearest]
+            rows = np.concatenate([np.arange(start, end) for start, end in segments])
+            scores = np.round(np.concatenate(
+                [self.vectors[start:end] @ query for start, end in segments]
+            ).astype(np.float64), 6)
+
+            mask = self.visible[rows] & self.live[rows] & (scores > 0)
+            excluded = [row for user_id in set(exclude_user_ids) for row in self.user_rows.get(user_id, ())]
+            if excluded:
+                mask &= ~np.isin(rows, excluded)
+            ids = self.ids[rows]
+            if after is not None:
+                score, pk = after
+                mask &= (scores < score) | (scores == score) & (ids < pk)
+            rows, scores, ids = rows[mask], scores[mask], ids[mask]
+            if len(rows) > limit:
+                top = np.argpartition(-scores, limit - 1)[:limit]
+                # Keep every row tied with the cut-off score so the id tie-break is exact.
+                keep = scores >= scores[top].min()
+                scores, ids = scores[keep], ids[keep]
+
+            results = list(zip(ids.tolist(), scores.tolist()))
+            exclude_user_ids = set(exclude_user_ids)
+            for pk, data in self.pending.items():
+                if data is None:
+                    continue
+                visible, user_id, vector = data
+                score = round(float(vector @ query), 6)
+                if visible and score > 0 and user_id not in exclude_user_ids:
+                    if after is None or (score, pk) < tuple(after):
+                        results.append((pk, score))
+
+        results.sort(key=lambda row: (row[1], row[0]), reverse=True)
+        return results[:limit]
+
+
+# -------------------------
+# PROCESS-WIDE INDEXES
+# -------------------------
+def _rows(kind, ids=None):
+    """(id, vector bytes, visible, user id) of every stored embedding, or of `ids` only."""
+    if kind == POSTINGS:
+        embeddings = PostingEmbedding.objects.all()
+        if ids is not None:
+            embeddings = embeddings.filter(posting_id__in=ids)
+        return (
+            (pk, vector, status == 'active' and moderation == 'approved', 0)
+            for pk, vector, status, moderation in embeddings.values_list(
+                'posting_id', 'vector', 'posting__status', 'posting__moderation_status'
+            ).iterator()
+        )
+    embeddings = ProfileEmbedding.objects.all()
+    if ids is not None:
+        embeddings = embeddings.filter(profile_id__in=ids)
+    return embeddings.values_list(
+        'profile_id', 'vector', 'profile__profile_visible', 'profile__user_id'
+    ).iterator()
+
+
+def build_index(kind, centroids=None):
+    """Index every stored embedding of postings (POSTINGS) or profiles (PROFILES)."""
+    dim = embedding_dim()
+    position = log_position((kind,))
+    ids, visible, user_ids, blobs = [], [], [], []
+    for pk, vector, is_visible, user_id in _rows(kind):
+        vector = bytes(vector)
+        # Rows embedded under another JOB_EMBEDDING_DIM wait for `embed_documents`.
+        if len(vector) == 4 * dim:
+            ids.append(pk)
+            visible.append(is_visible)
+            user_ids.append(user_id)
+            blobs.append(vector)
+    vectors = np.frombuffer(b''.join(blobs), dtype=np.float32).reshape(-1, dim)
+    if centroids is not None and centroids.shape[1] != dim:
+        centroids = None
+    index = AnnIndex.build(ids, visible, user_ids, vectors, kind, centroids)
+    index.start_following(position)
+    return index
+
+
+_indexes = {}
+_build_lock = threading.Lock()
+
+
+def _get_index(kind):
+    if np is None:
+        return None
+    current = _indexes.get(kind)
+    if current is None or not is_current(current):
+        with _build_lock:
+            loaded = _indexes.get(kind)
+            if loaded is None:
+                _indexes[kind] = build_index(kind)
+            else:
+                _indexes[kind] = keep_current(loaded, lambda: build_index(kind, loaded.centroids))
+            current = _indexes[kind]
+    return current
+
+
+def get_job_index():
+    """The process-wide posting index, caught up with other processes' writes; None without NumPy."""
+    return _get_index(POSTINGS)
+
+
+def get_profile_index():
+    """The process-wide profile index, caught up with other processes' writes; None without NumPy."""
+    return _get_index(PROFILES)
+
+
+def loaded_job_index():
+    return _indexes.get(POSTINGS)
+
+
+def loaded_profile_index():
+    return _indexes.get(PROFILES)
+
+
+# -------------------------
+# PAGES
+# -------------------------
+def _page(index, query, cursor, page_size, exclude_user_ids=()):
+    position = decode_cursor(cursor)
+    after = None
+    if isinstance(position, dict) and position.get('p') == 'semantic' and {'s', 'id'} <= set(position):
+        after = (position['s'], position['id'])
+    rows = index.search(query, page_size + 1, exclude_user_ids=exclude_user_ids, after=after)
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        pk, score = rows[-1]
+        next_cursor = encode_cursor({'p': 'semantic', 's': score, 'id': pk})
+    return rows, next_cursor
+
+
+def semantic_job_page(profile, index, cursor=None, page_size=25):
+    """One page of postings most similar to a seeker's profile: ([(job id, score)], next cursor)."""
+    return _page(index, embed_profile(profile), cursor, page_size)
+
+
+def semantic_candidate_page(posting, index, cursor=None, page_size=25):
+    """One page of visible profiles most similar to a posting, leaving out its applicants."""
+    applied = JobApplication.objects.filter(job=posting).values_list('applicant_id', flat=True)
+    return _page(index, embed_posting(posting), cursor, page_size, applied)
@@ -0,0 +1,232 @@
+"""Live events pushed to connected users (new messages, unread counts) over SSE.
+
+`events_view` is an async view: each open connection is a coroutine waiting on its own
+asyncio.Queue, so a worker holds thousands of idle connections without a thread per
+connection. It needs an ASGI server (e.g. `uvicorn jobfinder2340.asgi:application`):
+under WSGI, runserver included, every open stream would tie up a worker thread. The
+stream is therefore off unless settings.JOB_EVENTS_ENABLED is set for an ASGI
+deployment, and the view answers 204 (which stops EventSource from reconnecting) when a
+request still arrives through WSGI.
+
+Events reach the queues in two steps:
+
+* `publish(user_id, kind, data)` hands the event to the broker (settings.JOB_EVENTS_BROKER);
+  it is called from ordinary sync code, usually on transaction commit;
+* the broker delivers it to the Hub of every process, and each Hub fans it out to that
+  user's queues in this process.
+
+InMemoryBroker delivers straight to this process's Hub, which is all a single worker
+(or a test) needs. DatabaseBroker writes events to the UserEvent table and each process
+polls it by primary key, so several workers can share events through the database.
+Another transport (Redis pub/sub, Postgres LISTEN/NOTIFY) is a Broker subclass with
+`publish` and `start`.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import UserEvent
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# -------------------------
+# HUB
+# -------------------------
+class Hub:
+    """In-process fan-out: the open connections' queues, by user id.
+
+    Subscribing happens on the event loop; `dispatch` may be called from any thread.
+    """
+
+    def __init__(self):
+        self.queues = defaultdict(set)
+        self.loop = None
+
+    def subscribe(self, user_id, maxsize=None):
+        self.loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=maxsize or _setting('JOB_EVENTS_QUEUE_SIZE', 100))
+        self.queues[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        queues = self.queues.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.queues[user_id]
+
+    def connections(self):
+        return sum(len(queues) for queues in self.queues.values())
+
+    def dispatch(self, user_id, event):
+        loop = self.loop
+        if loop is None or user_id not in self.queues:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._deliver(user_id, event)
+        elif not loop.is_closed():
+            loop.call_soon_threadsafe(self._deliver, user_id, event)
+
+    def _deliver(self, user_id, event):
+        for queue in list(self.queues.get(user_id, ())):
+            if queue.full():
+                # A stalled client loses its oldest event rather than growing without bound.
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+
+# -------------------------
+# BROKERS
+# -------------------------
+class Broker:
+    """Carries published events to the Hub of every process."""
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def publish(self, user_id, event):
+        raise NotImplementedError
+
+    def publish_many(self, events):
+        """Publish (user_id, event) pairs; brokers may batch them."""
+        for user_id, event in events:
+            self.publish(user_id, event)
+
+    async def start(self):
+        """Start delivering other processes' events to this Hub (once per process)."""
+
+    async def stop(self):
+        pass
+
+
+class InMemoryBroker(Broker):
+    """Single-process broker: publishing dispatches straight to the local Hub."""
+
+    def publish(self, user_id, event):
+        self.hub.dispatch(user_id, event)
+
+
+class DatabaseBroker(Broker):
+    """Relays events through the UserEvent table, polled every JOB_EVENTS_POLL_INTERVAL
+    seconds by primary key, so any number of processes share them."""
+
+    def __init__(self, hub):
+        super().__init__(hub)
+        self.task = None
+        self.last_id = None
+
+    def publish(self, user_id, event):
+        UserEvent.objects.create(user_id=user_id, kind=event['kind'], data=event['data'])
+
+    def publish_many(self, events):
+        UserEvent.objects.bulk_create(
+            [UserEvent(user_id=user_id, kind=event['kind'], data=event['data']) for user_id, event in events],
+            batch_size=1000,
+        )
+
+    async def start(self):
+        if self.task is None or self.task.done():
+            self.last_id = await sync_to_async(self._latest_id)()
+            self.task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def _latest_id(self):
+        return UserEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    def _fetch(self, after_id, limit=500):
+        return list(
+            UserEvent.objects.filter(id__gt=after_id).order_by('id').values_list('id', 'user_id', 'kind', 'data')[:limit]
+        )
+
+    def prune(self):
+        cutoff = timezone.now() - timedelta(seconds=_setting('JOB_EVENTS_RETENTION', 300))
+        UserEvent.objects.filter(created_at__lt=cutoff).delete()
+
+    async def _poll(self):
+        interval = _setting('JOB_EVENTS_POLL_INTERVAL', 0.5)
+        polls = 0
+        while True:
+            rows = await sync_to_async(self._fetch)(self.last_id)
+            for pk, user_id, kind, data in rows:
+                self.last_id = pk
+                self.hub.dispatch(user_id, {'kind': kind, 'data': data})
+            polls += 1
+            if polls % 1000 == 0:
+                await sync_to_async(self.prune)()
+            if not rows:
+                await asyncio.sleep(interval)
+
+
+_hub = Hub()
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_hub():
+    return _hub
+
+
+def get_broker():
+    """This process's broker, built from settings.JOB_EVENTS_BROKER on first use."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(_setting('JOB_EVENTS_BROKER', 'jobs.events.InMemoryBroker'))(_hub)
+    return _broker
+
+
+def publish(user_id, kind, data):
+    get_broker().publish(user_id, {'kind': kind, 'data': data})
+
+
+def publish_many(events):
+    """Publish (user_id, kind, data) triples in one go."""
+    get_broker().publish_many([(user_id, {'kind': kind, 'data': data}) for user_id, kind, data in events])
+
+
+# -------------------------
+# STREAM
+# -------------------------
+def format_event(event):
+    return f"event: {event['kind']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+async def stream(user_id, initial=()):
+    """Server-sent events for one connection: `initial` events first, then everything
+    published to the user, with a comment line as keep-alive when idle."""
+    broker = get_broker()
+    await broker.start()
+    queue = _hub.subscribe(user_id)
+    keepalive = _setting('JOB_EVENTS_KEEPALIVE', 15)
+    try:
+        yield f"retry: {_setting('JOB_EVENTS_RETRY_MS', 5000)}\n\n"
+        for event in initial:
+            yield format_event(event)
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+            else:
+                yield format_event(event)
+    finally:
+        _hub.unsubscribe(user_id, queue)
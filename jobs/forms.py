@@ -2,6 +2,7 @@ from django import forms
 from .models import JobSeekerProfile
 from .models import JobPosting
 from .models import Message
+from .skills import dedupe_skills
 from django.contrib.auth import get_user_model
 
 class JobSeekerProfileForm(forms.ModelForm):
@@ -16,6 +17,9 @@ class JobSeekerProfileForm(forms.ModelForm):
             'links': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'LinkedIn: linkedin.com/in/yourname\nGitHub: github.com/yourname'}),
         }
 
+    def clean_skills(self):
+        return dedupe_skills(self.cleaned_data.get('skills'))
+
 
 class JobPostingForm(forms.ModelForm):
     class Meta:
@@ -37,6 +41,15 @@ class JobPostingForm(forms.ModelForm):
             'status': forms.Select(attrs={'class': 'form-control'}),
         }
 
+    def clean_required_skills(self):
+        return dedupe_skills(self.cleaned_data.get('required_skills'))
+
+
+class BulkMessageForm(forms.Form):
+    """One message to every applicant of a posting (see jobs.messaging.bulk_send)."""
+    subject = forms.CharField(max_length=255, required=False, widget=forms.TextInput(attrs={'class': 'form-control'}))
+    body = forms.CharField(widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 4}))
+
 
 class PrivacySettingsForm(forms.ModelForm):
     class Meta:
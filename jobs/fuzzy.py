@@ -0,0 +1,179 @@
+"""Typo-tolerant matching of skills and title words.
+
+Each vocabulary (skills, posting title words) keeps a trigram inverted index next to
+its prefix index in jobs/autocomplete.py. A misspelled term is looked up by its
+trigrams to get a short list of candidates ranked by Jaccard similarity, and the
+closest candidate within a small edit distance wins. Nothing here scans postings.
+"""
+import re
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+WORD_RE = re.compile(r'[a-z0-9+#]+')
+
+
+def trigrams(term):
+    """Character trigrams of a term, padded like pg_trgm so word starts weigh more."""
+    grams = set()
+    for word in term.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def edit_distance(a, b):
+    """Optimal string alignment distance (Levenshtein plus adjacent transpositions)."""
+    previous2, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cost = ca != cb
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def max_edits(term):
+    return 1 if len(term) <= 5 else 2 if len(term) <= 10 else 3
+
+
+class TrigramIndex:
+    """Inverted index from trigram to the terms containing it."""
+
+    def __init__(self):
+        self._grams = {}
+        self._postings = defaultdict(set)
+
+    def __len__(self):
+        return len(self._grams)
+
+    def add(self, term):
+        if term in self._grams:
+            return
+        grams = frozenset(trigrams(term))
+        self._grams[term] = grams
+        for gram in grams:
+            self._postings[gram].add(term)
+
+    def remove(self, term):
+        for gram in self._grams.pop(term, ()):
+            terms = self._postings[gram]
+            terms.discard(term)
+            if not terms:
+                del self._postings[gram]
+
+    def similar(self, term, threshold, limit=20):
+        """Up to `limit` (term, jaccard) pairs at or above `threshold`, best first."""
+        grams = trigrams(term)
+        if not grams:
+            return []
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+        scored = []
+        for candidate, overlap in shared.items():
+            jaccard = overlap / (len(grams) + len(self._grams[candidate]) - overlap)
+            if jaccard >= threshold and candidate != term:
+                scored.append((candidate, jaccard))
+        scored.sort(key=lambda pair: pair[1], reverse=True)
+        return scored[:limit]
+
+
+def correct_term(prefix_index, term):
+    """Return the canonical term `term` most likely meant, or None to leave it alone.
+
+    Terms used by at least JOB_FUZZY_TRUSTED_COUNT documents are taken as spelled
+    correctly; anything rarer is replaced by the closest, more common candidate.
+    """
+    if not getattr(settings, 'JOB_FUZZY_MATCHING', True) or not term:
+        return None
+    own_count = prefix_index.count(term)
+    if own_count >= getattr(settings, 'JOB_FUZZY_TRUSTED_COUNT', 2):
+        return None
+    threshold = getattr(settings, 'JOB_FUZZY_MIN_SIMILARITY', 0.2)
+    best = None
+    for candidate, jaccard in prefix_index.trigrams.similar(term, threshold):
+        if prefix_index.count(candidate) <= own_count:
+            continue
+        distance = edit_distance(term, candidate)
+        if distance > max_edits(term):
+            continue
+        key = (distance, -jaccard, -prefix_index.count(candidate))
+        if best is None or key < best[0]:
+            best = (key, candidate)
+    return best[1] if best else None
+
+
+def correct_skills(vocabulary, names):
+    """Map each normalized skill name to its correction ({} if all look right)."""
+    index = vocabulary.indexes['skills']
+    corrections = {}
+    for name in names:
+        fixed = correct_term(index, name)
+        if fixed:
+            corrections[name] = fixed
+    return corrections
+
+
+def misspellings(vocabulary, names):
+    """The inverse of `correct_skills`: {name: [skills that get corrected to it]}."""
+    if not getattr(settings, 'JOB_FUZZY_MATCHING', True):
+        return {}
+    index = vocabulary.indexes['skills']
+    threshold = getattr(settings, 'JOB_FUZZY_MIN_SIMILARITY', 0.2)
+    trusted = getattr(settings, 'JOB_FUZZY_TRUSTED_COUNT', 2)
+    found = {}
+    for name in names:
+        # Trigram similarity is symmetric, so every term correcting to `name` is among
+        # the terms similar to it.
+        typos = [
+            candidate for candidate, _ in index.trigrams.similar(name, threshold, limit=None)
+            if index.count(candidate) < trusted and correct_term(index, candidate) == name
+        ]
+        if typos:
+            found[name] = typos
+    return found
+
+
+def correct_title(vocabulary, text):
+    """Return (corrected text, {word: correction}) for a title substring filter.
+
+    Words that are a prefix of a known title word are left alone, since the title
+    filter is a substring match and "dev" legitimately matches "developer".
+    """
+    index = vocabulary.indexes['title_words']
+    corrections = {}
+    for word in WORD_RE.findall(text.lower()):
+        if index.complete(word, limit=1):
+            continue
+        fixed = correct_term(index, word)
+        if fixed:
+            corrections[word] = fixed
+    if not corrections:
+        return text, {}
+    pattern = re.compile(r'\b(' + '|'.join(map(re.escape, corrections)) + r')\b', re.IGNORECASE)
+    return pattern.sub(lambda m: corrections[m.group(0).lower()], text), corrections
+
+
+def keyword_expansions(vocabulary, tokens):
+    """For keyword (FTS) search: {token: [alternatives]} for tokens that look misspelled.
+
+    The original token is kept as an alternative, so expansion only ever adds hits.
+    """
+    expansions = {}
+    for token in tokens:
+        alternatives = []
+        for field in ('title_words', 'skills'):
+            index = vocabulary.indexes[field]
+            if index.complete(token, limit=1):
+                alternatives = []
+                break
+            fixed = correct_term(index, token)
+            if fixed and fixed not in alternatives:
+                alternatives.append(fixed)
+        if alternatives:
+            expansions[token] = alternatives
+    return expansions
@@ -0,0 +1,141 @@
+"""Offline geocoding of posting locations and radius filtering.
+
+Locations are resolved against a local gazetteer file (settings.JOB_GEOCODER_GAZETTEER,
+a CSV of name/region/country/latitude/longitude) so nothing is fetched over the network.
+Every lookup, hit or miss, is remembered in the GeocodeCache table.
+"""
+import csv
+import math
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+from .models import GeocodeCache
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LAT = 69.0
+
+# Locations that deliberately have no coordinates.
+NON_PLACES = {'remote', 'anywhere', 'worldwide', 'remote only', 'hybrid'}
+
+_PUNCTUATION_RE = re.compile(r'[^\w\s,.-]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_location(text):
+    text = _PUNCTUATION_RE.sub(' ', (text or '').lower())
+    parts = [_WHITESPACE_RE.sub(' ', part).strip(' .') for part in text.split(',')]
+    return ', '.join(part for part in parts if part)[:255]
+
+
+@lru_cache(maxsize=1)
+def load_gazetteer(path=None):
+    """Read the gazetteer once per process into a {normalized key: (lat, lng)} dict."""
+    path = path or settings.JOB_GEOCODER_GAZETTEER
+    places = {}
+    with open(path, newline='', encoding='utf-8') as handle:
+        rows = csv.DictReader(line for line in handle if not line.startswith('#'))
+        for row in rows:
+            coords = (float(row['latitude']), float(row['longitude']))
+            name = normalize_location(row['name'])
+            for qualifier in (row['region'], row['country']):
+                if qualifier:
+                    places.setdefault(f'{name}, {normalize_location(qualifier)}', coords)
+            places.setdefault(name, coords)
+    return places
+
+
+def lookup_gazetteer(query):
+    """Resolve a normalized location: exact key, then "city, region", then the city alone."""
+    if not query or query in NON_PLACES:
+        return None
+    places = load_gazetteer()
+    parts = query.split(', ')
+    for candidate in (query, ', '.join(parts[:2]), parts[0]):
+        if candidate in places:
+            return places[candidate]
+    return None
+
+
+def geocode(location):
+    """Return (latitude, longitude) for a free-text location, or None."""
+    query = normalize_location(location)
+    if not query:
+        return None
+    cached = GeocodeCache.objects.filter(query=query).values_list('latitude', 'longitude').first()
+    if cached is None:
+        coords = lookup_gazetteer(query)
+        lat, lng = coords or (None, None)
+        GeocodeCache.objects.get_or_create(query=query, defaults={'latitude': lat, 'longitude': lng})
+        return coords
+    if cached[0] is None:
+        return None
+    return cached
+
+
+def geocode_posting(posting):
+    """Set `posting.latitude/longitude` from its location (does not save)."""
+    posting.latitude, posting.longitude = geocode(posting.location) or (None, None)
+
+
+def parse_point(value):
+    """Parse "lat,lng" into floats, or None if it is not a valid coordinate pair."""
+    try:
+        lat, lng = (float(part) for part in (value or '').split(','))
+    except ValueError:
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+def parse_radius(value):
+    """Parse a radius in miles (negative clamps to 0), or None if missing or not a finite number."""
+    try:
+        radius = float(value or '')
+    except ValueError:
+        return None
+    if not math.isfinite(radius):
+        return None
+    return max(radius, 0)
+
+
+def bounding_box(lat, lng, radius_miles):
+    """Latitude/longitude ranges that contain every point within `radius_miles`."""
+    dlat = radius_miles / MILES_PER_DEGREE_LAT
+    dlng = radius_miles / (MILES_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+    return (lat - dlat, lat + dlat), (lng - dlng, lng + dlng)
+
+
+def distance_miles(lat1, lng1, lat2, lng2):
+    """Haversine distance in miles between two points."""
+    a = (
+        math.sin(math.radians(lat2 - lat1) / 2) ** 2
+        + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2))
+        * math.sin(math.radians(lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a))
+
+
+def distance_expression(lat, lng):
+    """Haversine distance in miles from (lat, lng) to each row's coordinates."""
+    lat_r = math.radians(lat)
+    a = (
+        Power(Sin((Radians(F('latitude')) - lat_r) / 2), 2)
+        + math.cos(lat_r) * Cos(Radians(F('latitude')))
+        * Power(Sin((Radians(F('longitude')) - math.radians(lng)) / 2), 2)
+    )
+    return 2 * EARTH_RADIUS_MILES * ASin(Sqrt(a))
+
+
+def within_radius(queryset, lat, lng, radius_miles):
+    """Filter to rows within `radius_miles`: indexed box prefilter, then exact haversine."""
+    lat_range, lng_range = bounding_box(lat, lng, radius_miles)
+    return queryset.filter(
+        latitude__range=lat_range, longitude__range=lng_range,
+    ).annotate(
+        distance_miles=distance_expression(lat, lng),
+    ).filter(distance_miles__lte=radius_miles)
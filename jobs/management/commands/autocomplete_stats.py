@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobs.autocomplete import Autocomplete
+
+
+class Command(BaseCommand):
+    help = "Build the autocomplete prefix index and report its size and lookup latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=2000, help='Lookups to time per field.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        index = Autocomplete.build()
+        self.stdout.write(f'Built in {(time.perf_counter() - started) * 1000:.1f} ms')
+
+        for field, stats in index.stats().items():
+            self.stdout.write(f"{field}: " + ', '.join(f'{key}={value}' for key, value in stats.items()))
+
+        for field, prefix_index in index.indexes.items():
+            prefixes = sorted({key[:n] for key, _ in prefix_index._entries for n in (1, 2, 3, 4)})
+            if not prefixes:
+                continue
+            lookups = [prefixes[i % len(prefixes)] for i in range(options['queries'])]
+            started = time.perf_counter()
+            for prefix in lookups:
+                # Bypass the short-prefix memo to time the real range scan.
+                prefix_index._hot.clear()
+                prefix_index.complete(prefix)
+            per_query = (time.perf_counter() - started) / len(lookups) * 1_000_000
+            self.stdout.write(f'{field}: {per_query:.1f} µs per lookup over {len(prefixes)} distinct prefixes')
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from jobs.cache import POSTINGS, PROFILES
+from jobs.changelog import record_change
+from jobs.models import JobPosting, JobSeekerProfile
+from jobs.skills import bulk_sync_posting_skills, bulk_sync_profile_skills
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the Skill table links from the comma-separated skill text of every posting "
+        "and profile. Run it after changing the skill synonym dictionary."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        postings = self._backfill(
+            JobPosting.objects.only('id', 'required_skills'), bulk_sync_posting_skills, batch_size
+        )
+        profiles = self._backfill(
+            JobSeekerProfile.objects.only('id', 'skills'), bulk_sync_profile_skills, batch_size
+        )
+        # Every in-memory index rebuilds from the re-parsed skills.
+        record_change(POSTINGS)
+        record_change(PROFILES)
+        self.stdout.write(self.style.SUCCESS(
+            f'Synced skills for {postings} posting(s) and {profiles} profile(s).'
+        ))
+
+    def _backfill(self, queryset, sync, batch_size):
+        """Walk the table in primary-key order so each batch is an indexed range read."""
+        total = 0
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+            if not batch:
+                return total
+            with transaction.atomic():
+                total += sync(batch)
+            last_pk = batch[-1].pk
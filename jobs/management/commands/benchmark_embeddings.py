@@ -0,0 +1,101 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.cache import POSTINGS, PROFILES
+from jobs.embeddings import AnnIndex, build_index, embedding_dim, np
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else 0.0
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure recall and latency of the semantic IVF index against brute force, on the "
+        "stored embeddings or on a synthetic corpus grown from them (--synthetic)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--side', choices=['jobs', 'candidates'], default='jobs',
+                            help="'jobs' queries postings with profiles, 'candidates' the reverse.")
+        parser.add_argument('--synthetic', type=int, default=0,
+                            help='Index this many synthetic documents near the stored ones instead.')
+        parser.add_argument('--noise', type=float, default=0.6,
+                            help='Spread of the synthetic documents around the stored ones.')
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--limit', type=int, default=25, help='Result list length (k).')
+        parser.add_argument('--probes', default='1,2,4,8,16,32', help='Comma-separated probe counts to try.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if np is None:
+            raise CommandError('The semantic index needs NumPy.')
+        try:
+            probe_counts = sorted({int(value) for value in options['probes'].split(',') if value.strip()})
+        except ValueError:
+            raise CommandError('--probes expects comma-separated integers.')
+        rng = np.random.default_rng(options['seed'])
+        limit = options['limit']
+        documents, queries = (POSTINGS, PROFILES) if options['side'] == 'jobs' else (PROFILES, POSTINGS)
+
+        started = time.perf_counter()
+        index = build_index(documents)
+        query_vectors = build_index(queries).vectors
+        if options['synthetic']:
+            # Topics scattered around the stored documents, documents around the topics,
+            # so the synthetic corpus is clustered at two scales like real text.
+            base = index.vectors if len(index.vectors) else self._random_unit(rng, 64)
+            base = self._around(rng, base, max(1, int(options['synthetic'] ** 0.5)), options['noise'])
+            vectors = self._around(rng, base, options['synthetic'], options['noise'])
+            ids = np.arange(1, len(vectors) + 1)
+            index = AnnIndex.build(ids, np.ones(len(ids), dtype=bool), np.zeros(len(ids), dtype=np.int64), vectors)
+            query_vectors = self._around(rng, base, options['queries'], options['noise'])
+        build_seconds = time.perf_counter() - started
+        if not len(index.ids):
+            raise CommandError('No stored embeddings to index; run `manage.py embed_documents` first.')
+        if not len(query_vectors):
+            query_vectors = self._around(rng, index.vectors, options['queries'], options['noise'])
+        query_vectors = query_vectors[rng.permutation(len(query_vectors))[:options['queries']]]
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{options['side']}: {len(index.ids)} documents, dim {embedding_dim()}, "
+            f"{len(index.centroids)} list(s), {len(query_vectors)} queries, k={limit}"
+        ))
+        self.stdout.write(f'  index built in {build_seconds:.2f}s, {index.nbytes() / 2 ** 20:.1f} MiB')
+
+        exact, timings = [], []
+        for query in query_vectors:
+            began = time.perf_counter()
+            exact.append({pk for pk, _ in index.search(query, limit, exact=True)})
+            timings.append(time.perf_counter() - began)
+        self.stdout.write(
+            f'  {"brute force":<12} recall 100.0%  p50 {percentile(timings, 0.5) * 1000:7.2f} ms'
+            f'  p95 {percentile(timings, 0.95) * 1000:7.2f} ms'
+        )
+        for probes in probe_counts:
+            hits, timings = [], []
+            for query, expected in zip(query_vectors, exact):
+                began = time.perf_counter()
+                found = {pk for pk, _ in index.search(query, limit, probes=probes)}
+                timings.append(time.perf_counter() - began)
+                if expected:
+                    hits.append(len(found & expected) / len(expected))
+            recall = sum(hits) / len(hits) if hits else 1.0
+            self.stdout.write(
+                f'  {f"{probes} probe(s)":<12} recall {recall:6.1%}  p50 {percentile(timings, 0.5) * 1000:7.2f} ms'
+                f'  p95 {percentile(timings, 0.95) * 1000:7.2f} ms'
+            )
+
+    def _random_unit(self, rng, count):
+        vectors = rng.standard_normal((count, embedding_dim())).astype(np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def _around(self, rng, base, count, noise):
+        """`count` unit vectors scattered around randomly chosen rows of `base`."""
+        vectors = base[rng.integers(0, len(base), count)]
+        vectors = vectors + self._random_unit(rng, count) * noise
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (vectors / norms).astype(np.float32)
@@ -0,0 +1,141 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from jobs.models import (
+    JobApplication, JobPosting, JobRecommendation, Message, PostingTrend, SavedSearch, SavedSearchTerm,
+    SearchAlert, Thread,
+)
+from jobs.recommendations import candidate_scores, job_scores
+from jobs.search import filter_postings
+
+# A "SCAN <table>" step reads every row of the table, or with "USING [COVERING] INDEX"
+# every entry of the index.
+FULL_SCAN_RE = re.compile(r'^SCAN (?P<table>\w+)(?: AS \w+)?(?: USING (?:COVERING )?INDEX \w+)?$')
+
+# A "SEARCH" step constrained only by equality on these columns still reads a whole
+# status class (e.g. every visible posting).
+SEARCH_RE = re.compile(r'^SEARCH (?P<table>\w+)(?: AS \w+)? USING (?:COVERING )?INDEX \w+ \((?P<terms>[^)]*)\)$')
+BROAD_COLUMNS = {'status', 'moderation_status'}
+
+# Broad steps that are expected, by (query label, table), with the reason.
+EXPECTED_BROAD_STEPS = {
+    ('job_search_view', 'jobs_jobposting'):
+        'walks visible postings newest first and stops after one page',
+    ('job_search_view (skills)', 'jobs_jobposting'):
+        'walks visible postings newest first, probing the skill per row, and stops after one page',
+    ('job_search_view (near)', 'jobs_jobposting'):
+        'walks visible postings newest first, testing the bounding box per row, and stops after one page',
+    ('recommended_jobs_view (past stored)', 'jobs_jobposting'):
+        'only reached past the materialized recommendations; reads the covering index only',
+    ('moderation_queue_view', 'jobs_jobposting'):
+        'the pending queue is small and read newest first, one page at a time',
+}
+
+
+def view_queries():
+    """The main query of each hot view, built the same way the view builds it.
+
+    Ids are placeholders: SQLite picks the plan from the shape of the query and the
+    available indexes, not from the values.
+    """
+    now = timezone.now()
+    visible = filter_postings({})[0]
+    weights = {1: 2.5, 2: 1.5, 3: 1.0}
+    return [
+        ('job_search_view', visible.order_by('-created_at', '-id')[:21]),
+        ('job_search_view (next page)', visible.filter(
+            Q(created_at__lte=now), Q(created_at__lt=now) | Q(id__lt=1)
+        ).order_by('-created_at', '-id')[:21]),
+        ('job_search_view (skills)', filter_postings({'skills': ''})[0].filter(
+            skill_tags=1
+        ).order_by('-created_at', '-id')[:21]),
+        ('job_search_view (near)', filter_postings({'near': '33.75,-84.39', 'radius': '25'})[0].order_by(
+            '-created_at', '-id'
+        )[:21]),
+        ('recommended_jobs_view', JobRecommendation.objects.filter(
+            profile_id=1
+        ).order_by('-score', '-posted_at', '-job_id')[:26]),
+        ('recommended_jobs_view (past stored)', job_scores(weights).exclude(
+            jobposting_id__in=JobRecommendation.objects.filter(profile_id=1).values('job_id')
+        )[:26]),
+        ('posting_recommendations_view', candidate_scores(JobPosting(pk=1), weights)[:26]),
+        ('my_postings_view', JobPosting.objects.filter(recruiter_id=1)),
+        ('moderation_queue_view', JobPosting.objects.filter(
+            moderation_status='pending'
+        ).order_by('-created_at')[:20]),
+        ('apply_to_posting_view', JobApplication.objects.filter(job_id=1, applicant_id=1)[:1]),
+        ('trending_jobs_view', PostingTrend.objects.filter(visible=True, score__gt=0).select_related(
+            'posting__recruiter'
+        ).order_by('-score', '-posting_id')[:20]),
+        ('percolate', SavedSearch.objects.filter(
+            id__in=SavedSearchTerm.objects.filter(term__in=['*', 'kw:pyt', 'flag:remote']).values('search_id')
+        ).exclude(user_id=1).order_by().values_list('id', 'user_id', 'params')),
+        ('search_alerts_view', SearchAlert.objects.filter(user_id=1).select_related(
+            'posting__recruiter', 'search'
+        ).order_by('-created_at', '-id')[:26]),
+        ('posting_applicants_view', JobApplication.objects.filter(job_id=1).select_related('applicant')),
+        ('inbox_view', Message.objects.filter(recipient_id=1).select_related('sender').order_by(
+            '-created_at', '-id'
+        )[:26]),
+        ('conversation_view', Message.objects.filter(thread_id=1).select_related('sender').order_by('created_at', 'id')),
+        ('threads_view', Thread.objects.filter(Q(user_low_id=1) | Q(user_high_id=1)).select_related(
+            'user_low', 'user_high', 'last_sender', 'posting'
+        ).order_by('-last_message_at', '-id')[:26]),
+    ]
+
+
+def broad_steps(plan):
+    """The tables of plan steps that read a whole table, index or status class."""
+    tables = []
+    for step in plan:
+        scan = FULL_SCAN_RE.match(step)
+        if scan:
+            tables.append(scan.group('table'))
+            continue
+        search = SEARCH_RE.match(step)
+        if search:
+            terms = search.group('terms').split(' AND ')
+            if all(term.endswith('=?') and term[:-2] in BROAD_COLUMNS for term in terms):
+                tables.append(search.group('table'))
+    return tables
+
+
+def explain(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN QUERY PLAN on each hot view's main query and fail on full table or index "
+        "scans that are not listed in EXPECTED_BROAD_STEPS."
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('check_query_plans reads SQLite query plans; run it against SQLite.')
+
+        failures = []
+        for name, queryset in view_queries():
+            plan = explain(queryset)
+            broad = broad_steps(plan)
+            expected = [EXPECTED_BROAD_STEPS[name, table] for table in broad if (name, table) in EXPECTED_BROAD_STEPS]
+            scans = [table for table in broad if (name, table) not in EXPECTED_BROAD_STEPS]
+            status = self.style.ERROR('FULL SCAN') if scans else self.style.SUCCESS('ok')
+            self.stdout.write(f'{name}: {status}')
+            for step in plan:
+                self.stdout.write(f'    {step}')
+            for reason in expected:
+                self.stdout.write(f'    (expected: {reason})')
+            if scans:
+                failures.append(f"{name} ({', '.join(scans)})")
+
+        if failures:
+            raise CommandError('Full scans in: ' + '; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('All query plans use indexes.'))
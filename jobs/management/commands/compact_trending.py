@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from jobs.trending import compact, rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-base the decayed application counters behind the trending page so stored scores "
+        "stay small, dropping negligible ones. Run it periodically (e.g. daily from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Recompute every score from the applications instead (one full pass).')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            postings = rebuild()
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt trend scores for {postings} posting(s).'))
+            return
+        kept, removed = compact()
+        self.stdout.write(self.style.SUCCESS(
+            f'Re-based {kept} trend score(s); removed {removed} negligible one(s).'
+        ))
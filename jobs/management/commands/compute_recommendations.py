@@ -0,0 +1,119 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from jobs.models import JobPosting, JobSeekerProfile
+from jobs.recommendations import affected_profile_ids, compute_shard, refresh_idf_weights
+
+
+def _init_worker():
+    """Give each worker process its own database connection.
+
+    Forked workers inherit the parent's open connection, which must not be shared;
+    closing it here makes Django open a fresh one on first use. Spawned workers start
+    without Django configured, so set it up first.
+    """
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    connections.close_all()
+
+
+def _shards(ids, size):
+    ids = sorted(ids)
+    return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+
+def _parse_since(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'--since expects a date or datetime (ISO 8601), got {value!r}.')
+        moment = datetime.combine(day, datetime.min.time())
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the materialized seeker recommendations (JobRecommendation rows) in "
+        "parallel shards. A full run first refreshes the frozen IDF skill weights, so run "
+        "it periodically. With --since, only seekers who changed, or whose lists postings "
+        "changed since then could affect, are recomputed under the current weights."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Only recompute for changes at or after this date/datetime.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (1 runs everything in this process).')
+        parser.add_argument('--shard-size', type=int, default=500, help='Seekers or postings per shard.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk write.')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        shard_size = max(1, options['shard_size'])
+        batch_size = max(1, options['batch_size'])
+        timings = {}
+        started = time.perf_counter()
+
+        # Forked workers must not inherit this process's connection.
+        connections.close_all()
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) if workers > 1 else None
+        run = pool.map if pool else map
+        try:
+            phase = time.perf_counter()
+            if options['since']:
+                since = _parse_since(options['since'])
+                posting_ids = list(JobPosting.objects.filter(updated_at__gte=since).values_list('id', flat=True))
+                profile_ids = set(JobSeekerProfile.objects.filter(updated_at__gte=since).values_list('id', flat=True))
+                self.stdout.write(
+                    f'{len(posting_ids)} posting(s) and {len(profile_ids)} seeker(s) changed since {since:%Y-%m-%d %H:%M}.'
+                )
+                for affected in run(affected_profile_ids, _shards(posting_ids, shard_size)):
+                    profile_ids |= affected
+            else:
+                # Every seeker is rescored below, so the weights can move now.
+                skills = refresh_idf_weights(batch_size)
+                self.stdout.write(f'Refreshed the IDF weights of {skills} skill(s).')
+                profile_ids = JobSeekerProfile.objects.values_list('id', flat=True)
+            shards = _shards(profile_ids, shard_size)
+            timings['plan'] = time.perf_counter() - phase
+
+            phase = time.perf_counter()
+            totals = {'profiles': 0, 'rows': 0, 'created': 0, 'updated': 0, 'deleted': 0}
+            worker_timings = {'score': 0.0, 'write': 0.0}
+            for result in run(compute_shard, shards, [batch_size] * len(shards)):
+                for key in totals:
+                    totals[key] += result[key]
+                for key, seconds in result['timings'].items():
+                    worker_timings[key] += seconds
+            timings['compute'] = time.perf_counter() - phase
+        finally:
+            if pool:
+                pool.shutdown()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Seekers: {totals['profiles']} in {len(shards)} shard(s) on {workers} worker(s); "
+            f"{totals['rows']} row(s) kept, {totals['created']} created, "
+            f"{totals['updated']} updated, {totals['deleted']} deleted."
+        )
+        self.stdout.write(
+            f"Phases (wall): plan {timings['plan']:.2f}s, compute {timings['compute']:.2f}s; "
+            f"within workers (summed): score {worker_timings['score']:.2f}s, "
+            f"write {worker_timings['write']:.2f}s."
+        )
+        rate = totals['profiles'] / elapsed if elapsed else 0.0
+        row_rate = totals['rows'] / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f'Done in {elapsed:.2f}s: {rate:.0f} seekers/s, {row_rate:.0f} rows/s.'
+        ))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobs.models import JobPosting, SimilarPosting
+from jobs.similar import per_posting, refill_similar
+
+
+class Command(BaseCommand):
+    help = "Rebuild every posting's precomputed \"similar jobs\" list (SimilarPosting rows)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Postings per id range read.')
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        started = time.perf_counter()
+        visible = JobPosting.objects.filter(status='active', moderation_status='approved')
+        removed, _ = SimilarPosting.objects.exclude(posting__in=visible).delete()
+        total = 0
+        last_pk = 0
+        while True:
+            ids = list(visible.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            refill_similar(ids)
+            total += len(ids)
+            last_pk = ids[-1]
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt up to {per_posting()} neighbours for {total} posting(s) in {elapsed:.2f}s; '
+            f'{removed} row(s) of hidden postings removed.'
+        ))
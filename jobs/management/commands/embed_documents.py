@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from jobs.cache import POSTINGS, PROFILES
+from jobs.changelog import record_change
+from jobs.embeddings import embed_posting, embed_profile
+from jobs.models import JobPosting, JobSeekerProfile, PostingEmbedding, ProfileEmbedding
+
+
+class Command(BaseCommand):
+    help = (
+        "Store the hashed text embedding of every posting and profile. Run it once after "
+        "migrating, and again after changing JOB_EMBEDDING_DIM or the skill synonyms."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        postings = self._embed(
+            JobPosting.objects.only('id', 'title', 'description', 'required_skills'),
+            lambda posting: PostingEmbedding(posting_id=posting.pk, vector=embed_posting(posting).tobytes()),
+            PostingEmbedding, 'posting', batch_size,
+        )
+        profiles = self._embed(
+            JobSeekerProfile.objects.only('id', 'headline', 'skills', 'education', 'work_experience'),
+            lambda profile: ProfileEmbedding(profile_id=profile.pk, vector=embed_profile(profile).tobytes()),
+            ProfileEmbedding, 'profile', batch_size,
+        )
+        # Indexes in running processes rebuild from the new vectors.
+        record_change(POSTINGS)
+        record_change(PROFILES)
+        self.stdout.write(self.style.SUCCESS(
+            f'Embedded {postings} posting(s) and {profiles} profile(s).'
+        ))
+
+    def _embed(self, queryset, make, model, key, batch_size):
+        """Walk the table in primary-key order, upserting one batch of vectors at a time."""
+        total = 0
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+            if not batch:
+                return total
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    [make(obj) for obj in batch],
+                    update_conflicts=True, unique_fields=[key], update_fields=['vector', 'updated_at'],
+                )
+            total += len(batch)
+            last_pk = batch[-1].pk
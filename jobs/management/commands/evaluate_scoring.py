@@ -0,0 +1,85 @@
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from jobs.models import JobApplication, JobPosting, JobSeekerProfile
+from jobs.recommendations import SCORING_MODES, skill_weights, top_jobs, top_profiles
+
+
+def jaccard(a, b):
+    a, b = set(a), set(b)
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def reciprocal_rank(ranked, relevant):
+    for position, item in enumerate(ranked, 1):
+        if item in relevant:
+            return 1 / position
+    return 0.0
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the 'overlap' and 'idf' recommendation scoring offline: how much the top-k "
+        "lists differ, and how well each ranks the jobs seekers actually applied to."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=25, help='List length (k).')
+        parser.add_argument('--seekers', type=int, default=500, help='Seekers to sample (lowest ids).')
+        parser.add_argument('--postings', type=int, default=200, help='Postings to sample (lowest ids).')
+
+    def handle(self, *args, **options):
+        limit = options['limit']
+        applied_jobs = defaultdict(set)
+        applicants = defaultdict(set)
+        for job_id, user_id in JobApplication.objects.values_list('job_id', 'applicant_id').iterator():
+            applied_jobs[user_id].add(job_id)
+            applicants[job_id].add(user_id)
+
+        profiles = JobSeekerProfile.objects.order_by('id').prefetch_related('skill_tags')[:options['seekers']]
+        seekers = [
+            (profile.user_id, [skill.id for skill in profile.skill_tags.all()]) for profile in profiles
+        ]
+        self._compare(
+            'Seeker -> jobs', seekers, applied_jobs, limit,
+            lambda weights: [job_id for job_id, _, _ in top_jobs(weights, limit)],
+        )
+
+        postings = JobPosting.objects.order_by('id').prefetch_related('skill_tags')[:options['postings']]
+        user_of = dict(JobSeekerProfile.objects.values_list('id', 'user_id'))
+        jobs = [(posting.id, [skill.id for skill in posting.skill_tags.all()]) for posting in postings]
+        self._compare(
+            'Posting -> candidates', jobs, applicants, limit,
+            lambda weights: [user_of[pk] for pk, _ in top_profiles(weights, limit)],
+        )
+
+    def _compare(self, label, subjects, relevant, limit, rank):
+        """Rank every subject under each mode and print agreement and hit metrics."""
+        rankings = {mode: {} for mode in SCORING_MODES}
+        timings = {}
+        for mode in SCORING_MODES:
+            started = time.perf_counter()
+            for key, skill_ids in subjects:
+                rankings[mode][key] = rank(skill_weights(skill_ids, mode)) if skill_ids else []
+            timings[mode] = time.perf_counter() - started
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{label} (k={limit}, {len(subjects)} sampled)'))
+        first, second = SCORING_MODES
+        agreement = [jaccard(rankings[first][key], rankings[second][key]) for key, _ in subjects]
+        if agreement:
+            self.stdout.write(f'  top-k overlap ({first} vs {second}): {sum(agreement) / len(agreement):.1%}')
+        judged = [key for key, _ in subjects if relevant.get(key)]
+        for mode in SCORING_MODES:
+            line = f'  {mode:<8} {timings[mode] * 1000:8.1f} ms'
+            if judged:
+                hits = [
+                    len(set(rankings[mode][key]) & relevant[key]) / min(len(relevant[key]), limit)
+                    for key in judged
+                ]
+                mrr = [reciprocal_rank(rankings[mode][key], relevant[key]) for key in judged]
+                line += f'  recall@{limit} {sum(hits) / len(hits):.1%}  MRR {sum(mrr) / len(mrr):.3f}'
+            self.stdout.write(line)
+        if not judged:
+            self.stdout.write('  (no applications to judge against)')
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from jobs.cache import POSTINGS, bump_version
+from jobs.geocoding import geocode
+from jobs.models import JobPosting
+
+
+class Command(BaseCommand):
+    help = "Resolve coordinates for postings that do not have them yet (or all with --all)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-geocode every posting.')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        postings = JobPosting.objects.exclude(location='').only('id', 'location')
+        if not options['all']:
+            postings = postings.filter(latitude__isnull=True)
+
+        resolved = updated = 0
+        batch = []
+        # bulk_update only touches the coordinate columns and skips the save signals.
+        for posting in postings.iterator(chunk_size=options['batch_size']):
+            coords = geocode(posting.location)
+            posting.latitude, posting.longitude = coords or (None, None)
+            resolved += coords is not None
+            batch.append(posting)
+            if len(batch) >= options['batch_size']:
+                updated += JobPosting.objects.bulk_update(batch, ['latitude', 'longitude'])
+                batch = []
+        if batch:
+            updated += JobPosting.objects.bulk_update(batch, ['latitude', 'longitude'])
+
+        bump_version(POSTINGS)
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated {updated} posting(s); {resolved} resolved to coordinates.'
+        ))
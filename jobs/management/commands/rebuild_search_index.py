@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from jobs.messaging import rebuild_message_index
+from jobs.search import fts_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the SQLite FTS5 keyword indexes over visible job postings and messages."
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            raise CommandError('The full-text index is only available on SQLite.')
+        with transaction.atomic():
+            count = rebuild_index()
+            messages = rebuild_message_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} posting(s) and {messages} message(s).'))
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.cache import counters_shared, reset_search_cache_stats, search_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Show search result cache hit/miss counters (needs a shared backend for JOB_COUNTERS_CACHE_ALIAS)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after printing them.')
+
+    def handle(self, *args, **options):
+        if not counters_shared():
+            alias = getattr(settings, 'JOB_COUNTERS_CACHE_ALIAS', 'default')
+            raise CommandError(
+                f"The '{alias}' cache ({settings.CACHES[alias]['BACKEND']}) is private to each process, "
+                'so this command cannot see the server\'s counters. Point JOB_COUNTERS_CACHE_ALIAS at a '
+                'shared backend (Redis, Memcached, database) or read /jobs/admin/search-cache/ instead.'
+            )
+        stats = search_cache_stats()
+        self.stdout.write(f"hits: {stats['hits']}")
+        self.stdout.write(f"misses: {stats['misses']}")
+        self.stdout.write(f"hit rate: {stats['hit_rate']:.1%}")
+        self.stdout.write(f"postings version: {stats['postings_version']}")
+        if options['reset']:
+            reset_search_cache_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset.'))
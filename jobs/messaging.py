@@ -0,0 +1,387 @@
+"""Message threads: one conversation per user pair (and posting), with a stored summary.
+
+Every message belongs to a Thread. `send_message` picks the thread (the thread of the
+message it replies to, else the pair's thread for the posting, created on first use)
+and saves the message; the post_save signal then calls `message_added`, which moves
+the thread's last-message fields forward and adds one to the recipient's unread count
+in a single UPDATE. Reading messages takes the count back down (`message_read`,
+`thread_read`, `mark_all_read`).
+
+Each user's total of unread messages is kept the same way in UnreadCount, so the
+inbox and navbar read one row instead of counting Message. Once the change commits,
+the new message and the new count are pushed to the user's open connections
+(jobs/events.py).
+
+So opening a conversation is one range read of the (thread, created_at) index, and
+the thread list only reads Thread.
+
+On SQLite, message subjects and bodies are also indexed in the `jobs_message_fts` FTS5
+table (created and kept current by migration 0021), together with a token per
+participant, so `search_messages` looks up one user's matches in the index and ranks
+the newest JOB_MESSAGE_SEARCH_CANDIDATES of them with BM25, paging through them by a
+(rank, id) cursor. Other database backends fall back to unranked `icontains`
+matching, newest first.
+"""
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
+from .events import publish, publish_many
+from .models import JobApplication, Message, Thread, UnreadCount
+from .pagination import decode_cursor, encode_cursor, keyset_page
+from .search import fts_available, fts_query, keyword_tokens
+
+PREVIEW_LENGTH = 140
+
+MESSAGE_FTS_TABLE = 'jobs_message_fts'
+
+# BM25 column weights for subject, body and the participant tokens.
+MESSAGE_FTS_WEIGHTS = (3.0, 1.0, 0.0)
+
+
+def pair(user_a_id, user_b_id):
+    """A user pair in the (user_low, user_high) order threads store it in."""
+    return (user_a_id, user_b_id) if user_a_id <= user_b_id else (user_b_id, user_a_id)
+
+
+def _unread_field(recipient_id, sender_id):
+    """The Thread column counting what `recipient_id` has not read from `sender_id`."""
+    return 'unread_low' if recipient_id <= sender_id else 'unread_high'
+
+
+def preview(body):
+    return ' '.join(body.split())[:PREVIEW_LENGTH]
+
+
+def get_thread(user_a_id, user_b_id, posting_id=None, create=True):
+    """The thread between two users about `posting_id` (None for a general one)."""
+    low, high = pair(user_a_id, user_b_id)
+    threads = Thread.objects.filter(user_low_id=low, user_high_id=high, posting_id=posting_id)
+    thread = threads.order_by('id').first()
+    if thread is None and create:
+        try:
+            with transaction.atomic():
+                thread = Thread.objects.create(user_low_id=low, user_high_id=high, posting_id=posting_id)
+        except IntegrityError:
+            # Created concurrently by the other participant.
+            thread = threads.order_by('id').first()
+    return thread
+
+
+def posting_conversation(user_a_id, user_b_id, posting_id):
+    """The pair's threads a posting's conversation shows: the posting's own thread and
+    the general one, which holds messages sent without a posting and those migrated
+    from before threads existed. Returns (posting thread or None, all such threads)."""
+    low, high = pair(user_a_id, user_b_id)
+    threads = list(
+        Thread.objects.filter(user_low_id=low, user_high_id=high)
+        .filter(Q(posting_id=posting_id) | Q(posting__isnull=True))
+        .order_by('id')
+    )
+    own = next((thread for thread in threads if thread.posting_id == posting_id), None)
+    return own, threads
+
+
+def threads_for(user):
+    """A user's threads, most recent first, with both participants and the posting."""
+    return (
+        Thread.objects.filter(Q(user_low=user) | Q(user_high=user))
+        .select_related('user_low', 'user_high', 'last_sender', 'posting')
+    )
+
+
+def send_message(message, posting=None):
+    """Save an unsaved Message (sender, recipient, subject, body, optional reply_to) in
+    its thread: the replied-to message's thread if it is between the same two users,
+    else the pair's thread for `posting`."""
+    thread = None
+    original = message.reply_to
+    if original is not None and original.thread_id is not None:
+        if pair(original.sender_id, original.recipient_id) == pair(message.sender_id, message.recipient_id):
+            thread = original.thread
+    if thread is None:
+        thread = get_thread(message.sender_id, message.recipient_id, posting.pk if posting else None)
+    message.thread = thread
+    message.save()
+    return message
+
+
+def message_event(message):
+    return {
+        'id': message.pk,
+        'thread': message.thread_id,
+        'sender': message.sender.username,
+        'subject': message.subject,
+        'preview': preview(message.body),
+    }
+
+
+def message_added(message):
+    """Fold a newly created message into its thread's summary (one UPDATE)."""
+    if message.thread_id is None:
+        message.thread = get_thread(message.sender_id, message.recipient_id)
+        Message.objects.filter(pk=message.pk).update(thread=message.thread)
+    field = _unread_field(message.recipient_id, message.sender_id)
+    unread = {} if message.is_read else {field: F(field) + 1}
+    Thread.objects.filter(pk=message.thread_id).update(
+        last_message_at=message.created_at,
+        last_sender_id=message.sender_id,
+        preview=preview(message.body),
+        **unread,
+    )
+    transaction.on_commit(lambda: publish(message.recipient_id, 'message', message_event(message)))
+    if not message.is_read:
+        adjust_unread(message.recipient_id, 1)
+        notify_unread(message.recipient_id)
+
+
+def message_read(message):
+    """Mark one message read by its recipient, keeping the thread's count in step."""
+    if message.is_read:
+        return
+    with transaction.atomic():
+        if not Message.objects.filter(pk=message.pk, is_read=False).update(is_read=True):
+            return
+        message.is_read = True
+        if message.thread_id is not None:
+            field = _unread_field(message.recipient_id, message.sender_id)
+            Thread.objects.filter(pk=message.thread_id).update(**{field: Greatest(F(field) - 1, 0)})
+        adjust_unread(message.recipient_id, -1)
+        notify_unread(message.recipient_id)
+
+
+def thread_read(thread, user):
+    """Mark every message to `user` in the thread read. Returns how many changed."""
+    with transaction.atomic():
+        count = Message.objects.filter(thread=thread, recipient=user, is_read=False).update(is_read=True)
+        if count:
+            field = 'unread_low' if user.pk == thread.user_low_id else 'unread_high'
+            Thread.objects.filter(pk=thread.pk).update(**{field: Greatest(F(field) - count, 0)})
+            setattr(thread, field, max(getattr(thread, field) - count, 0))
+            adjust_unread(user.pk, -count)
+            notify_unread(user.pk)
+    return count
+
+
+# -------------------------
+# UNREAD COUNTS
+# -------------------------
+def adjust_unread(user_id, delta):
+    """Add `delta` (which may be negative) to a user's unread count."""
+    if delta < 0:
+        UnreadCount.objects.filter(user_id=user_id).update(count=Greatest(F('count') + delta, 0))
+        return
+    if not delta or UnreadCount.objects.filter(user_id=user_id).update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            UnreadCount.objects.create(user_id=user_id, count=delta)
+    except IntegrityError:
+        # Created concurrently by another message to the same user.
+        UnreadCount.objects.filter(user_id=user_id).update(count=F('count') + delta)
+
+
+def unread_count(user):
+    """A user's unread message count; `user` may be a User or an id."""
+    return UnreadCount.objects.filter(user=user).values_list('count', flat=True).first() or 0
+
+
+def notify_unread(user_id):
+    """Push the user's unread count to their open connections once the change commits."""
+    transaction.on_commit(lambda: publish(user_id, 'unread', {'count': unread_count(user_id)}))
+
+
+def mark_all_read(user):
+    """Mark every message to `user` read with one UPDATE and zero their counts.
+
+    Returns the number of messages marked.
+    """
+    with transaction.atomic():
+        count = Message.objects.filter(recipient=user, is_read=False).update(is_read=True)
+        if count:
+            UnreadCount.objects.filter(user=user).update(count=0)
+            Thread.objects.filter(user_low=user, unread_low__gt=0).update(unread_low=0)
+            Thread.objects.filter(user_high=user, unread_high__gt=0).update(unread_high=0)
+            notify_unread(user.pk)
+    return count
+
+
+# -------------------------
+# BULK SEND
+# -------------------------
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _posting_threads(sender, posting, recipient_ids):
+    """{recipient id: thread id} for the sender's threads about `posting`, creating
+    the missing ones in bulk."""
+    def existing():
+        rows = Thread.objects.filter(posting=posting).filter(Q(user_low=sender) | Q(user_high=sender))
+        return {
+            (high if low == sender.pk else low): pk
+            for pk, low, high in rows.values_list('id', 'user_low_id', 'user_high_id')
+        }
+
+    threads = existing()
+    missing = [pk for pk in recipient_ids if pk not in threads]
+    if missing:
+        Thread.objects.bulk_create(
+            [Thread(user_low_id=low, user_high_id=high, posting=posting)
+             for low, high in (pair(sender.pk, pk) for pk in missing)],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+        threads = existing()
+    return threads
+
+
+def bulk_send(sender, posting, subject, body, chunk_size=None):
+    """Send one message to every applicant of `posting` who allows contact.
+
+    Applicants and their allow_contact settings are read with one query; messages are
+    written with bulk_create in chunks of JOB_BULK_MESSAGE_CHUNK, and each chunk's
+    threads and unread counts are updated with a few set-based UPDATEs (bulk_create
+    skips the post_save signal). Returns (sent, skipped) where `skipped` counts the
+    applicants who turned off direct contact.
+    """
+    chunk_size = chunk_size or getattr(settings, 'JOB_BULK_MESSAGE_CHUNK', 1000)
+    rows = JobApplication.objects.filter(job=posting).exclude(applicant=sender).values_list(
+        'applicant_id', 'applicant__jobseekerprofile__allow_contact',
+    )
+    # Applicants without a profile have no privacy settings to respect.
+    recipients = sorted(pk for pk, allow_contact in rows if allow_contact is not False)
+    skipped = len(rows) - len(recipients)
+    if not recipients:
+        return 0, skipped
+
+    text = preview(body)
+    sent = []
+    with transaction.atomic():
+        threads = _posting_threads(sender, posting, recipients)
+        for chunk in _chunks(recipients, chunk_size):
+            created = Message.objects.bulk_create([
+                Message(sender=sender, recipient_id=pk, thread_id=threads[pk], subject=subject, body=body)
+                for pk in chunk
+            ])
+            sent.extend(created)
+            thread_ids = [threads[pk] for pk in chunk]
+            summary = {'last_message_at': created[-1].created_at, 'last_sender': sender, 'preview': text}
+            # The recipient's unread column is whichever side the sender is not on.
+            Thread.objects.filter(id__in=thread_ids, user_low=sender).update(
+                unread_high=F('unread_high') + 1, **summary,
+            )
+            Thread.objects.filter(id__in=thread_ids, user_high=sender).update(
+                unread_low=F('unread_low') + 1, **summary,
+            )
+            UnreadCount.objects.bulk_create([UnreadCount(user_id=pk) for pk in chunk], ignore_conflicts=True)
+            UnreadCount.objects.filter(user_id__in=chunk).update(count=F('count') + 1)
+        transaction.on_commit(lambda: _publish_sent(sent, chunk_size))
+    return len(sent), skipped
+
+
+def _publish_sent(messages, chunk_size):
+    for chunk in _chunks(messages, chunk_size):
+        counts = dict(
+            UnreadCount.objects.filter(user_id__in=[m.recipient_id for m in chunk]).values_list('user_id', 'count')
+        )
+        events = []
+        for message in chunk:
+            events.append((message.recipient_id, 'message', message_event(message)))
+            events.append((message.recipient_id, 'unread', {'count': counts.get(message.recipient_id, 0)}))
+        publish_many(events)
+
+
+# -------------------------
+# SEARCH
+# -------------------------
+def owner_token(user_id):
+    return f'u{user_id}'
+
+
+def _candidate_window(match):
+    """(lowest, highest) id of the newest JOB_MESSAGE_SEARCH_CANDIDATES matches.
+
+    FTS5 walks a match in rowid order and stops at the limit, so this does not score
+    anything and costs the same however many messages match.
+    """
+    limit = getattr(settings, 'JOB_MESSAGE_SEARCH_CANDIDATES', 1000)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT min(rowid), max(rowid) FROM (SELECT rowid FROM {MESSAGE_FTS_TABLE} '
+            f'WHERE {MESSAGE_FTS_TABLE} MATCH %s ORDER BY rowid DESC LIMIT %s)',
+            [match, limit],
+        )
+        return cursor.fetchone()
+
+
+def ranked_message_ids(user, text, limit, position=None):
+    """The user's sent and received messages matching `text`, best first.
+
+    Only the newest JOB_MESSAGE_SEARCH_CANDIDATES matches are ranked, so a page costs
+    the same however many messages match and however deep it is. `position` is the
+    previous page's {'r': rank, 'id': id, 'w': [low, high]}: later pages re-rank the
+    same id window and continue after that (rank, id). Returns ([(id, rank)], window).
+    """
+    query = fts_query(text)
+    if not query:
+        return [], None
+    match = f'owners:"{owner_token(user.pk)}" AND {{subject body}}: ({query})'
+    window = position['w'] if position else _candidate_window(match)
+    if window is None or window[0] is None:
+        return [], None
+    weights = ', '.join(str(w) for w in MESSAGE_FTS_WEIGHTS)
+    rank = f'bm25({MESSAGE_FTS_TABLE}, {weights})'
+    after, params = '', [match, window[0], window[1]]
+    if position:
+        after = f'AND ({rank} > %s OR ({rank} = %s AND rowid > %s)) '
+        params += [position['r'], position['r'], position['id']]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, {rank} FROM {MESSAGE_FTS_TABLE} WHERE {MESSAGE_FTS_TABLE} MATCH %s '
+            f'AND rowid BETWEEN %s AND %s {after}ORDER BY 2, rowid LIMIT %s',
+            params + [limit],
+        )
+        return cursor.fetchall(), list(window)
+
+
+def search_messages(user, text, cursor=None, limit=20):
+    """One page of the user's messages matching `text`. Returns (messages, next_cursor)."""
+    if fts_available():
+        position = decode_cursor(cursor)
+        if not (isinstance(position, dict) and {'r', 'id', 'w'} <= position.keys()):
+            position = None
+        ranked, window = ranked_message_ids(user, text, limit + 1, position)
+        ids = [pk for pk, _ in ranked[:limit]]
+        by_id = Message.objects.select_related('sender', 'recipient').in_bulk(ids)
+        rows = [by_id[pk] for pk in ids if pk in by_id]
+        next_cursor = None
+        if len(ranked) > limit:
+            last_id, last_rank = ranked[limit - 1]
+            next_cursor = encode_cursor({'r': last_rank, 'id': last_id, 'w': window})
+        return rows, next_cursor
+    # Unranked fallback: newest first, one keyset page at a time.
+    tokens = keyword_tokens(text)
+    if not tokens:
+        return [], None
+    matches = Message.objects.filter(Q(sender=user) | Q(recipient=user))
+    for token in tokens:
+        matches = matches.filter(Q(subject__icontains=token) | Q(body__icontains=token))
+    return keyset_page(matches.select_related('sender', 'recipient'), cursor, limit)
+
+
+def rebuild_message_index():
+    """Re-index every message from scratch. Returns the number of rows indexed."""
+    if not fts_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {MESSAGE_FTS_TABLE}({MESSAGE_FTS_TABLE}) VALUES ('delete-all')")
+        cursor.execute(
+            f'INSERT INTO {MESSAGE_FTS_TABLE}(rowid, subject, body, owners) '
+            f"SELECT id, subject, body, 'u' || sender_id || ' u' || recipient_id FROM jobs_message"
+        )
+        count = cursor.rowcount
+        cursor.execute(f"INSERT INTO {MESSAGE_FTS_TABLE}({MESSAGE_FTS_TABLE}) VALUES ('optimize')")
+    return count
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.14 on 2026-10-17 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0005_jobapplication'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Skill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='jobposting',
+            name='skill_tags',
+            field=models.ManyToManyField(blank=True, related_name='postings', to='jobs.skill'),
+        ),
+        migrations.AddField(
+            model_name='jobseekerprofile',
+            name='skill_tags',
+            field=models.ManyToManyField(blank=True, related_name='profiles', to='jobs.skill'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+from django.db import migrations
+
+# Full-text index over the publicly visible postings. It is an FTS5 "external content"
+# table: it stores only the inverted index and reads column values back from
+# jobs_jobposting. The triggers keep it in step with every insert, edit, moderation
+# change and delete, including writes that bypass the ORM save signals.
+VISIBLE = "{row}.status = 'active' AND {row}.moderation_status = 'approved'"
+COLUMNS = 'title, description, required_skills, location'
+
+
+def _values(row):
+    return f'{row}.id, {row}.title, {row}.description, {row}.required_skills, {row}.location'
+
+
+CREATE_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE jobs_jobposting_fts USING fts5(
+        {COLUMNS},
+        content='jobs_jobposting', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER jobs_jobposting_fts_insert AFTER INSERT ON jobs_jobposting
+    WHEN {VISIBLE.format(row='new')}
+    BEGIN
+        INSERT INTO jobs_jobposting_fts(rowid, {COLUMNS}) VALUES ({_values('new')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER jobs_jobposting_fts_delete AFTER DELETE ON jobs_jobposting
+    WHEN {VISIBLE.format(row='old')}
+    BEGIN
+        INSERT INTO jobs_jobposting_fts(jobs_jobposting_fts, rowid, {COLUMNS})
+        VALUES ('delete', {_values('old')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER jobs_jobposting_fts_update
+    AFTER UPDATE OF {COLUMNS}, status, moderation_status ON jobs_jobposting
+    BEGIN
+        INSERT INTO jobs_jobposting_fts(jobs_jobposting_fts, rowid, {COLUMNS})
+        SELECT 'delete', {_values('old')} WHERE {VISIBLE.format(row='old')};
+        INSERT INTO jobs_jobposting_fts(rowid, {COLUMNS})
+        SELECT {_values('new')} WHERE {VISIBLE.format(row='new')};
+    END
+    """,
+    f"""
+    INSERT INTO jobs_jobposting_fts(rowid, {COLUMNS})
+    SELECT id, {COLUMNS} FROM jobs_jobposting WHERE {VISIBLE.format(row='jobs_jobposting')}
+    """,
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS jobs_jobposting_fts_insert',
+    'DROP TRIGGER IF EXISTS jobs_jobposting_fts_delete',
+    'DROP TRIGGER IF EXISTS jobs_jobposting_fts_update',
+    'DROP TABLE IF EXISTS jobs_jobposting_fts',
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # FTS5 is SQLite-only; other backends keep the icontains fallback in jobs/search.py.
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0006_skill'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(CREATE_SQL), _run(DROP_SQL)),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.0.14 on 2026-10-17 19:02
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def remove_duplicate_applications(apps, schema_editor):
+    """Keep the earliest application per (job, applicant) so the unique constraint applies.
+
+    A kept application without a cover letter takes the latest one among its duplicates.
+    The number of rows removed is printed, so whoever runs the migration knows.
+    """
+    JobApplication = apps.get_model('jobs', 'JobApplication')
+    pairs = list(
+        JobApplication.objects.values('job_id', 'applicant_id')
+        .annotate(copies=Count('id'))
+        .filter(copies__gt=1)
+        .order_by()
+    )
+    removed = 0
+    for pair in pairs:
+        keep, *duplicates = JobApplication.objects.filter(
+            job_id=pair['job_id'], applicant_id=pair['applicant_id']
+        ).order_by('id')
+        letter = next((row.cover_letter for row in reversed(duplicates) if row.cover_letter), '')
+        if letter and not keep.cover_letter:
+            keep.cover_letter = letter
+            keep.save(update_fields=['cover_letter'])
+        JobApplication.objects.filter(id__in=[row.id for row in duplicates]).delete()
+        removed += len(duplicates)
+    if removed:
+        print(
+            f'\n  Removed {removed} duplicate job application(s) for {len(pairs)} (job, applicant) '
+            f'pair(s), keeping the earliest of each.'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0007_jobposting_fts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='jobapplication',
+            index=models.Index(fields=['applicant', 'created_at'], name='jobs_application_applicant_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobposting',
+            index=models.Index(fields=['status', 'moderation_status', 'created_at', 'id'], name='jobs_posting_visible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobposting',
+            index=models.Index(fields=['recruiter', 'created_at'], name='jobs_posting_recruiter_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobposting',
+            index=models.Index(fields=['moderation_status', 'created_at'], name='jobs_posting_moderation_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['recipient', 'created_at'], name='jobs_message_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['sender', 'recipient', 'created_at'], name='jobs_message_pair_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['recipient'], name='jobs_message_unread_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_applications, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='jobapplication',
+            constraint=models.UniqueConstraint(fields=('job', 'applicant'), name='jobs_unique_application'),
+        ),
+    ]
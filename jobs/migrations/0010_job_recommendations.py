@@ -0,0 +1,32 @@
+# Generated by Django 5.0.14 on 2026-10-17 19:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0009_geocoding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('posted_at', models.DateTimeField()),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='jobs.jobposting')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='job_recommendations', to='jobs.jobseekerprofile')),
+            ],
+            options={
+                'ordering': ['-score', '-posted_at'],
+                'indexes': [models.Index(fields=['profile', '-score', '-posted_at'], name='jobs_recommendation_rank_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='jobrecommendation',
+            constraint=models.UniqueConstraint(fields=('profile', 'job'), name='jobs_unique_recommendation'),
+        ),
+    ]
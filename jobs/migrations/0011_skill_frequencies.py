@@ -0,0 +1,37 @@
+# Generated by Django 5.0.14 on 2026-10-17 19:16
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_skills(apps, schema_editor):
+    Skill = apps.get_model('jobs', 'Skill')
+    skills = list(Skill.objects.annotate(
+        postings_n=Count('postings', distinct=True),
+        profiles_n=Count('profiles', distinct=True),
+    ))
+    for skill in skills:
+        skill.posting_count = skill.postings_n
+        skill.profile_count = skill.profiles_n
+    Skill.objects.bulk_update(skills, ['posting_count', 'profile_count'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0010_job_recommendations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='skill',
+            name='posting_count',
+            field=models.PositiveIntegerField(default=0, help_text='Postings listing this skill'),
+        ),
+        migrations.AddField(
+            model_name='skill',
+            name='profile_count',
+            field=models.PositiveIntegerField(default=0, help_text='Profiles listing this skill'),
+        ),
+        migrations.RunPython(count_skills, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.14 on 2026-10-17 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0011_skill_frequencies'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='jobrecommendation',
+            name='jobs_recommendation_rank_idx',
+        ),
+        migrations.AddIndex(
+            model_name='jobrecommendation',
+            index=models.Index(fields=['profile', '-score', '-posted_at', '-job'], name='jobs_recommendation_page_idx'),
+        ),
+    ]
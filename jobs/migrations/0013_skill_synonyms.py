@@ -0,0 +1,25 @@
+# Generated by Django 5.0.14 on 2026-10-17 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0012_recommendation_page_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SkillSynonym',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(max_length=100, unique=True)),
+                ('canonical', models.CharField(max_length=100)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['alias'],
+            },
+        ),
+    ]
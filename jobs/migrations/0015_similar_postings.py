@@ -0,0 +1,31 @@
+# Generated by Django 5.0.14 on 2026-10-17 19:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0014_document_embeddings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('posting', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_postings', to='jobs.jobposting')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='jobs.jobposting')),
+            ],
+            options={
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['posting', '-score', '-similar'], name='jobs_similar_posting_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='similarposting',
+            constraint=models.UniqueConstraint(fields=('posting', 'similar'), name='jobs_unique_similar_posting'),
+        ),
+    ]
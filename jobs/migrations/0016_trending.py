@@ -0,0 +1,33 @@
+# Generated by Django 5.0.14 on 2026-10-17 19:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0015_similar_postings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingEpoch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('base', models.FloatField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PostingTrend',
+            fields=[
+                ('posting', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trend', serialize=False, to='jobs.jobposting')),
+                ('score', models.FloatField(default=0.0)),
+                ('visible', models.BooleanField(default=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('visible', True)), fields=['-score', '-posting'], name='jobs_trend_score_idx')],
+            },
+        ),
+    ]
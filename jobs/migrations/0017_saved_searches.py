@@ -0,0 +1,71 @@
+# Generated by Django 5.0.14 on 2026-10-17 19:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0016_trending'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=100)),
+                ('params', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SavedSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=120)),
+                ('search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='jobs.savedsearch')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SearchAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_read', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('posting', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='jobs.jobposting')),
+                ('search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='jobs.savedsearch')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_alerts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='savedsearch',
+            index=models.Index(fields=['user', 'created_at'], name='jobs_savedsearch_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='savedsearchterm',
+            index=models.Index(fields=['term', 'search'], name='jobs_search_term_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='savedsearchterm',
+            constraint=models.UniqueConstraint(fields=('search', 'term'), name='jobs_unique_search_term'),
+        ),
+        migrations.AddIndex(
+            model_name='searchalert',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='jobs_alert_feed_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='searchalert',
+            constraint=models.UniqueConstraint(fields=('search', 'posting'), name='jobs_unique_search_alert'),
+        ),
+    ]
@@ -0,0 +1,114 @@
+# Generated by Django 5.0.14 on 2026-10-17 19:43
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def thread_messages(apps, schema_editor):
+    """Put existing messages in one general (posting-less) thread per user pair."""
+    Message = apps.get_model('jobs', 'Message')
+    Thread = apps.get_model('jobs', 'Thread')
+    threads = {}
+    rows = Message.objects.order_by('created_at', 'id').values_list(
+        'sender_id', 'recipient_id', 'body', 'is_read', 'created_at'
+    )
+    for sender_id, recipient_id, body, is_read, created_at in rows.iterator(chunk_size=2000):
+        low, high = sorted((sender_id, recipient_id))
+        thread = threads.get((low, high))
+        if thread is None:
+            thread = threads[low, high] = Thread(user_low_id=low, user_high_id=high)
+        thread.last_message_at = created_at
+        thread.last_sender_id = sender_id
+        thread.preview = ' '.join(body.split())[:140]
+        if not is_read:
+            if recipient_id == low:
+                thread.unread_low += 1
+            else:
+                thread.unread_high += 1
+    Thread.objects.bulk_create(threads.values(), batch_size=1000)
+    for (low, high), thread in threads.items():
+        Message.objects.filter(sender_id=low, recipient_id=high).update(thread=thread)
+        Message.objects.filter(sender_id=high, recipient_id=low).update(thread=thread)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0017_saved_searches'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Thread',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('preview', models.CharField(blank=True, max_length=140)),
+                ('unread_low', models.PositiveIntegerField(default=0, help_text='Messages user_low has not read')),
+                ('unread_high', models.PositiveIntegerField(default=0, help_text='Messages user_high has not read')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-last_message_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='reply_to',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='replies', to='jobs.message'),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='last_sender',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='posting',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='threads', to='jobs.jobposting'),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='user_high',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='user_low',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='thread',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='jobs.thread'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['thread', 'created_at', 'id'], name='jobs_message_thread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(fields=['user_low', 'last_message_at', 'id'], name='jobs_thread_low_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(fields=['user_high', 'last_message_at', 'id'], name='jobs_thread_high_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='thread',
+            constraint=models.UniqueConstraint(fields=('user_low', 'user_high', 'posting'), name='jobs_unique_thread'),
+        ),
+        migrations.AddConstraint(
+            model_name='thread',
+            constraint=models.CheckConstraint(check=models.Q(('user_low__lte', models.F('user_high'))), name='jobs_thread_pair_order'),
+        ),
+        # Runs while jobs_message_pair_idx still serves the per-pair updates.
+        migrations.RunPython(thread_messages, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='message',
+            name='jobs_message_pair_idx',
+        ),
+    ]
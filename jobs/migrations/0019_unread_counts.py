@@ -0,0 +1,34 @@
+# Generated by Django 5.0.14 on 2026-10-17 19:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_unread(apps, schema_editor):
+    Message = apps.get_model('jobs', 'Message')
+    UnreadCount = apps.get_model('jobs', 'UnreadCount')
+    counts = Message.objects.filter(is_read=False).values('recipient_id').annotate(n=Count('id')).order_by()
+    UnreadCount.objects.bulk_create(
+        [UnreadCount(user_id=row['recipient_id'], count=row['n']) for row in counts], batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('jobs', '0018_message_threads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadCount',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='unread_count', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_unread, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-17 19:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0019_unread_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField()),
+                ('kind', models.CharField(max_length=20)),
+                ('data', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
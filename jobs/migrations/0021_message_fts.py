@@ -0,0 +1,78 @@
+from django.db import migrations
+
+# Full-text index over message subjects and bodies. It is a contentless FTS5 table
+# (only the inverted index is stored; results are loaded from jobs_message by rowid).
+# The `owners` column holds a token per participant ("u<sender id> u<recipient id>"),
+# so a search is restricted to one user's messages inside the index rather than by
+# filtering every match in the table. The triggers keep it in step with every insert,
+# edit and delete, including bulk_create, which bypasses the ORM save signals.
+COLUMNS = 'subject, body, owners'
+
+
+def _values(row):
+    return f"{row}.id, {row}.subject, {row}.body, 'u' || {row}.sender_id || ' u' || {row}.recipient_id"
+
+
+CREATE_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE jobs_message_fts USING fts5(
+        {COLUMNS},
+        content='',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER jobs_message_fts_insert AFTER INSERT ON jobs_message
+    BEGIN
+        INSERT INTO jobs_message_fts(rowid, {COLUMNS}) VALUES ({_values('new')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER jobs_message_fts_delete AFTER DELETE ON jobs_message
+    BEGIN
+        INSERT INTO jobs_message_fts(jobs_message_fts, rowid, {COLUMNS})
+        VALUES ('delete', {_values('old')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER jobs_message_fts_update
+    AFTER UPDATE OF subject, body, sender_id, recipient_id ON jobs_message
+    BEGIN
+        INSERT INTO jobs_message_fts(jobs_message_fts, rowid, {COLUMNS})
+        VALUES ('delete', {_values('old')});
+        INSERT INTO jobs_message_fts(rowid, {COLUMNS}) VALUES ({_values('new')});
+    END
+    """,
+    f"""
+    INSERT INTO jobs_message_fts(rowid, {COLUMNS})
+    SELECT {_values('jobs_message')} FROM jobs_message
+    """,
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS jobs_message_fts_insert',
+    'DROP TRIGGER IF EXISTS jobs_message_fts_delete',
+    'DROP TRIGGER IF EXISTS jobs_message_fts_update',
+    'DROP TABLE IF EXISTS jobs_message_fts',
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # FTS5 is SQLite-only; other backends keep the icontains fallback in jobs/messaging.py.
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0020_user_events'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(CREATE_SQL), _run(DROP_SQL)),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.14 on 2026-10-17 20:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0021_message_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=16)),
+                ('object_id', models.BigIntegerField(null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'id'], name='jobs_change_kind_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.14 on 2026-10-17 20:13
+
+from django.db import migrations, models
+
+
+def copy_epoch_base(apps, schema_editor):
+    """Existing scores are all relative to the current epoch."""
+    TrendingEpoch = apps.get_model('jobs', 'TrendingEpoch')
+    PostingTrend = apps.get_model('jobs', 'PostingTrend')
+    epoch = TrendingEpoch.objects.filter(pk=1).first()
+    if epoch is not None:
+        PostingTrend.objects.update(base=epoch.base)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0022_document_changes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postingtrend',
+            name='base',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.RunPython(copy_epoch_base, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 20:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0023_trend_base'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='skill',
+            name='idf',
+            field=models.FloatField(blank=True, help_text='IDF weight; set on first use', null=True),
+        ),
+    ]
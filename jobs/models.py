@@ -1,12 +1,53 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+
+class Skill(models.Model):
+    """Canonical, normalized skill name shared by postings and profiles.
+
+    The comma-separated text fields stay the source of truth for what users typed;
+    the links to this table are derived from them on save (see jobs/skills.py).
+    """
+    name = models.CharField(max_length=100, unique=True)
+    # Document frequencies for rarity weighting, kept in step by jobs/skills.py.
+    posting_count = models.PositiveIntegerField(default=0, help_text="Postings listing this skill")
+    profile_count = models.PositiveIntegerField(default=0, help_text="Profiles listing this skill")
+    # Rarity weight used by 'idf' scoring, frozen between `compute_recommendations` runs
+    # so that stored recommendation scores stay comparable (jobs/recommendations.py).
+    idf = models.FloatField(null=True, blank=True, help_text="IDF weight; set on first use")
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class SkillSynonym(models.Model):
+    """Admin override for the skill synonym dictionary (jobs/data/skill_synonyms.csv).
+
+    Maps an alias to the canonical skill name it should be stored and matched as. An
+    override wins over the file for the same alias.
+    """
+    alias = models.CharField(max_length=100, unique=True)
+    canonical = models.CharField(max_length=100)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['alias']
+
+    def __str__(self):
+        return f"{self.alias} -> {self.canonical}"
+
+
 class JobSeekerProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     headline = models.CharField(max_length=255, blank=True)
     skills = models.TextField(blank=True, help_text="Comma-separated skills")
+    skill_tags = models.ManyToManyField(Skill, blank=True, related_name='profiles')
     education = models.TextField(blank=True)
     work_experience = models.TextField(blank=True)
     links = models.TextField(blank=True, help_text="LinkedIn, GitHub, Portfolio URLs")
@@ -47,7 +88,11 @@ class JobPosting(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField()
     required_skills = models.TextField(help_text="Comma-separated skills")
+    skill_tags = models.ManyToManyField(Skill, blank=True, related_name='postings')
     location = models.CharField(max_length=255)
+    # Resolved from `location` on save (see jobs/geocoding.py); null when unknown/remote.
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
     salary_min = models.IntegerField(null=True, blank=True)
     salary_max = models.IntegerField(null=True, blank=True)
     is_remote = models.BooleanField(default=False)
@@ -66,12 +111,247 @@ class JobPosting(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Public search/recommendations: visible postings, newest first, with id as
+            # the keyset tie-breaker.
+            models.Index(
+                fields=['status', 'moderation_status', 'created_at', 'id'],
+                name='jobs_posting_visible_idx',
+            ),
+            # Recruiter's own postings, newest first.
+            models.Index(fields=['recruiter', 'created_at'], name='jobs_posting_recruiter_idx'),
+            # Admin moderation queue filtered by status, newest first.
+            models.Index(fields=['moderation_status', 'created_at'], name='jobs_posting_moderation_idx'),
+            # Bounding-box prefilter for radius searches.
+            models.Index(fields=['latitude', 'longitude'], name='jobs_posting_coords_idx'),
+        ]
+
+
+class JobRecommendation(models.Model):
+    """One posting in a seeker's materialized top-N recommendations.
+
+    Maintained by jobs/recommendations.py from the save signals; never edited by hand.
+    """
+    profile = models.ForeignKey(JobSeekerProfile, on_delete=models.CASCADE, related_name='job_recommendations')
+    job = models.ForeignKey(JobPosting, on_delete=models.CASCADE, related_name='recommendations')
+    score = models.FloatField()
+    # Copy of job.created_at so the recency tie-break is served by the index.
+    posted_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-score', '-posted_at']
+        constraints = [
+            models.UniqueConstraint(fields=['profile', 'job'], name='jobs_unique_recommendation'),
+        ]
+        indexes = [
+            # Recommendations pages: a seeker's rows, best first, with the job id as the
+            # keyset tie-breaker.
+            models.Index(fields=['profile', '-score', '-posted_at', '-job'], name='jobs_recommendation_page_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.job_id} for profile {self.profile_id} ({self.score:g})"
+
+
+class SimilarPosting(models.Model):
+    """One neighbour in a posting's precomputed "similar jobs" list.
+
+    Maintained by jobs/similar.py from the save signals; never edited by hand.
+    """
+    posting = models.ForeignKey(JobPosting, on_delete=models.CASCADE, related_name='similar_postings')
+    similar = models.ForeignKey(JobPosting, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['-score']
+        constraints = [
+            models.UniqueConstraint(fields=['posting', 'similar'], name='jobs_unique_similar_posting'),
+        ]
+        indexes = [
+            # A posting's neighbours, best first, with the neighbour id as tie-breaker.
+            models.Index(fields=['posting', '-score', '-similar'], name='jobs_similar_posting_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.similar_id} similar to {self.posting_id} ({self.score:g})"
+
+
+class PostingTrend(models.Model):
+    """A posting's exponentially decayed application count, relative to TrendingEpoch.
+
+    Maintained by jobs/trending.py; never edited by hand.
+    """
+    posting = models.OneToOneField(JobPosting, on_delete=models.CASCADE, primary_key=True, related_name='trend')
+    score = models.FloatField(default=0.0)
+    # The epoch base `score` is relative to. Always TrendingEpoch.base, except for a row
+    # created while a compaction ran, until jobs/trending.py re-bases it.
+    base = models.FloatField(default=0.0)
+    # Copy of the posting's visibility so the trending page is served by the index.
+    visible = models.BooleanField(default=True)
+
+    class Meta:
+        indexes = [
+            # Trending page: visible postings, highest scores first, with the posting id
+            # as tie-breaker.
+            models.Index(
+                fields=['-score', '-posting'], condition=models.Q(visible=True), name='jobs_trend_score_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Trend of posting {self.posting_id} ({self.score:g})"
+
+
+class TrendingEpoch(models.Model):
+    """The single row holding the time (Unix seconds) PostingTrend scores are relative to."""
+    base = models.FloatField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Trending epoch {self.base:.0f}"
+
+
+class PostingEmbedding(models.Model):
+    """Hashed text embedding of a posting, stored as packed float32 (see jobs/embeddings.py)."""
+    posting = models.OneToOneField(JobPosting, on_delete=models.CASCADE, primary_key=True, related_name='embedding')
+    vector = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Embedding of posting {self.posting_id}"
+
+
+class ProfileEmbedding(models.Model):
+    """Hashed text embedding of a seeker profile, stored as packed float32 (see jobs/embeddings.py)."""
+    profile = models.OneToOneField(JobSeekerProfile, on_delete=models.CASCADE, primary_key=True, related_name='embedding')
+    vector = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Embedding of profile {self.profile_id}"
+
+
+class GeocodeCache(models.Model):
+    """Persistent cache of resolved locations, including misses (null coordinates)."""
+    query = models.CharField(max_length=255, unique=True, help_text="Normalized location text")
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.query
+
+
+class SavedSearch(models.Model):
+    """A job seeker's stored search filters (the job search form's parameters).
+
+    Newly visible postings that match raise SearchAlerts; see jobs/alerts.py.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_searches')
+    name = models.CharField(max_length=100, blank=True)
+    params = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='jobs_savedsearch_user_idx'),
+        ]
+
+    def __str__(self):
+        return self.name or f"Saved search {self.pk}"
+
+
+class SavedSearchTerm(models.Model):
+    """A term a saved search is indexed under, so only searches that could match a new
+    posting are evaluated against it. Maintained by jobs/alerts.py."""
+    search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='terms')
+    term = models.CharField(max_length=120)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['search', 'term'], name='jobs_unique_search_term'),
+        ]
+        indexes = [
+            # Percolation: every search indexed under any of a posting's terms.
+            models.Index(fields=['term', 'search'], name='jobs_search_term_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> search {self.search_id}"
+
+
+class SearchAlert(models.Model):
+    """A newly visible posting that matched one of a user's saved searches."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_alerts')
+    search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='alerts')
+    posting = models.ForeignKey(JobPosting, on_delete=models.CASCADE, related_name='+')
+    is_read = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['search', 'posting'], name='jobs_unique_search_alert'),
+        ]
+        indexes = [
+            # Alert feed: a user's alerts, newest first, with id as the keyset tie-breaker.
+            models.Index(fields=['user', 'created_at', 'id'], name='jobs_alert_feed_idx'),
+        ]
+
+    def __str__(self):
+        return f"Alert for {self.user_id}: posting {self.posting_id}"
+
+
+class Thread(models.Model):
+    """A conversation between two users, optionally about one job posting.
+
+    The pair is stored in id order (user_low <= user_high), so there is one thread per
+    pair and posting whoever writes first. The last-message fields and each side's
+    unread count are copied from Message as messages are added and read (see
+    jobs/messaging.py), so listing threads never reads Message.
+    """
+    user_low = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    user_high = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    posting = models.ForeignKey(
+        JobPosting, on_delete=models.SET_NULL, null=True, blank=True, related_name='threads'
+    )
+    last_message_at = models.DateTimeField(default=timezone.now)
+    last_sender = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    preview = models.CharField(max_length=140, blank=True)
+    unread_low = models.PositiveIntegerField(default=0, help_text="Messages user_low has not read")
+    unread_high = models.PositiveIntegerField(default=0, help_text="Messages user_high has not read")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-last_message_at']
+        constraints = [
+            models.UniqueConstraint(fields=['user_low', 'user_high', 'posting'], name='jobs_unique_thread'),
+            models.CheckConstraint(check=models.Q(user_low__lte=models.F('user_high')), name='jobs_thread_pair_order'),
+        ]
+        indexes = [
+            # Thread list: a user's threads from either side, most recent first.
+            models.Index(fields=['user_low', 'last_message_at', 'id'], name='jobs_thread_low_idx'),
+            models.Index(fields=['user_high', 'last_message_at', 'id'], name='jobs_thread_high_idx'),
+        ]
+
+    def __str__(self):
+        return f"Thread {self.user_low_id}-{self.user_high_id}" + (f" on posting {self.posting_id}" if self.posting_id else "")
+
+    def other_participant(self, user):
+        return self.user_high if user.pk == self.user_low_id else self.user_low
+
+    def unread_for(self, user):
+        return self.unread_low if user.pk == self.user_low_id else self.unread_high
 
 
 class Message(models.Model):
     """Simple internal messaging between users (recruiters and job seekers)."""
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
     recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='received_messages')
+    # Set on save by jobs/messaging.py; null only for rows written before threads existed.
+    thread = models.ForeignKey(Thread, on_delete=models.CASCADE, null=True, blank=True, related_name='messages')
+    reply_to = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='replies')
     subject = models.CharField(max_length=255, blank=True)
     body = models.TextField()
     is_read = models.BooleanField(default=False)
@@ -79,11 +359,70 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Inbox: a recipient's messages, newest first.
+            models.Index(fields=['recipient', 'created_at'], name='jobs_message_inbox_idx'),
+            # Conversation: one thread's messages in order.
+            models.Index(fields=['thread', 'created_at', 'id'], name='jobs_message_thread_idx'),
+            # Unread counts only ever look at unread rows, which stay a small slice.
+            models.Index(
+                fields=['recipient'],
+                condition=models.Q(is_read=False),
+                name='jobs_message_unread_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Message from {self.sender.username} to {self.recipient.username} - {self.subject[:30]}"
 
 
+class UnreadCount(models.Model):
+    """How many received messages a user has not read yet.
+
+    Maintained by jobs/messaging.py as messages are created and read, so the inbox and
+    the navbar never count Message rows.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='unread_count')
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.count} unread for user {self.user_id}"
+
+
+class UserEvent(models.Model):
+    """A live event for one user, as relayed between processes by DatabaseBroker.
+
+    Rows are only read by the brokers' pollers (jobs/events.py) and are pruned after
+    JOB_EVENTS_RETENTION seconds.
+    """
+    user_id = models.BigIntegerField()
+    kind = models.CharField(max_length=20)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.kind} event for user {self.user_id}"
+
+
+class DocumentChange(models.Model):
+    """A posting or profile write, for other processes' in-memory indexes to replay.
+
+    `kind` is the version counter name ('postings' or 'profiles'); a null `object_id`
+    means every row of that kind may have changed. See jobs/changelog.py.
+    """
+    kind = models.CharField(max_length=16)
+    object_id = models.BigIntegerField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'id'], name='jobs_change_kind_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} change {self.object_id if self.object_id is not None else '(all)'}"
+
+
 class JobApplication(models.Model):
     """Represents a job application by a user to a JobPosting.
     Kept minimal: links applicant (User) to JobPosting and stores an optional cover letter.
@@ -95,6 +434,12 @@ class JobApplication(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'applicant'], name='jobs_unique_application'),
+        ]
+        indexes = [
+            models.Index(fields=['applicant', 'created_at'], name='jobs_application_applicant_idx'),
+        ]
 
     def __str__(self):
         return f"Application by {self.applicant.username} for {self.job.title}"
\ No newline at end of file
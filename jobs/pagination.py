@@ -0,0 +1,63 @@
+"""Keyset (cursor) pagination helpers.
+
+Pages are addressed by an opaque, signed token holding the sort key of the last row
+shown, so fetching page N costs the same indexed range read as fetching page 1 and
+pages stay stable while new rows are inserted at the top.
+"""
+from datetime import datetime
+
+from django.core import signing
+from django.db.models import Q
+
+CURSOR_SALT = 'jobs.pagination.cursor'
+
+
+def encode_cursor(data):
+    return signing.dumps(data, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(token):
+    """Return the payload of a cursor token, or None if it is missing or tampered with."""
+    if not token:
+        return None
+    try:
+        return signing.loads(token, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        return None
+
+
+def clamp_page_size(value, default, maximum):
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, maximum))
+
+
+def keyset_page(queryset, cursor, page_size, field='created_at'):
+    """Return (rows, next_cursor) for `queryset` ordered newest first by (`field`, id).
+
+    `cursor` is a token produced by a previous call (or None for the first page).
+    """
+    position = decode_cursor(cursor)
+    if isinstance(position, dict) and 'k' in position and 'id' in position:
+        key = datetime.fromisoformat(position['k'])
+        # Equivalent to (field, id) < (key, last_id); the leading `<=` bound lets the
+        # database use it as an index range instead of filtering row by row.
+        queryset = queryset.filter(
+            Q(**{f'{field}__lte': key}),
+            Q(**{f'{field}__lt': key}) | Q(id__lt=position['id']),
+        )
+    rows = list(queryset.order_by(f'-{field}', '-id')[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor({'k': getattr(last, field).isoformat(), 'id': last.pk})
+    return rows, next_cursor
+
+
+def approximate_count(queryset, cap):
+    """Count matching rows but stop at `cap`; returns (count, capped)."""
+    count = queryset.order_by()[:cap + 1].count()
+    return min(count, cap), count > cap
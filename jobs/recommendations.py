@@ -0,0 +1,544 @@
+"""Materialized seeker-to-job recommendations.
+
+Each seeker's best JOB_RECOMMENDATIONS_PER_SEEKER visible postings, scored by skill
+overlap, are stored in the JobRecommendation table, so the recommendations page is one
+indexed read. The rows are kept current from the save signals:
+
+* saving a profile recomputes that seeker's rows (`refresh_profile`);
+* saving a posting rescores it for the seekers who had it recommended before, and adds
+  it only for the seekers whose list it enters: their N-th stored row is compared
+  with its score in the database, so seekers it cannot reach are never written
+  (`refresh_posting`);
+* deleting a posting refills the lists it leaves a gap in (`refill_profiles`).
+
+Scores come from grouped joins over the Skill link tables, ranked and cut with
+ORDER BY/LIMIT in the database, so nothing here loads whole tables into Python. Both
+paths match a seeker on the same skills: their own plus the corrections of likely typos
+(`profile_skill_ids`, and its inverse `skill_aliases` on the posting side). Both
+recommendation views page through the ranking with keyset cursors on (score, date, id).
+Seekers without any skills are shown the newest visible postings instead.
+
+Two scoring modes exist, chosen per view in settings.JOB_RECOMMENDATION_SCORING:
+'overlap' counts shared skills; 'idf' sums the inverse document frequency of each
+shared skill, so a match on a rare skill counts for more than one on a skill every
+posting and profile lists. Document frequencies are the counts kept on Skill. A view
+can also be set to 'semantic', which ranks by text similarity instead (see
+jobs/embeddings.py); the stored rows keep using overlap scoring then.
+
+IDF weights move with every save, which would leave each stored row scored with the
+weights of the moment it was written. So each skill's weight is frozen in Skill.idf
+the first time it is used, and only `refresh_idf_weights` moves them all at once. A
+full `manage.py compute_recommendations` run does that and then rescores every
+seeker; run it periodically (e.g. nightly) so the weights follow the corpus.
+"""
+import math
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value, When, Window
+from django.db.models.functions import Round, RowNumber
+
+from .autocomplete import get_autocomplete
+from .cache import POSTINGS, PROFILES, versioned
+from .candidates import get_candidate_matrix
+from .fuzzy import correct_skills, misspellings
+from .models import JobApplication, JobPosting, JobRecommendation, JobSeekerProfile, Skill
+from .pagination import decode_cursor, encode_cursor
+from .skills import get_skill_ids, parse_skills
+
+ProfileSkill = JobSeekerProfile.skill_tags.through
+PostingSkill = JobPosting.skill_tags.through
+
+
+SCORING_MODES = ('overlap', 'idf')
+
+
+def per_seeker():
+    return getattr(settings, 'JOB_RECOMMENDATIONS_PER_SEEKER', 25)
+
+
+def scoring_mode(view):
+    """The scoring mode configured for `view` ('recommended_jobs' or 'posting_recommendations')."""
+    mode = getattr(settings, 'JOB_RECOMMENDATION_SCORING', {}).get(view, 'overlap')
+    return mode if mode in SCORING_MODES or mode == 'semantic' else 'overlap'
+
+
+def corpus_size():
+    """Postings plus profiles, counted once per change to either table."""
+    return versioned(
+        'jobs:corpus',
+        lambda: JobPosting.objects.count() + JobSeekerProfile.objects.count(),
+        POSTINGS, PROFILES,
+    )
+
+
+def idf(document_frequency, documents):
+    """Smoothed inverse document frequency; never below 1 so every match still counts."""
+    return math.log((documents + 1) / (document_frequency + 1)) + 1
+
+
+def skill_weights(skill_ids, mode='overlap'):
+    """{skill id: weight} for the given skills under a scoring mode.
+
+    IDF weights are read from Skill.idf; a skill that has none yet gets its current
+    weight, written only if no other process froze one first.
+    """
+    skill_ids = set(skill_ids)
+    if mode != 'idf' or not skill_ids:
+        return dict.fromkeys(skill_ids, 1.0)
+    rows = Skill.objects.filter(id__in=skill_ids).values_list('id', 'idf', 'posting_count', 'profile_count')
+    weights = {}
+    unset = {}
+    for pk, weight, postings, profiles in rows:
+        if weight is None:
+            unset[pk] = postings + profiles
+        else:
+            weights[pk] = weight
+    if unset:
+        documents = corpus_size()
+        for pk, frequency in unset.items():
+            Skill.objects.filter(pk=pk, idf__isnull=True).update(idf=idf(frequency, documents))
+        weights.update(Skill.objects.filter(id__in=list(unset)).values_list('id', 'idf'))
+    return weights
+
+
+def refresh_idf_weights(batch_size=1000):
+    """Re-freeze every skill's IDF weight at the current document frequencies.
+
+    Stored scores written under the old weights are stale until they are recomputed,
+    which is why only a full `compute_recommendations` run calls this. Returns the
+    number of skills updated.
+    """
+    documents = JobPosting.objects.count() + JobSeekerProfile.objects.count()
+    skills = list(Skill.objects.only('id', 'posting_count', 'profile_count'))
+    for skill in skills:
+        skill.idf = idf(skill.posting_count + skill.profile_count, documents)
+    Skill.objects.bulk_update(skills, ['idf'], batch_size=batch_size)
+    return len(skills)
+
+
+def score_expression(weights, field='skill_id'):
+    """Aggregate that scores a group of skill-link rows: a count, or a sum of weights."""
+    if all(weight == 1.0 for weight in weights.values()):
+        return Count(field)
+    # Rounded so that rows matching the same skills tie exactly whatever order the
+    # database adds the weights in, and fall through to the recency tie-break.
+    return Round(Sum(Case(
+        *[When(**{field: skill_id}, then=Value(weight)) for skill_id, weight in weights.items()],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )), 6)
+
+
+def is_visible(posting):
+    return posting.status == 'active' and posting.moderation_status == 'approved'
+
+
+def profile_skill_ids(profile):
+    """Skill ids a seeker is matched on: their own plus corrections of likely typos."""
+    skill_ids = {skill.id for skill in profile.skill_tags.all()}
+    # Skills nobody else lists are likely typos; match their nearest known skill too
+    corrected = correct_skills(get_autocomplete(), parse_skills(profile.skills))
+    skill_ids.update(get_skill_ids(corrected.values(), create=False).values())
+    return skill_ids
+
+
+def skill_aliases(skill_ids):
+    """{skill id: [ids of skills corrected to it]}, the inverse of `profile_skill_ids`."""
+    names = dict(Skill.objects.filter(id__in=list(skill_ids)).values_list('name', 'id'))
+    typos = misspellings(get_autocomplete(), names)
+    typo_ids = get_skill_ids({typo for found in typos.values() for typo in found}, create=False)
+    return {
+        names[name]: [typo_ids[typo] for typo in found if typo in typo_ids]
+        for name, found in typos.items()
+    }
+
+
+def resolved_score_expression(weights, aliases, field='skill_id'):
+    """Like `score_expression`, with each skill also matched through its `aliases`.
+
+    A seeker listing both a skill and one of its misspellings still scores it once,
+    the same as `profile_skill_ids` does.
+    """
+    if not any(aliases.values()):
+        return score_expression(weights, field)
+    return Round(sum(
+        Value(weight) * Max(Case(
+            When(**{f'{field}__in': [skill_id, *aliases.get(skill_id, ())]}, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+        for skill_id, weight in weights.items()
+    ), 6, output_field=FloatField())
+
+
+def _after(position, date_field, id_field):
+    """Rows ranked after `position` in (score, date, id) descending order.
+
+    The score is an aggregate, so the database applies this as a HAVING clause.
+    """
+    score, date, pk = position['s'], datetime.fromisoformat(position['k']), position['id']
+    return (
+        Q(score__lt=score)
+        | Q(score=score, **{f'{date_field}__lt': date})
+        | Q(score=score, **{date_field: date, f'{id_field}__lt': pk})
+    )
+
+
+def _position(cursor, phase):
+    """The decoded cursor if it belongs to `phase` ({} for the start of it), else None."""
+    position = decode_cursor(cursor)
+    if isinstance(position, dict) and position.get('p') == phase:
+        return position if {'s', 'k', 'id'} <= set(position) else {}
+    return None
+
+
+def _cursor(phase, score, date, pk):
+    return encode_cursor({'p': phase, 's': score, 'k': date.isoformat(), 'id': pk})
+
+
+def job_scores(weights):
+    """Visible postings matching any weighted skill, grouped with their `score`."""
+    return (
+        PostingSkill.objects.filter(
+            skill_id__in=list(weights),
+            jobposting__status='active',
+            jobposting__moderation_status='approved',
+        )
+        .values('jobposting_id', 'jobposting__created_at')
+        .annotate(score=score_expression(weights))
+        .order_by('-score', '-jobposting__created_at', '-jobposting_id')
+    )
+
+
+def top_jobs(weights, limit):
+    """Best visible postings for {skill id: weight} as (job id, created_at, score), best first."""
+    if not weights:
+        return []
+    return list(job_scores(weights).values_list('jobposting_id', 'jobposting__created_at', 'score')[:limit])
+
+
+def top_profiles(weights, limit):
+    """Best profiles for {skill id: weight} as (profile id, score), best first.
+
+    Ignores visibility and applications; used for offline evaluation.
+    """
+    if not weights:
+        return []
+    return list(
+        ProfileSkill.objects.filter(skill_id__in=list(weights))
+        .values('jobseekerprofile_id', 'jobseekerprofile__updated_at')
+        .annotate(score=score_expression(weights))
+        .order_by('-score', '-jobseekerprofile__updated_at')
+        .values_list('jobseekerprofile_id', 'score')[:limit]
+    )
+
+
+def recommendation_page(profile, cursor=None, page_size=25):
+    """One page of a seeker's recommendations as ([(job id, score)], next cursor).
+
+    Pages are read from the materialized rows first. A seeker whose stored list is full
+    can keep paging: the rest is ranked live in the database, leaving out the postings
+    already shown from the stored list.
+    """
+    rows = []
+    position = _position(cursor, 'recent')
+    if position is not None:
+        return recent_page(position, page_size)
+    position = _position(cursor, 'live')
+    if position is None:
+        stored = JobRecommendation.objects.filter(profile=profile).order_by('-score', '-posted_at', '-job_id')
+        position = _position(cursor, 'stored')
+        if position:
+            stored = stored.filter(_after(position, 'posted_at', 'job_id'))
+        rows = list(stored.values_list('job_id', 'posted_at', 'score')[:page_size + 1])
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            job_id, posted_at, score = rows[-1]
+            return [(job_id, score) for job_id, _, score in rows], _cursor('stored', score, posted_at, job_id)
+        if not rows and not position and not profile_skill_ids(profile):
+            # Nothing to match on: recommend the newest postings instead.
+            return recent_page({}, page_size)
+        if not full_profile_ids([profile.pk]):
+            return [(job_id, score) for job_id, _, score in rows], None
+        position = {}
+
+    # Past the stored list: fill the page from a live ranking.
+    limit = page_size - len(rows)
+    live = []
+    weights = skill_weights(profile_skill_ids(profile), scoring_mode('recommended_jobs'))
+    if weights:
+        stored_ids = JobRecommendation.objects.filter(profile=profile).values('job_id')
+        scores = job_scores(weights).exclude(jobposting_id__in=stored_ids)
+        if position:
+            scores = scores.filter(_after(position, 'jobposting__created_at', 'jobposting_id'))
+        live = list(scores.values_list('jobposting_id', 'jobposting__created_at', 'score')[:limit + 1])
+    next_cursor = None
+    if len(live) > limit:
+        live = live[:limit]
+        if live:
+            job_id, posted_at, score = live[-1]
+            next_cursor = _cursor('live', score, posted_at, job_id)
+        else:
+            next_cursor = encode_cursor({'p': 'live'})
+    return [(job_id, score) for job_id, _, score in rows + live], next_cursor
+
+
+def recent_page(position, page_size=25):
+    """One page of the newest visible postings, scored 0, for seekers without skills."""
+    jobs = JobPosting.objects.filter(status='active', moderation_status='approved')
+    if position:
+        created_at = datetime.fromisoformat(position['k'])
+        jobs = jobs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=position['id']))
+    rows = list(jobs.order_by('-created_at', '-id').values_list('id', 'created_at')[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        job_id, created_at = rows[-1]
+        next_cursor = _cursor('recent', 0, created_at, job_id)
+    return [(job_id, 0) for job_id, _ in rows], next_cursor
+
+
+def candidate_scores(posting, weights):
+    """Visible profiles matching any weighted skill, minus the posting's applicants,
+    grouped with their `score`."""
+    applied = JobApplication.objects.filter(job=posting).values('applicant_id')
+    return (
+        ProfileSkill.objects.filter(
+            skill_id__in=list(weights),
+            jobseekerprofile__profile_visible=True,
+        )
+        .exclude(jobseekerprofile__user_id__in=applied)
+        .values('jobseekerprofile_id', 'jobseekerprofile__updated_at')
+        .annotate(score=score_expression(weights))
+        .order_by('-score', '-jobseekerprofile__updated_at', '-jobseekerprofile_id')
+    )
+
+
+def candidate_page(posting, weights, cursor=None, page_size=25):
+    """One page of candidates for a posting as ([(profile id, score)], next cursor).
+
+    Hidden profiles and people who already applied are left out in the same query.
+    Ranked by the in-memory candidate matrix when NumPy is available, otherwise by a
+    grouped join in the database; both give the same order and accept the same cursor.
+    """
+    if not weights:
+        return [], None
+    position = _position(cursor, 'candidates') or None
+    applied = JobApplication.objects.filter(job=posting).values_list('applicant_id', flat=True)
+    matrix = get_candidate_matrix()
+    if matrix is not None:
+        after = None
+        if position is not None:
+            after = (position['s'], datetime.fromisoformat(position['k']).timestamp(), position['id'])
+        rows = [
+            (pk, score, datetime.fromtimestamp(updated, timezone.utc))
+            for pk, score, updated in matrix.score(weights, applied, page_size + 1, after)
+        ]
+    else:
+        scores = candidate_scores(posting, weights)
+        if position is not None:
+            scores = scores.filter(_after(position, 'jobseekerprofile__updated_at', 'jobseekerprofile_id'))
+        rows = list(
+            scores.values_list('jobseekerprofile_id', 'score', 'jobseekerprofile__updated_at')[:page_size + 1]
+        )
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        pk, score, updated = rows[-1]
+        next_cursor = _cursor('candidates', score, updated, pk)
+    return [(pk, score) for pk, score, _ in rows], next_cursor
+
+
+def refresh_profile(profile):
+    """Recompute one seeker's rows. Returns how many were stored."""
+    weights = skill_weights(profile_skill_ids(profile), scoring_mode('recommended_jobs'))
+    rows = [
+        JobRecommendation(profile=profile, job_id=job_id, posted_at=posted_at, score=score)
+        for job_id, posted_at, score in top_jobs(weights, per_seeker())
+    ]
+    with transaction.atomic():
+        JobRecommendation.objects.filter(profile=profile).delete()
+        JobRecommendation.objects.bulk_create(rows)
+    return len(rows)
+
+
+def refill_profiles(profile_ids):
+    """Recompute the rows of several seekers (e.g. after a posting left their list)."""
+    profiles = JobSeekerProfile.objects.filter(id__in=list(profile_ids))
+    return sum(refresh_profile(profile) for profile in profiles)
+
+
+def full_profile_ids(profile_ids):
+    """The seekers among `profile_ids` whose lists are full.
+
+    Only those can have a next-best posting that was cut off, so only they need a
+    recompute when one of their rows goes away or scores lower.
+    """
+    if not profile_ids:
+        return set()
+    return set(
+        JobRecommendation.objects.filter(profile_id__in=list(profile_ids))
+        .values('profile_id')
+        .annotate(rows=Count('id'))
+        .filter(rows__gte=per_seeker())
+        .values_list('profile_id', flat=True)
+    )
+
+
+def _trim(profile_ids):
+    """Drop rows that fell below a seeker's top N."""
+    if not profile_ids:
+        return
+    overflow = (
+        JobRecommendation.objects.filter(profile_id__in=list(profile_ids))
+        .annotate(position=Window(
+            RowNumber(),
+            partition_by=[F('profile_id')],
+            order_by=[F('score').desc(), F('posted_at').desc(), F('job_id').desc()],
+        ))
+        .filter(position__gt=per_seeker())
+        .values_list('id', flat=True)
+    )
+    JobRecommendation.objects.filter(id__in=list(overflow)).delete()
+
+
+def _cutoff():
+    """A seeker's N-th best stored score; NULL while their list has room."""
+    n = per_seeker()
+    return Subquery(
+        JobRecommendation.objects.filter(profile_id=OuterRef('jobseekerprofile_id'))
+        .order_by('-score', '-posted_at', '-job_id')
+        .values('score')[n - 1:n]
+    )
+
+
+def _beats_cutoff(posting, profile_ids):
+    """The seekers among `profile_ids` whose N-th row `posting` outranks on a tied score."""
+    nth = (
+        JobRecommendation.objects.filter(profile_id__in=list(profile_ids))
+        .annotate(position=Window(
+            RowNumber(),
+            partition_by=[F('profile_id')],
+            order_by=[F('score').desc(), F('posted_at').desc(), F('job_id').desc()],
+        ))
+        .filter(position=per_seeker())
+        .values_list('profile_id', 'posted_at', 'job_id')
+    )
+    return {pk for pk, posted_at, job_id in nth if (posting.created_at, posting.pk) > (posted_at, job_id)}
+
+
+def refresh_posting(posting):
+    """Rescore one posting for the seekers it can affect after it was created or edited.
+
+    Seekers who had it listed get their row updated or removed. Others get a row only
+    if it enters their top N: their list has room, or it outranks their N-th row.
+    """
+    previous = dict(JobRecommendation.objects.filter(job=posting).values_list('profile_id', 'score'))
+    scores = {}
+    full = set()
+    if is_visible(posting):
+        skill_ids = list(posting.skill_tags.values_list('id', flat=True))
+        weights = skill_weights(skill_ids, scoring_mode('recommended_jobs'))
+        aliases = skill_aliases(skill_ids)
+        listed = JobRecommendation.objects.filter(job=posting).values('profile_id')
+        rows = (
+            ProfileSkill.objects.filter(
+                skill_id__in=list(weights) + [pk for found in aliases.values() for pk in found]
+            )
+            .values('jobseekerprofile_id')
+            .annotate(score=resolved_score_expression(weights, aliases), cutoff=_cutoff())
+            .filter(Q(jobseekerprofile_id__in=listed) | Q(cutoff__isnull=True) | Q(score__gte=F('cutoff')))
+            .values_list('jobseekerprofile_id', 'score', 'cutoff')
+        ) if weights else []
+        ties = set()
+        for pk, score, cutoff in rows:
+            scores[pk] = score
+            if pk not in previous and cutoff is not None:
+                full.add(pk)
+                if score == cutoff:
+                    ties.add(pk)
+        if ties:
+            for pk in ties - _beats_cutoff(posting, ties):
+                del scores[pk]
+                full.discard(pk)
+    lowered = {pk for pk, score in previous.items() if scores.get(pk, 0) < score}
+    refill = full_profile_ids(lowered)
+    changed = [pk for pk, score in scores.items() if previous.get(pk) != score]
+    with transaction.atomic():
+        JobRecommendation.objects.filter(job=posting, profile_id__in=list(set(previous) - set(scores))).delete()
+        JobRecommendation.objects.bulk_create(
+            [
+                JobRecommendation(profile_id=pk, job=posting, posted_at=posting.created_at, score=scores[pk])
+                for pk in changed
+            ],
+            update_conflicts=True,
+            unique_fields=['profile', 'job'],
+            update_fields=['score', 'posted_at'],
+            batch_size=500,
+        )
+        # Entering a full list pushes its last row out.
+        _trim(full)
+    refill_profiles(refill)
+
+
+def affected_profile_ids(posting_ids):
+    """Seekers whose stored list a change to these postings can affect: those sharing a
+    skill with one of them, and those who have one of them listed."""
+    skills = set(PostingSkill.objects.filter(jobposting_id__in=list(posting_ids)).values_list('skill_id', flat=True))
+    skills.update(pk for found in skill_aliases(skills).values() for pk in found)
+    sharing = ProfileSkill.objects.filter(skill_id__in=list(skills)).values_list('jobseekerprofile_id', flat=True)
+    listed = JobRecommendation.objects.filter(job_id__in=list(posting_ids)).values_list('profile_id', flat=True)
+    return set(sharing.distinct()) | set(listed.distinct())
+
+
+def compute_shard(profile_ids, batch_size=1000):
+    """Recompute the stored rows of a shard of seekers, writing only the differences.
+
+    Used by the compute_recommendations command (possibly in a worker process). Returns
+    counts and per-phase timings in seconds.
+    """
+    timings = {}
+    started = time.perf_counter()
+    profiles = list(JobSeekerProfile.objects.filter(id__in=list(profile_ids)).prefetch_related('skill_tags'))
+    mode = scoring_mode('recommended_jobs')
+    wanted = {}
+    for profile in profiles:
+        for job_id, posted_at, score in top_jobs(skill_weights(profile_skill_ids(profile), mode), per_seeker()):
+            wanted[profile.pk, job_id] = (posted_at, score)
+    timings['score'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    existing = {
+        (profile_id, job_id): (pk, posted_at, score)
+        for pk, profile_id, job_id, posted_at, score in JobRecommendation.objects.filter(
+            profile_id__in=[profile.pk for profile in profiles]
+        ).values_list('id', 'profile_id', 'job_id', 'posted_at', 'score')
+    }
+    create = [
+        JobRecommendation(profile_id=profile_id, job_id=job_id, posted_at=posted_at, score=score)
+        for (profile_id, job_id), (posted_at, score) in wanted.items()
+        if (profile_id, job_id) not in existing
+    ]
+    update = [
+        JobRecommendation(id=existing[key][0], posted_at=posted_at, score=score)
+        for key, (posted_at, score) in wanted.items()
+        if key in existing and existing[key][1:] != (posted_at, score)
+    ]
+    delete = [pk for key, (pk, _, _) in existing.items() if key not in wanted]
+    with transaction.atomic():
+        for i in range(0, len(delete), batch_size):
+            JobRecommendation.objects.filter(id__in=delete[i:i + batch_size]).delete()
+        JobRecommendation.objects.bulk_update(update, ['posted_at', 'score'], batch_size=batch_size)
+        JobRecommendation.objects.bulk_create(create, batch_size=batch_size)
+    timings['write'] = time.perf_counter() - started
+    return {
+        'profiles': len(profiles),
+        'rows': len(wanted),
+        'created': len(create),
+        'updated': len(update),
+        'deleted': len(delete),
+        'timings': timings,
+    }
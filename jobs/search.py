@@ -0,0 +1,348 @@
+"""Public job search: filtering, keyword ranking and paging.
+
+On SQLite the postings are indexed in the `jobs_jobposting_fts` FTS5 table (created and
+kept current by migration 0007), and keyword queries are ranked with BM25. Other
+database backends fall back to unranked `icontains` matching.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, Count, Q, When
+from django.db.models.functions import Coalesce
+
+from .autocomplete import get_autocomplete
+from .fuzzy import correct_skills, correct_title, keyword_expansions
+from .geocoding import parse_point, parse_radius, within_radius
+from .models import JobPosting
+from .pagination import (
+    approximate_count, clamp_page_size, decode_cursor, encode_cursor, keyset_page,
+)
+from .skills import get_skill_ids, parse_skills
+
+FTS_TABLE = 'jobs_jobposting_fts'
+FTS_COLUMNS = ('title', 'description', 'required_skills', 'location')
+
+# BM25 column weights, in FTS_COLUMNS order: a hit in the title matters most.
+FTS_WEIGHTS = (10.0, 1.0, 5.0, 2.0)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def keyword_tokens(text):
+    return _TOKEN_RE.findall((text or '').lower())
+
+
+def _prefix_phrase(term):
+    """An FTS5 prefix query for one term, quoted so it is never read as query syntax."""
+    return '"' + term.replace('"', '""') + '"*'
+
+
+def fts_query(text, expansions=None):
+    """Turn free user input into a safe FTS5 query: every word must match as a prefix.
+
+    `expansions` maps a word to alternative spellings that may match instead. These come
+    from stored skill names and title words, so they are quoted like user input.
+    """
+    expansions = expansions or {}
+    terms = []
+    for token in keyword_tokens(text):
+        alternatives = list(dict.fromkeys([token] + expansions.get(token, [])))
+        if len(alternatives) == 1:
+            terms.append(_prefix_phrase(token))
+        else:
+            terms.append('(' + ' OR '.join(_prefix_phrase(alt) for alt in alternatives) + ')')
+    # FTS5 only allows implicit AND between plain phrases, not next to a group.
+    return ' AND '.join(terms)
+
+
+def ranked_posting_ids(text, limit=None, expansions=None):
+    """Return ids of visible postings matching `text`, best BM25 match first."""
+    query = fts_query(text, expansions)
+    if not query:
+        return []
+    if limit is None:
+        limit = getattr(settings, 'JOB_SEARCH_MAX_RANKED', 1000)
+    weights = ', '.join(str(w) for w in FTS_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s',
+            [query, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def matches_keywords(posting_id, text, expansions=None):
+    """Whether one indexed (i.e. visible) posting matches keyword query `text`."""
+    query = fts_query(text, expansions)
+    if not query:
+        return True
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT 1 FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = %s',
+            [query, posting_id],
+        )
+        return cursor.fetchone() is not None
+
+
+def keyword_filter(text):
+    """Unranked fallback used when FTS5 is not available."""
+    condition = Q()
+    for token in _TOKEN_RE.findall(text or ''):
+        condition &= (
+            Q(title__icontains=token) | Q(description__icontains=token) |
+            Q(required_skills__icontains=token) | Q(location__icontains=token)
+        )
+    return condition
+
+
+def rebuild_index():
+    """Re-index every visible posting from scratch. Returns the number of rows indexed."""
+    if not fts_available():
+        return 0
+    columns = ', '.join(FTS_COLUMNS)
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, {columns}) '
+            f'SELECT id, {columns} FROM jobs_jobposting '
+            f"WHERE status = 'active' AND moderation_status = 'approved'"
+        )
+        count = cursor.rowcount
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return count
+
+
+def filter_postings(params, vocabulary=None):
+    """Apply the job search filters in `params` (a QueryDict or dict) to visible postings.
+
+    Returns (queryset, ranked_ids, corrections). For keyword (q=) searches `ranked_ids`
+    holds the matching ids in relevance order; otherwise it is None. When a
+    `vocabulary` (jobs.autocomplete.Autocomplete) is given, misspelled title words and
+    skills are rewritten to their nearest known terms and keyword search also tries
+    those spellings; `corrections` maps each original term to its replacement.
+    """
+    jobs = JobPosting.objects.filter(status='active', moderation_status='approved')
+    corrections = {}
+
+    q = params.get('q', '').strip()
+    title = params.get('title', '')
+    location = params.get('location', '')
+    skills = params.get('skills', '')
+    salary_min = params.get('salary_min', '')
+    is_remote = params.get('is_remote', '')
+    visa_sponsorship = params.get('visa_sponsorship', '')
+    near = parse_point(params.get('near', ''))
+
+    # Keyword search: rank with the FTS5 index, then apply the remaining filters to
+    # the (bounded) set of matching ids.
+    ranked_ids = None
+    if q:
+        if fts_available():
+            expansions = {}
+            if vocabulary is not None:
+                expansions = keyword_expansions(vocabulary, keyword_tokens(q))
+                corrections.update((word, alts[0]) for word, alts in expansions.items())
+            ranked_ids = ranked_posting_ids(q, expansions=expansions)
+            jobs = jobs.filter(pk__in=ranked_ids)
+        else:
+            jobs = jobs.filter(keyword_filter(q))
+    if title:
+        if vocabulary is not None:
+            title, fixed = correct_title(vocabulary, title)
+            corrections.update(fixed)
+        jobs = jobs.filter(title__icontains=title)
+    if location:
+        jobs = jobs.filter(location__icontains=location)
+    if skills:
+        # Every listed skill must be linked to the posting; one indexed join per skill.
+        names = parse_skills(skills)
+        if vocabulary is not None:
+            fixed = correct_skills(vocabulary, names)
+            corrections.update(fixed)
+            names = list(dict.fromkeys(fixed.get(name, name) for name in names))
+        skill_ids = get_skill_ids(names, create=False)
+        if len(skill_ids) < len(names):
+            jobs = jobs.none()
+        for skill_id in skill_ids.values():
+            jobs = jobs.filter(skill_tags=skill_id)
+    if salary_min:
+        try:
+            jobs = jobs.filter(salary_min__gte=int(salary_min))
+        except ValueError:
+            pass
+    if is_remote == 'true':
+        jobs = jobs.filter(is_remote=True)
+    if visa_sponsorship == 'true':
+        jobs = jobs.filter(visa_sponsorship=True)
+    if near:
+        radius = parse_radius(params.get('radius'))
+        if radius is None:
+            radius = settings.JOB_SEARCH_DEFAULT_RADIUS_MILES
+        jobs = within_radius(jobs, near[0], near[1], radius)
+
+    return jobs, ranked_ids, corrections
+
+
+def _band_label(low, high):
+    def fmt(amount):
+        return f'${amount // 1000}k'
+    if low is None:
+        return f'Under {fmt(high)}'
+    if high is None:
+        return f'{fmt(low)}+'
+    return f'{fmt(low)}–{fmt(high)}'
+
+
+def facet_counts(jobs):
+    """Facet counts for a filtered posting queryset, in a single GROUP BY query.
+
+    Grouping by location yields the per-location totals for the location facet; the
+    remote/visa/salary facets are conditional counts in the same pass, summed across
+    the groups in Python. A posting falls in a salary band when its salary range
+    (salary_min..salary_max, either end may be missing) overlaps the band.
+    """
+    bands = getattr(settings, 'JOB_SEARCH_SALARY_BANDS', [])
+    low_end = Coalesce('salary_min', 'salary_max')
+    high_end = Coalesce('salary_max', 'salary_min')
+    aggregates = {
+        'total': Count('id'),
+        'remote': Count('id', filter=Q(is_remote=True)),
+        'visa': Count('id', filter=Q(visa_sponsorship=True)),
+    }
+    for i, (low, high) in enumerate(bands):
+        band = Q(salary_min__isnull=False) | Q(salary_max__isnull=False)
+        if low is not None:
+            band &= Q(salary_high__gte=low)
+        if high is not None:
+            band &= Q(salary_low__lt=high)
+        aggregates[f'band_{i}'] = Count('id', filter=band)
+
+    rows = list(
+        jobs.order_by()
+        .annotate(salary_low=low_end, salary_high=high_end)
+        .values('location')
+        .annotate(**aggregates)
+    )
+
+    top = getattr(settings, 'JOB_SEARCH_FACET_LOCATIONS', 10)
+    locations = sorted(rows, key=lambda row: (-row['total'], row['location']))[:top]
+    return {
+        'is_remote': sum(row['remote'] for row in rows),
+        'visa_sponsorship': sum(row['visa'] for row in rows),
+        'salary_bands': [
+            {
+                'label': _band_label(low, high),
+                'count': sum(row[f'band_{i}'] for row in rows),
+            }
+            for i, (low, high) in enumerate(bands)
+        ],
+        'locations': [{'location': row['location'], 'count': row['total']} for row in locations],
+    }
+
+
+def search_page(params):
+    """Run a search and return one bounded page of results plus paging metadata.
+
+    Browsing is keyset-paginated on (created_at, id). Keyword searches page through
+    their ranked id list instead, which is already capped at JOB_SEARCH_MAX_RANKED.
+    """
+    page_size = clamp_page_size(
+        params.get('page_size'),
+        getattr(settings, 'JOB_SEARCH_PAGE_SIZE', 20),
+        getattr(settings, 'JOB_SEARCH_MAX_PAGE_SIZE', 100),
+    )
+    cursor = params.get('cursor')
+    jobs, ranked_ids, corrections = filter_postings(params, vocabulary=get_autocomplete())
+    jobs = jobs.select_related('recruiter')
+
+    if ranked_ids is None:
+        rows, next_cursor = keyset_page(jobs, cursor, page_size)
+        total, total_capped = approximate_count(jobs, getattr(settings, 'JOB_SEARCH_COUNT_CAP', 1000))
+    else:
+        position = decode_cursor(cursor)
+        offset = position.get('o', 0) if isinstance(position, dict) else 0
+        rank = {pk: i for i, pk in enumerate(ranked_ids)}
+        matched = sorted(jobs.values_list('pk', flat=True), key=rank.__getitem__)
+        page_ids = matched[offset:offset + page_size]
+        by_id = jobs.in_bulk(page_ids)
+        rows = [by_id[pk] for pk in page_ids if pk in by_id]
+        next_cursor = None
+        if offset + page_size < len(matched):
+            next_cursor = encode_cursor({'o': offset + page_size})
+        total, total_capped = len(matched), False
+
+    return {
+        'jobs': rows,
+        'facets': facet_counts(jobs),
+        'corrections': corrections,
+        'next_cursor': next_cursor,
+        'total': total,
+        'total_capped': total_capped,
+        'page_size': page_size,
+    }
+
+
+# Public field name -> ORM lookup for the JSON search API's ?fields= projection.
+API_FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'description': 'description',
+    'required_skills': 'required_skills',
+    'location': 'location',
+    'latitude': 'latitude',
+    'longitude': 'longitude',
+    'salary_min': 'salary_min',
+    'salary_max': 'salary_max',
+    'is_remote': 'is_remote',
+    'visa_sponsorship': 'visa_sponsorship',
+    'recruiter': 'recruiter__username',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+    'distance_miles': 'distance_miles',
+}
+DEFAULT_API_FIELDS = (
+    'id', 'title', 'location', 'salary_min', 'salary_max',
+    'is_remote', 'visa_sponsorship', 'created_at',
+)
+
+
+def parse_api_fields(params):
+    """Validate the ?fields= projection of an API request; returns (fields, unknown_fields)."""
+    value = params.get('fields', '')
+    if not value:
+        return list(DEFAULT_API_FIELDS), []
+    fields = []
+    for name in value.split(','):
+        name = name.strip()
+        if name and name not in fields:
+            fields.append(name)
+    allowed = set(API_FIELDS)
+    if not parse_point(params.get('near', '')):
+        # Distances only exist for radius searches.
+        allowed.discard('distance_miles')
+    return fields, [name for name in fields if name not in allowed]
+
+
+def iter_postings(params, fields, chunk_size=2000):
+    """Stream the full result set of a search as dicts holding only `fields`.
+
+    Rows are read with values() and a server-side iterator, so no model instances
+    are built and memory stays flat however many postings match.
+    """
+    jobs, ranked_ids, _ = filter_postings(params, vocabulary=get_autocomplete())
+    if ranked_ids is None:
+        jobs = jobs.order_by('-created_at', '-id')
+    else:
+        # At most JOB_SEARCH_MAX_RANKED ids, so the CASE stays small.
+        jobs = jobs.order_by(Case(
+            *[When(pk=pk, then=i) for i, pk in enumerate(ranked_ids)], default=len(ranked_ids)
+        ))
+    lookups = [API_FIELDS[name] for name in fields]
+    for row in jobs.values_list(*lookups).iterator(chunk_size=chunk_size):
+        yield dict(zip(fields, row))
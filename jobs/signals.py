@@ -0,0 +1,153 @@
+"""Model signal handlers that keep derived data in sync with JobPosting/JobSeekerProfile.
+
+Registered from JobsConfig.ready(). Anything written with `bulk_create` or
+`QuerySet.update()` bypasses these handlers and must call the helpers directly, and
+`record_change` so other processes' in-memory indexes pick the rows up.
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .alerts import index_search
+from .autocomplete import loaded_autocomplete
+from .cache import POSTINGS, PROFILES
+from .candidates import loaded_candidate_matrix
+from .embeddings import (
+    POSTING_FIELDS, PROFILE_FIELDS, loaded_job_index, loaded_profile_index,
+    save_posting_embedding, save_profile_embedding,
+)
+from .changelog import record_change
+from .geocoding import geocode_posting
+from .messaging import message_added
+from .models import (
+    JobPosting, JobRecommendation, JobSeekerProfile, Message, SavedSearch, SimilarPosting, SkillSynonym,
+)
+from .recommendations import full_profile_ids, is_visible, refill_profiles, refresh_posting, refresh_profile
+from .similar import SIMILARITY_FIELDS, full_posting_ids, refill_similar, refresh_similar
+from .skills import release_skills, sync_posting_skills, sync_profile_skills
+from .synonyms import invalidate as invalidate_synonyms
+from .trending import posting_visibility_changed
+
+
+def _field_changed(field, update_fields):
+    return update_fields is None or field in update_fields
+
+
+@receiver(pre_save, sender=JobPosting)
+def job_posting_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    # Coordinates can only be written along with the rest of the row.
+    if update_fields is None:
+        geocode_posting(instance)
+
+
+@receiver(post_save, sender=JobPosting)
+def job_posting_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if _field_changed('required_skills', update_fields):
+        sync_posting_skills(instance)
+    record_change(POSTINGS, instance.pk)
+    autocomplete = loaded_autocomplete()
+    if autocomplete is not None:
+        autocomplete.posting_changed(instance)
+    vector = None
+    if any(_field_changed(field, update_fields) for field in POSTING_FIELDS):
+        vector = save_posting_embedding(instance)
+    index = loaded_job_index()
+    if index is not None:
+        index.update(instance.pk, is_visible(instance), vector=vector)
+    refresh_posting(instance)
+    # Also prunes it from every "similar jobs" list once it is no longer visible.
+    if any(_field_changed(field, update_fields) for field in SIMILARITY_FIELDS):
+        refresh_similar(instance)
+    if _field_changed('status', update_fields) or _field_changed('moderation_status', update_fields):
+        posting_visibility_changed(instance, is_visible(instance))
+
+
+@receiver(pre_delete, sender=JobPosting)
+def job_posting_deleting(sender, instance, **kwargs):
+    release_skills(instance)
+    # The cascade removes this posting's recommendation rows; remember whose lists
+    # were full so they can be refilled with their next-best posting.
+    recommended_to = JobRecommendation.objects.filter(job=instance).values_list('profile_id', flat=True)
+    instance._refill_profile_ids = full_profile_ids(recommended_to)
+    listed_by = SimilarPosting.objects.filter(similar=instance).values_list('posting_id', flat=True)
+    instance._refill_similar_ids = full_posting_ids(listed_by)
+
+
+@receiver(post_delete, sender=JobPosting)
+def job_posting_deleted(sender, instance, **kwargs):
+    record_change(POSTINGS, instance.pk)
+    autocomplete = loaded_autocomplete()
+    if autocomplete is not None:
+        autocomplete.posting_removed(instance.pk)
+    index = loaded_job_index()
+    if index is not None:
+        index.remove(instance.pk)
+    refill_profiles(getattr(instance, '_refill_profile_ids', ()))
+    refill_similar(getattr(instance, '_refill_similar_ids', ()))
+
+
+@receiver(post_save, sender=JobSeekerProfile)
+def job_seeker_profile_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if _field_changed('skills', update_fields):
+        sync_profile_skills(instance)
+    record_change(PROFILES, instance.pk)
+    autocomplete = loaded_autocomplete()
+    if autocomplete is not None:
+        autocomplete.profile_changed(instance)
+    matrix = loaded_candidate_matrix()
+    if matrix is not None:
+        matrix.profile_changed(instance, instance.skill_tags.values_list('id', flat=True))
+    vector = None
+    if any(_field_changed(field, update_fields) for field in PROFILE_FIELDS):
+        vector = save_profile_embedding(instance)
+    index = loaded_profile_index()
+    if index is not None:
+        index.update(instance.pk, instance.profile_visible, instance.user_id, vector)
+    refresh_profile(instance)
+
+
+@receiver(pre_delete, sender=JobSeekerProfile)
+def job_seeker_profile_deleting(sender, instance, **kwargs):
+    release_skills(instance)
+
+
+@receiver(post_delete, sender=JobSeekerProfile)
+def job_seeker_profile_deleted(sender, instance, **kwargs):
+    record_change(PROFILES, instance.pk)
+    autocomplete = loaded_autocomplete()
+    if autocomplete is not None:
+        autocomplete.profile_removed(instance.pk)
+    matrix = loaded_candidate_matrix()
+    if matrix is not None:
+        matrix.profile_removed(instance.pk)
+    index = loaded_profile_index()
+    if index is not None:
+        index.remove(instance.pk)
+
+
+@receiver(post_save, sender=SkillSynonym)
+@receiver(post_delete, sender=SkillSynonym)
+def skill_synonym_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Existing skill links keep the old names until `manage.py backfill_skills` runs.
+    invalidate_synonyms()
+
+
+@receiver(post_save, sender=SavedSearch)
+def saved_search_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    index_search(instance)
+
+
+@receiver(post_save, sender=Message)
+def message_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw or not created:
+        return
+    message_added(instance)
@@ -0,0 +1,219 @@
+"""Precomputed "similar jobs": each visible posting's nearest neighbours.
+
+Two visible postings that share at least one skill are scored on
+* skills: weighted Jaccard of the two skill sets, each skill weighted by its IDF, so
+  sharing a rare skill counts for more than sharing a common one;
+* location: 1 for the same place or both remote, falling off linearly to 0 at
+  JOB_SIMILAR_RADIUS_MILES between geocoded locations;
+* salary: overlap of the two salary ranges (intersection over union);
+blended with SIMILARITY_WEIGHTS. The score is symmetric, so a change to one posting
+only moves the rows that involve it.
+
+Each posting keeps its best JOB_SIMILAR_POSTINGS neighbours in SimilarPosting, so the
+apply page reads them with one indexed query. The rows are kept current from the save
+signals:
+
+* saving a posting recomputes its own list and offers it to the list of every posting
+  it was scored against (`refresh_similar`);
+* a posting that stops being visible (paused, closed, or rejected or flagged in
+  moderation) drops out of every list the same way, and a deleted one through the
+  cascade; lists it leaves a gap in are refilled (`refill_similar`).
+
+Candidates come from a grouped join over the skill link table, cut to the
+JOB_SIMILAR_CANDIDATES best by shared skill weight, so nothing here scans all postings.
+`manage.py compute_similar_postings` rebuilds every list, e.g. after a bulk import.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+
+from .geocoding import distance_miles, normalize_location
+from .models import JobPosting, SimilarPosting
+from .recommendations import PostingSkill, is_visible, job_scores, skill_weights
+
+SIMILARITY_WEIGHTS = {'skills': 0.6, 'location': 0.25, 'salary': 0.15}
+
+# Saving a posting with any of these fields can change its neighbours.
+SIMILARITY_FIELDS = (
+    'required_skills', 'location', 'latitude', 'longitude', 'salary_min', 'salary_max',
+    'is_remote', 'status', 'moderation_status',
+)
+
+_ATTRIBUTES = ('id', 'location', 'latitude', 'longitude', 'salary_min', 'salary_max', 'is_remote')
+
+
+def per_posting():
+    return getattr(settings, 'JOB_SIMILAR_POSTINGS', 10)
+
+
+# -------------------------
+# SIMILARITY
+# -------------------------
+def location_similarity(a, b):
+    if a['is_remote'] and b['is_remote']:
+        return 1.0
+    if None not in (a['latitude'], a['longitude'], b['latitude'], b['longitude']):
+        miles = distance_miles(a['latitude'], a['longitude'], b['latitude'], b['longitude'])
+        return max(0.0, 1.0 - miles / getattr(settings, 'JOB_SIMILAR_RADIUS_MILES', 100))
+    place = normalize_location(a['location'])
+    return 1.0 if place and place == normalize_location(b['location']) else 0.0
+
+
+def _salary_range(posting):
+    low, high = posting['salary_min'], posting['salary_max']
+    if low is None and high is None:
+        return None
+    low = high if low is None else low
+    high = low if high is None else high
+    return min(low, high), max(low, high)
+
+
+def salary_similarity(a, b):
+    a, b = _salary_range(a), _salary_range(b)
+    if a is None or b is None:
+        return 0.0
+    union = max(a[1], b[1]) - min(a[0], b[0])
+    if not union:
+        return 1.0
+    return max(0, min(a[1], b[1]) - max(a[0], b[0])) / union
+
+
+def skill_similarity(a, b, weights):
+    union = sum(weights.get(skill_id, 1.0) for skill_id in a | b)
+    return sum(weights.get(skill_id, 1.0) for skill_id in a & b) / union if union else 0.0
+
+
+def similarity(a, b, a_skills, b_skills, weights):
+    """Blended similarity of two postings' attribute dicts, rounded to 6 places."""
+    return round(
+        SIMILARITY_WEIGHTS['skills'] * skill_similarity(a_skills, b_skills, weights)
+        + SIMILARITY_WEIGHTS['location'] * location_similarity(a, b)
+        + SIMILARITY_WEIGHTS['salary'] * salary_similarity(a, b),
+        6,
+    )
+
+
+# -------------------------
+# NEIGHBOURS
+# -------------------------
+def _skill_sets(posting_ids):
+    skills = defaultdict(set)
+    links = PostingSkill.objects.filter(jobposting_id__in=list(posting_ids)).values_list('jobposting_id', 'skill_id')
+    for posting_id, skill_id in links:
+        skills[posting_id].add(skill_id)
+    return skills
+
+
+def scored_neighbours(posting_id):
+    """Visible postings sharing a skill with this one as (id, score), best first."""
+    skill_sets = _skill_sets([posting_id])
+    skills = skill_sets[posting_id]
+    if not skills:
+        return []
+    weights = skill_weights(skills, 'idf')
+    candidate_ids = list(
+        job_scores(weights).exclude(jobposting_id=posting_id)
+        .values_list('jobposting_id', flat=True)[:getattr(settings, 'JOB_SIMILAR_CANDIDATES', 200)]
+    )
+    if not candidate_ids:
+        return []
+    skill_sets.update(_skill_sets(candidate_ids))
+    others = set().union(*skill_sets.values()) - set(weights)
+    weights.update(skill_weights(others, 'idf'))
+    attributes = {
+        row['id']: row
+        for row in JobPosting.objects.filter(id__in=[posting_id, *candidate_ids]).values(*_ATTRIBUTES)
+    }
+    this = attributes[posting_id]
+    scored = [
+        (pk, similarity(this, attributes[pk], skills, skill_sets[pk], weights))
+        for pk in candidate_ids if pk in attributes
+    ]
+    scored.sort(key=lambda row: (row[1], row[0]), reverse=True)
+    return [(pk, score) for pk, score in scored if score > 0]
+
+
+def similar_postings(posting, limit=None):
+    """A posting's stored neighbours, best first, with their recruiters (one query)."""
+    rows = (
+        SimilarPosting.objects.filter(posting=posting)
+        .select_related('similar__recruiter')
+        .order_by('-score', '-similar_id')[:limit or per_posting()]
+    )
+    return [row.similar for row in rows]
+
+
+# -------------------------
+# MAINTENANCE
+# -------------------------
+def _replace(posting_id, rows):
+    """Make `rows` of (id, score) the posting's whole stored list."""
+    with transaction.atomic():
+        SimilarPosting.objects.filter(posting_id=posting_id).delete()
+        SimilarPosting.objects.bulk_create(
+            [SimilarPosting(posting_id=posting_id, similar_id=pk, score=score) for pk, score in rows]
+        )
+
+
+def full_posting_ids(posting_ids):
+    """The postings among `posting_ids` whose lists are full, i.e. may have had a
+    next-best neighbour cut off."""
+    if not posting_ids:
+        return set()
+    return set(
+        SimilarPosting.objects.filter(posting_id__in=list(posting_ids))
+        .values('posting_id')
+        .annotate(rows=Count('id'))
+        .filter(rows__gte=per_posting())
+        .values_list('posting_id', flat=True)
+    )
+
+
+def _trim(posting_ids):
+    """Drop rows that fell below a posting's top N."""
+    if not posting_ids:
+        return
+    overflow = (
+        SimilarPosting.objects.filter(posting_id__in=list(posting_ids))
+        .annotate(position=Window(
+            RowNumber(),
+            partition_by=[F('posting_id')],
+            order_by=[F('score').desc(), F('similar_id').desc()],
+        ))
+        .filter(position__gt=per_posting())
+        .values_list('id', flat=True)
+    )
+    SimilarPosting.objects.filter(id__in=list(overflow)).delete()
+
+
+def refill_similar(posting_ids):
+    """Recompute the lists of these postings from scratch."""
+    for posting_id in posting_ids:
+        _replace(posting_id, scored_neighbours(posting_id)[:per_posting()])
+
+
+def refresh_similar(posting):
+    """Recompute a posting's own list and its place in its neighbours' lists.
+
+    A posting that is not visible gets no list and is removed from every other one.
+    """
+    previous = dict(SimilarPosting.objects.filter(similar=posting).values_list('posting_id', 'score'))
+    scored = scored_neighbours(posting.pk) if is_visible(posting) else []
+    scores = dict(scored)
+    # Lists where this posting dropped or scores lower may now have room for another.
+    refill = full_posting_ids({pk for pk, score in previous.items() if scores.get(pk, 0) < score})
+    with transaction.atomic():
+        _replace(posting.pk, scored[:per_posting()])
+        SimilarPosting.objects.filter(similar=posting).exclude(posting_id__in=list(scores)).delete()
+        SimilarPosting.objects.bulk_create(
+            [SimilarPosting(posting_id=pk, similar=posting, score=score) for pk, score in scored],
+            update_conflicts=True,
+            unique_fields=['posting', 'similar'],
+            update_fields=['score'],
+            batch_size=500,
+        )
+        _trim(scores.keys())
+    refill_similar(refill)
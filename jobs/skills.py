@@ -0,0 +1,151 @@
+"""Helpers for turning the free-text skill lists into indexed Skill links.
+
+`JobPosting.required_skills` and `JobSeekerProfile.skills` remain plain comma-separated
+text (that is what the forms and templates show). Everything that filters or scores on
+skills goes through the normalized `Skill` table instead, so lookups are indexed joins
+rather than LIKE scans or per-row string splitting in Python.
+"""
+import re
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Skill, JobPosting, JobSeekerProfile
+from .synonyms import canonical_skill
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_skill(name):
+    """Return the canonical form of a single skill name ('' if it is blank).
+
+    This is the one place skill names are normalized: aliases are mapped to their
+    canonical name through the synonym dictionary (jobs/synonyms.py).
+    """
+    name = _WHITESPACE_RE.sub(' ', (name or '').strip().lower())
+    return canonical_skill(name)[:100] if name else ''
+
+
+def parse_skills(text):
+    """Split a comma-separated skill string into unique normalized names, keeping order."""
+    seen = []
+    for part in (text or '').split(','):
+        name = normalize_skill(part)
+        if name and name not in seen:
+            seen.append(name)
+    return seen
+
+
+def dedupe_skills(text):
+    """Drop entries of a comma-separated skill string that repeat an earlier skill.
+
+    Entries are compared by their canonical name, so "JS, JavaScript" keeps only "JS";
+    the entries that remain keep the casing they were typed with.
+    """
+    seen, kept = set(), []
+    for part in (text or '').split(','):
+        name = normalize_skill(part)
+        if name and name not in seen:
+            seen.add(name)
+            kept.append(part.strip())
+    return ', '.join(kept)
+
+
+def get_skill_ids(names, create=True):
+    """Map normalized names to Skill ids, creating missing rows in one bulk insert."""
+    names = set(names)
+    if not names:
+        return {}
+    found = dict(Skill.objects.filter(name__in=names).values_list('name', 'id'))
+    missing = names - set(found)
+    if missing and create:
+        Skill.objects.bulk_create([Skill(name=n) for n in missing], ignore_conflicts=True)
+        found.update(Skill.objects.filter(name__in=missing).values_list('name', 'id'))
+    return found
+
+
+# Document-frequency columns on Skill, per model whose skill links they count.
+_COUNT_FIELDS = {JobPosting: 'posting_count', JobSeekerProfile: 'profile_count'}
+
+
+def _adjust_counts(field, added=(), removed=()):
+    if added:
+        Skill.objects.filter(id__in=list(added)).update(**{field: F(field) + 1})
+    if removed:
+        Skill.objects.filter(id__in=list(removed)).update(**{field: F(field) - 1})
+
+
+def _sync(obj, text):
+    """Point `obj.skill_tags` at the skills listed in `text`, keeping the counts in step."""
+    ids = set(get_skill_ids(parse_skills(text)).values())
+    current = set(obj.skill_tags.values_list('id', flat=True))
+    added, removed = ids - current, current - ids
+    if removed:
+        obj.skill_tags.remove(*removed)
+    if added:
+        obj.skill_tags.add(*added)
+    _adjust_counts(_COUNT_FIELDS[type(obj)], added, removed)
+
+
+def sync_posting_skills(posting):
+    """Point `posting.skill_tags` at the skills currently listed in `required_skills`."""
+    _sync(posting, posting.required_skills)
+
+
+def sync_profile_skills(profile):
+    """Point `profile.skill_tags` at the skills currently listed in `skills`."""
+    _sync(profile, profile.skills)
+
+
+def release_skills(obj):
+    """Take a posting/profile that is about to be deleted out of the skill counts."""
+    _adjust_counts(_COUNT_FIELDS[type(obj)], removed=obj.skill_tags.values_list('id', flat=True))
+
+
+def recount_skills(skill_ids=None):
+    """Recompute `posting_count`/`profile_count` from the link tables.
+
+    Only for bulk paths (`_bulk_sync`, the backfill command); saves and deletes
+    adjust the counts incrementally.
+    """
+    skills = Skill.objects.all() if skill_ids is None else Skill.objects.filter(id__in=list(skill_ids))
+    updates = {}
+    for model, field in _COUNT_FIELDS.items():
+        through = model.skill_tags.through
+        links = through.objects.filter(skill_id=OuterRef('pk')).values('skill_id').annotate(n=Count('id'))
+        updates[field] = Coalesce(Subquery(links.values('n')), 0)
+    return skills.update(**updates)
+
+
+def _bulk_sync(model, text_field, objects):
+    """Replace the skill links of many objects with two deletes/inserts per batch.
+
+    Used by the backfill command and by code paths that write rows with
+    `bulk_create`/`update()`, which do not send the save signals.
+    """
+    objects = list(objects)
+    if not objects:
+        return 0
+    through = model.skill_tags.through
+    fk_name = f'{model._meta.model_name}_id'
+    parsed = {obj.pk: parse_skills(getattr(obj, text_field)) for obj in objects}
+    ids = get_skill_ids(name for names in parsed.values() for name in names)
+
+    links = through.objects.filter(**{f'{fk_name}__in': list(parsed)})
+    touched = set(links.values_list('skill_id', flat=True)) | set(ids.values())
+    links.delete()
+    through.objects.bulk_create([
+        through(**{fk_name: pk, 'skill_id': ids[name]})
+        for pk, names in parsed.items()
+        for name in names
+    ])
+    recount_skills(touched)
+    return len(objects)
+
+
+def bulk_sync_posting_skills(postings):
+    return _bulk_sync(JobPosting, 'required_skills', postings)
+
+
+def bulk_sync_profile_skills(profiles):
+    return _bulk_sync(JobSeekerProfile, 'skills', profiles)
@@ -0,0 +1,121 @@
+"""Skill synonym dictionary: maps aliases ("JS", "Postgres") to one canonical name.
+
+The dictionary is the versioned file at settings.JOB_SKILL_SYNONYMS plus the
+SkillSynonym override rows edited in the admin. Both are compiled once per process
+into a read-only mapping keyed on a squashed form of the name (lowercase, without
+spaces, dots, dashes or underscores), so "Java Script" and "javascript" share a key.
+
+Saving or deleting an override bumps the SYNONYMS version counter. This process drops
+its compiled map at once; other processes notice the new version within
+JOB_SKILL_SYNONYMS_RECHECK seconds and recompile.
+"""
+import csv
+import re
+import threading
+import time
+from types import MappingProxyType
+
+from django.conf import settings
+from django.db import DatabaseError
+
+from .models import SkillSynonym
+
+_SQUASH_RE = re.compile(r'[\s._-]+')
+_VERSION_RE = re.compile(r'^#\s*version:\s*(\S+)', re.IGNORECASE)
+
+
+def squash(name):
+    return _SQUASH_RE.sub('', name)
+
+
+def _clean(name):
+    return ' '.join((name or '').lower().split())
+
+
+def load_file(path=None):
+    """Read the synonym file into ({squashed alias: canonical}, file version)."""
+    path = path or settings.JOB_SKILL_SYNONYMS
+    mapping = {}
+    version = None
+    with open(path, newline='', encoding='utf-8') as handle:
+        lines = []
+        for line in handle:
+            match = _VERSION_RE.match(line)
+            if match:
+                version = match.group(1)
+            elif not line.startswith('#'):
+                lines.append(line)
+    for row in csv.DictReader(lines):
+        canonical = _clean(row['canonical'])
+        if not canonical:
+            continue
+        mapping[squash(canonical)] = canonical
+        for alias in (row.get('aliases') or '').split('|'):
+            if _clean(alias):
+                mapping[squash(_clean(alias))] = canonical
+    return mapping, version
+
+
+class Synonyms:
+    """A compiled, read-only alias -> canonical lookup."""
+
+    def __init__(self, mapping, file_version, version):
+        self.mapping = MappingProxyType(mapping)
+        self.file_version = file_version
+        self.version = version
+        self.checked_at = time.monotonic()
+
+    @classmethod
+    def compile(cls):
+        version = _current_version()
+        mapping, file_version = load_file()
+        try:
+            overrides = list(SkillSynonym.objects.values_list('alias', 'canonical'))
+        except DatabaseError:
+            # Table not migrated yet (e.g. while running migrations); use the file alone.
+            overrides = []
+        for alias, canonical in overrides:
+            if _clean(alias) and _clean(canonical):
+                mapping[squash(_clean(alias))] = _clean(canonical)
+        return cls(mapping, file_version, version)
+
+    def canonical(self, name):
+        """Canonical form of an already lowercased, whitespace-collapsed name."""
+        return self.mapping.get(squash(name), name)
+
+
+def _current_version():
+    from .cache import SYNONYMS, get_version
+    return get_version(SYNONYMS)
+
+
+_synonyms = None
+_compile_lock = threading.Lock()
+
+
+def get_synonyms():
+    """The compiled dictionary for this process, recompiled if an override changed."""
+    global _synonyms
+    current = _synonyms
+    if current is not None:
+        if time.monotonic() - current.checked_at < getattr(settings, 'JOB_SKILL_SYNONYMS_RECHECK', 1.0):
+            return current
+        if current.version == _current_version():
+            current.checked_at = time.monotonic()
+            return current
+    with _compile_lock:
+        if _synonyms is current:
+            _synonyms = Synonyms.compile()
+        return _synonyms
+
+
+def invalidate():
+    """Drop the compiled dictionary here and tell other processes to drop theirs."""
+    global _synonyms
+    from .cache import SYNONYMS, bump_version
+    bump_version(SYNONYMS)
+    _synonyms = None
+
+
+def canonical_skill(name):
+    return get_synonyms().canonical(name)
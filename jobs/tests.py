@@ -1,3 +1,1468 @@
-from django.test import TestCase
+import asyncio
+import json
+import time
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.core import signing
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+
+from . import autocomplete, candidates, embeddings, synonyms, trending
+from .alerts import matches, percolate, search_terms
+from .changelog import record_change
+from .events import DatabaseBroker, Hub, publish
+from .cache import POSTINGS, PROFILES, cached_search_page, canonical_search_params, search_cache_key, search_cache_stats
+from .messaging import bulk_send, mark_all_read, message_read, search_messages, send_message, thread_read, unread_count
+from .models import (
+    JobApplication, JobPosting, JobRecommendation, JobSeekerProfile, Message, PostingTrend, SavedSearch, SavedSearchTerm,
+    SearchAlert, SimilarPosting, Skill, SkillSynonym, Thread, TrendingEpoch, UnreadCount, UserEvent,
+)
+from .recommendations import (
+    candidate_page, compute_shard, recommendation_page, refresh_idf_weights, skill_weights,
+)
+from .pagination import decode_cursor, encode_cursor
+from .search import (
+    DEFAULT_API_FIELDS, facet_counts, filter_postings, ranked_posting_ids, rebuild_index, search_page,
+)
+from .similar import scored_neighbours, similar_postings
+from .skills import dedupe_skills, get_skill_ids, parse_skills
+
+
+def make_user(username, user_type='job_seeker'):
+    return CustomUser.objects.create_user(username, password='x', user_type=user_type)
+
+
+class InMemoryIndexMixin:
+    """Start every test without the process-wide indexes built by earlier tests, whose
+    in-place patches outlive the rolled-back transactions."""
+
+    def setUp(self):
+        super().setUp()
+        autocomplete._autocomplete = None
+        candidates._matrix = None
+        embeddings._indexes.clear()
+
+
+# -------------------------
+# SKILLS
+# -------------------------
+class SkillLinkTests(TestCase):
+    def setUp(self):
+        self.recruiter = make_user('rec', 'recruiter')
+
+    def post(self, skills):
+        return JobPosting.objects.create(
+            recruiter=self.recruiter, title='Developer', description='', required_skills=skills,
+            location='', status='active', moderation_status='approved',
+        )
+
+    def counts(self):
+        return dict(Skill.objects.values_list('name', 'posting_count'))
+
+    def test_get_skill_ids_creates_missing_names_in_one_insert(self):
+        existing = Skill.objects.create(name='python')
+        self.assertEqual(get_skill_ids([]), {})
+        self.assertEqual(get_skill_ids(['python', 'rust'], create=False), {'python': existing.pk})
+        with CaptureQueriesContext(connection) as queries:
+            ids = get_skill_ids(['python', 'rust', 'go', 'rust'])
+        self.assertEqual(len(queries), 3)
+        self.assertEqual(ids, dict(Skill.objects.values_list('name', 'id')))
+        self.assertEqual(ids['python'], existing.pk)
+
+    def test_parse_skills_normalizes_and_dedupes(self):
+        self.assertEqual(parse_skills(' Python ,  Machine   Learning, python,, '), ['python', 'machine learning'])
+
+    def test_links_and_counts_follow_edits_and_deletes(self):
+        posting = self.post('Python, SQL')
+        self.post('python')
+        self.assertCountEqual(posting.skill_tags.values_list('name', flat=True), ['python', 'sql'])
+        self.assertEqual(self.counts(), {'python': 2, 'sql': 1})
+        posting.required_skills = 'SQL, Rust'
+        posting.save()
+        self.assertCountEqual(posting.skill_tags.values_list('name', flat=True), ['rust', 'sql'])
+        self.assertEqual(self.counts(), {'python': 1, 'sql': 1, 'rust': 1})
+        posting.delete()
+        self.assertEqual(self.counts(), {'python': 1, 'sql': 0, 'rust': 0})
+
+    def test_profiles_are_counted_separately(self):
+        JobSeekerProfile.objects.create(user=make_user('seek'), skills='Python')
+        self.post('Python')
+        python = Skill.objects.get(name='python')
+        self.assertEqual((python.posting_count, python.profile_count), (1, 1))
+
+
+class SkillSynonymTests(TestCase):
+    def setUp(self):
+        # The compiled dictionary outlives the rolled-back override rows.
+        synonyms._synonyms = None
+        self.addCleanup(setattr, synonyms, '_synonyms', None)
+        self.recruiter = make_user('rec', 'recruiter')
+
+    def post(self, skills):
+        return JobPosting.objects.create(
+            recruiter=self.recruiter, title='Developer', description='', required_skills=skills,
+            location='', status='active', moderation_status='approved',
+        )
+
+    def test_aliases_map_to_one_canonical_name(self):
+        self.assertEqual(parse_skills('JS, Java Script, ECMAScript, Postgres, psql'), ['javascript', 'postgresql'])
+        self.assertEqual(dedupe_skills('JS, JavaScript, Postgres, SQL'), 'JS, Postgres, SQL')
+
+    def test_aliases_share_one_skill_row(self):
+        first, second = self.post('JS'), self.post('JavaScript')
+        self.assertEqual(list(Skill.objects.values_list('name', 'posting_count')), [('javascript', 2)])
+        jobs = filter_postings({'skills': 'java-script'})[0]
+        self.assertCountEqual(jobs.values_list('pk', flat=True), [first.pk, second.pk])
+
+    def test_overrides_win_over_the_file_and_apply_at_once(self):
+        self.assertEqual(parse_skills('js'), ['javascript'])
+        override = SkillSynonym.objects.create(alias='JS', canonical='JScript')
+        self.assertEqual(parse_skills('js, k8s'), ['jscript', 'kubernetes'])
+        SkillSynonym.objects.create(alias='K8s', canonical='Kube')
+        self.assertEqual(parse_skills('js, k8s'), ['jscript', 'kube'])
+        override.delete()
+        self.assertEqual(parse_skills('js'), ['javascript'])
+
+    def test_backfill_relinks_after_a_dictionary_change(self):
+        posting = self.post('Golang')
+        self.assertEqual(list(posting.skill_tags.values_list('name', flat=True)), ['go'])
+        SkillSynonym.objects.create(alias='golang', canonical='golang')
+        call_command('backfill_skills', stdout=StringIO())
+        self.assertEqual(list(posting.skill_tags.values_list('name', flat=True)), ['golang'])
+        self.assertEqual(dict(Skill.objects.values_list('name', 'posting_count')), {'go': 0, 'golang': 1})
+
+
+# -------------------------
+# RECOMMENDATIONS
+# -------------------------
+@override_settings(
+    JOB_RECOMMENDATIONS_PER_SEEKER=2,
+    JOB_RECOMMENDATION_SCORING={'recommended_jobs': 'overlap', 'posting_recommendations': 'overlap'},
+)
+class MaterializedRecommendationTests(InMemoryIndexMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.recruiter = make_user('rec', 'recruiter')
+        self.profile = JobSeekerProfile.objects.create(user=make_user('seek'), skills='python, django, sql')
+
+    def post(self, title, skills, **fields):
+        fields.setdefault('status', 'active')
+        fields.setdefault('moderation_status', 'approved')
+        return JobPosting.objects.create(
+            recruiter=self.recruiter, title=title, description='', required_skills=skills, location='', **fields
+        )
+
+    def stored(self, profile=None):
+        rows = JobRecommendation.objects.filter(profile=profile or self.profile)
+        return dict(rows.values_list('job__title', 'score'))
+
+    def test_saving_a_posting_stores_its_score_for_matching_seekers(self):
+        self.post('Backend', 'Python, Django')
+        self.post('Frontend', 'React')
+        self.assertEqual(self.stored(), {'Backend': 2.0})
+
+    def test_hidden_postings_are_not_stored(self):
+        self.post('Pending', 'Python', status='pending', moderation_status='pending')
+        self.assertEqual(self.stored(), {})
+
+    def test_lists_are_trimmed_to_the_top_n(self):
+        self.post('One skill', 'Python')
+        self.post('Two skills', 'Python, Django')
+        self.post('Three skills', 'Python, Django, SQL')
+        self.assertEqual(self.stored(), {'Three skills': 3.0, 'Two skills': 2.0})
+
+    def test_a_posting_below_a_full_lists_cutoff_is_not_written(self):
+        self.post('Two skills', 'Python, Django')
+        self.post('Also two skills', 'Django, SQL')
+        weak = self.post('One skill', 'Python')
+        self.assertFalse(JobRecommendation.objects.filter(job=weak).exists())
+        self.assertEqual(self.stored(), {'Two skills': 2.0, 'Also two skills': 2.0})
+
+    def test_equal_scores_keep_the_newest_posting(self):
+        self.post('Older', 'Python')
+        self.post('Newer', 'Django')
+        self.post('Newest', 'SQL')
+        self.assertEqual(self.stored(), {'Newer': 1.0, 'Newest': 1.0})
+
+    def test_hiding_a_listed_posting_refills_the_list(self):
+        best = self.post('Best', 'Python, Django, SQL')
+        self.post('Second', 'Python, Django')
+        self.post('Third', 'Python')
+        best.status = 'closed'
+        best.save()
+        self.assertEqual(self.stored(), {'Second': 2.0, 'Third': 1.0})
+
+    def test_saving_a_profile_recomputes_its_list(self):
+        self.post('Backend', 'Python, Django')
+        self.post('Frontend', 'React, CSS')
+        self.profile.skills = 'react'
+        self.profile.save()
+        self.assertEqual(self.stored(), {'Frontend': 1.0})
+
+    def test_a_misspelled_skill_scores_the_same_from_either_side(self):
+        self.post('Python one', 'Python')
+        self.post('Python two', 'Python, Go')
+        typo = JobSeekerProfile.objects.create(user=make_user('typo'), skills='pyhton')
+        self.assertEqual(self.stored(typo), {'Python one': 1.0, 'Python two': 1.0})
+        posting = self.post('Python three', 'Python')
+        self.assertTrue(JobRecommendation.objects.filter(profile=typo, job=posting).exists())
+
+    def test_seekers_without_skills_see_the_newest_postings(self):
+        self.profile.skills = ''
+        self.profile.save()
+        older = self.post('Older', 'Python')
+        newer = self.post('Newer', 'React')
+        page, cursor = recommendation_page(self.profile, page_size=1)
+        self.assertEqual(page, [(newer.pk, 0)])
+        self.assertIsNotNone(cursor)
+        page, cursor = recommendation_page(self.profile, cursor, page_size=1)
+        self.assertEqual(page, [(older.pk, 0)])
+        self.assertIsNone(cursor)
+
+
+@override_settings(
+    JOB_RECOMMENDATIONS_PER_SEEKER=3,
+    JOB_RECOMMENDATION_SCORING={'recommended_jobs': 'idf', 'posting_recommendations': 'idf'},
+)
+class IdfRecommendationTests(InMemoryIndexMixin, TestCase):
+    SKILLS = ['python', 'django', 'sql', 'react', 'go', 'rust', 'docker', 'aws']
+
+    def setUp(self):
+        super().setUp()
+        self.recruiter = make_user('rec', 'recruiter')
+
+    def seed(self):
+        # Interleaved so that every save shifts the document frequencies.
+        for i in range(12):
+            JobPosting.objects.create(
+                recruiter=self.recruiter, title=f'Job {i}', description='', location='',
+                required_skills=', '.join(self.SKILLS[i % 8:i % 8 + 1 + i % 3]),
+                status='active', moderation_status='approved',
+            )
+            if i % 2:
+                JobSeekerProfile.objects.create(
+                    user=make_user(f'seek{i}'), skills=', '.join(self.SKILLS[i % 5:i % 5 + 3]),
+                )
+        return list(JobSeekerProfile.objects.values_list('id', flat=True))
+
+    def recompute(self, profile_ids):
+        result = compute_shard(profile_ids)
+        return result['created'], result['updated'], result['deleted']
+
+    def test_weights_stay_frozen_as_the_corpus_grows(self):
+        JobPosting.objects.create(
+            recruiter=self.recruiter, title='Job', description='', location='', required_skills='Python',
+            status='active', moderation_status='approved',
+        )
+        skill_id = JobPosting.objects.get().skill_tags.get().pk
+        before = skill_weights([skill_id], 'idf')
+        self.seed()
+        self.assertEqual(skill_weights([skill_id], 'idf'), before)
+        refresh_idf_weights()
+        self.assertNotEqual(skill_weights([skill_id], 'idf'), before)
+
+    def test_incremental_rows_match_a_full_recompute(self):
+        profile_ids = self.seed()
+        self.assertTrue(JobRecommendation.objects.exists())
+        self.assertEqual(self.recompute(profile_ids), (0, 0, 0))
+
+    def test_rows_written_after_a_refresh_match_a_full_recompute(self):
+        profile_ids = self.seed()
+        refresh_idf_weights()
+        self.recompute(profile_ids)
+        posting = JobPosting.objects.create(
+            recruiter=self.recruiter, title='Rare', description='', location='', required_skills='Rust, Go',
+            status='active', moderation_status='approved',
+        )
+        posting.delete()
+        self.assertEqual(self.recompute(profile_ids), (0, 0, 0))
+
+
+@override_settings(
+    JOB_RECOMMENDATIONS_PER_SEEKER=2,
+    JOB_RECOMMENDATION_SCORING={'recommended_jobs': 'overlap', 'posting_recommendations': 'overlap'},
+)
+class RankedPageTests(InMemoryIndexMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.recruiter = make_user('rec', 'recruiter')
+
+    def post(self, skills):
+        return JobPosting.objects.create(
+            recruiter=self.recruiter, title='Developer', description='', required_skills=skills, location='',
+            status='active', moderation_status='approved',
+        )
+
+    def pages(self, page, page_size=2):
+        pages, cursor = [], None
+        while True:
+            rows, cursor = page(cursor, page_size)
+            pages.append(rows)
+            if cursor is None:
+                return pages
+
+    def test_seekers_page_past_the_stored_list(self):
+        profile = JobSeekerProfile.objects.create(user=make_user('seek'), skills='python, django, sql')
+        postings = [self.post(skills) for skills in ('python', 'python, django, sql', 'go', 'sql', 'django, sql')]
+        self.assertEqual(JobRecommendation.objects.filter(profile=profile).count(), 2)
+        pages = self.pages(lambda cursor, size: recommendation_page(profile, cursor, size))
+        expected = [(postings[1].pk, 3.0), (postings[4].pk, 2.0), (postings[3].pk, 1.0), (postings[0].pk, 1.0)]
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_candidate_pages_match_with_and_without_the_matrix(self):
+        posting = self.post('python, django')
+        for i, skills in enumerate(['python', 'python, django', 'django', 'go', 'python', 'python, django']):
+            JobSeekerProfile.objects.create(user=make_user(f'seek{i}'), skills=skills)
+        hidden = JobSeekerProfile.objects.create(user=make_user('hidden'), skills='python', profile_visible=False)
+        applied = JobSeekerProfile.objects.create(user=make_user('applied'), skills='python, django')
+        JobApplication.objects.create(job=posting, applicant=applied.user)
+        weights = skill_weights(posting.skill_tags.values_list('id', flat=True), 'overlap')
+
+        with mock.patch('jobs.recommendations.get_candidate_matrix', return_value=None):
+            in_sql = self.pages(lambda cursor, size: candidate_page(posting, weights, cursor, size))
+            sql_cursor = candidate_page(posting, weights, page_size=2)[1]
+        in_memory = self.pages(lambda cursor, size: candidate_page(posting, weights, cursor, size))
+        self.assertIsNotNone(candidates.loaded_candidate_matrix())
+        self.assertEqual(in_memory, in_sql)
+        ranked = sum(in_sql, [])
+        self.assertEqual([score for _, score in ranked], [2.0, 2.0, 1.0, 1.0, 1.0])
+        self.assertFalse({hidden.pk, applied.pk} & {pk for pk, _ in ranked})
+        # A cursor from one ranking continues in the other.
+        self.assertEqual(candidate_page(posting, weights, sql_cursor, 2)[0], in_sql[1])
+
+
+@override_settings(
+    JOB_RECOMMENDATIONS_PER_SEEKER=2,
+    JOB_RECOMMENDATION_SCORING={'recommended_jobs': 'overlap', 'posting_recommendations': 'overlap'},
+)
+class ComputeRecommendationsCommandTests(InMemoryIndexMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        recruiter = make_user('rec', 'recruiter')
+        self.postings = [
+            JobPosting.objects.create(
+                recruiter=recruiter, title=f'Job {i}', description='', required_skills=skills, location='',
+                status='active', moderation_status='approved',
+            )
+            for i, skills in enumerate(['python', 'python, sql', 'react', 'react, css', 'go'])
+        ]
+        self.profiles = [
+            JobSeekerProfile.objects.create(user=make_user(f'seek{i}'), skills=skills)
+            for i, skills in enumerate(['python, sql', 'react', 'go, python'])
+        ]
+        self.expected = self.stored()
+
+    def stored(self):
+        return set(JobRecommendation.objects.values_list('profile_id', 'job_id', 'score'))
+
+    def compute(self, *args):
+        out = StringIO()
+        call_command('compute_recommendations', '--workers', '1', '--shard-size', '1', *args, stdout=out)
+        return out.getvalue()
+
+    def test_full_run_rebuilds_every_list(self):
+        JobRecommendation.objects.all().delete()
+        out = self.compute()
+        self.assertEqual(self.stored(), self.expected)
+        self.assertIn('Seekers: 3 in 3 shard(s) on 1 worker(s)', out)
+
+    def test_since_only_recomputes_what_changed(self):
+        past = timezone.now() - timedelta(days=2)
+        JobPosting.objects.update(updated_at=past)
+        JobSeekerProfile.objects.update(updated_at=past)
+        JobRecommendation.objects.all().delete()
+        # A changed seeker, and a changed posting that only the react seeker matches.
+        JobSeekerProfile.objects.filter(pk=self.profiles[0].pk).update(updated_at=timezone.now())
+        JobPosting.objects.filter(pk=self.postings[3].pk).update(updated_at=timezone.now())
+
+        out = self.compute('--since', (timezone.now() - timedelta(days=1)).date().isoformat())
+        self.assertIn('1 posting(s) and 1 seeker(s) changed', out)
+        recomputed = {profile.pk for profile in self.profiles[:2]}
+        self.assertEqual(self.stored(), {row for row in self.expected if row[0] in recomputed})
+
+    def test_invalid_since(self):
+        with self.assertRaises(CommandError):
+            self.compute('--since', 'yesterday')
+
+
+@override_settings(JOB_SIMILAR_POSTINGS=2)
+class SimilarPostingTests(TestCase):
+    def setUp(self):
+        self.recruiter = make_user('rec', 'recruiter')
+
+    def post(self, title, skills, location='', **fields):
+        fields = {'status': 'active', 'moderation_status': 'approved', **fields}
+        return JobPosting.objects.create(
+            recruiter=self.recruiter, title=title, description='', required_skills=skills, location=location, **fields
+        )
+
+    def stored(self):
+        return set(SimilarPosting.objects.values_list('posting_id', 'similar_id', 'score'))
+
+    def assertMatchesFullRecompute(self):
+        stored = self.stored()
+        call_command('compute_similar_postings', stdout=StringIO())
+        self.assertEqual(stored, self.stored())
+
+    def test_neighbours_share_skills_and_rank_by_blended_similarity(self):
+        posting = self.post('Backend', 'python, django', 'Atlanta, GA', salary_min=100000, salary_max=120000)
+        nearby = self.post('Django dev', 'python, django', 'Atlanta, GA', salary_min=100000, salary_max=120000)
+        far = self.post('Django dev', 'python, django', 'Boston, MA')
+        partial = self.post('Python dev', 'python, go', 'Atlanta, GA')
+        self.post('Frontend', 'react', 'Atlanta, GA')
+        self.assertEqual(similar_postings(posting), [nearby, far])
+        self.assertEqual(similar_postings(posting, limit=1), [nearby])
+        self.assertNotIn(posting, similar_postings(self.post('Frontend', 'react')))
+        scores = dict(scored_neighbours(posting.pk))
+        self.assertEqual(set(scores), {nearby.pk, far.pk, partial.pk})
+        self.assertEqual(scores[nearby.pk], 1.0)
+        # The score is symmetric.
+        self.assertEqual(dict(scored_neighbours(far.pk))[posting.pk], scores[far.pk])
+
+    def test_lists_follow_edits_hiding_and_deletes(self):
+        postings = [self.post(f'Job {i}', skills) for i, skills in enumerate(
+            ['python', 'python, sql', 'python, sql, go', 'sql', 'go', 'python, go']
+        )]
+        self.assertMatchesFullRecompute()
+        postings[2].required_skills = 'react'
+        postings[2].save()
+        self.assertMatchesFullRecompute()
+        postings[1].status = 'closed'
+        postings[1].save()
+        self.assertFalse(SimilarPosting.objects.filter(similar=postings[1]).exists())
+        self.assertMatchesFullRecompute()
+        postings[5].delete()
+        self.assertMatchesFullRecompute()
+
+    def test_reading_a_list_is_one_query(self):
+        posting = self.post('Backend', 'python')
+        self.post('Other', 'python')
+        with self.assertNumQueries(1):
+            self.assertEqual([job.recruiter.username for job in similar_postings(posting)], ['rec'])
+
+
+# -------------------------
+# IN-MEMORY INDEXES
+# -------------------------
+class ChangeLogTests(InMemoryIndexMixin, TestCase):
+    """Writes in this process patch the indexes through the save signals; writes made by
+    other processes (simulated with signal-free UPDATEs plus a log row) are replayed."""
+
+    def setUp(self):
+        super().setUp()
+        self.recruiter = make_user('rec', 'recruiter')
+        self.posting = JobPosting.objects.create(
+            recruiter=self.recruiter, title='Android Developer', description='Mobile apps',
+            required_skills='Java', location='', status='active', moderation_status='approved',
+        )
+        self.profile = JobSeekerProfile.objects.create(user=make_user('seek'), skills='python, django')
+
+    def skills(self, prefix):
+        return [term for term, _ in autocomplete.get_autocomplete().complete('skills', prefix)]
+
+    def test_autocomplete_is_patched_by_local_saves(self):
+        index = autocomplete.get_autocomplete()
+        self.posting.required_skills = 'Java, Kotlin'
+        self.posting.save()
+        self.assertIn('kotlin', self.skills('kot'))
+        self.assertIs(autocomplete.get_autocomplete(), index)
+
+    def test_autocomplete_replays_other_processes_writes(self):
+        index = autocomplete.get_autocomplete()
+        JobPosting.objects.filter(pk=self.posting.pk).update(required_skills='Java, Kotlin')
+        JobSeekerProfile.objects.filter(pk=self.profile.pk).update(skills='python, rust')
+        record_change(POSTINGS, self.posting.pk)
+        record_change(PROFILES, self.profile.pk)
+        self.assertEqual((self.skills('kot'), self.skills('rus'), self.skills('dja')), (['kotlin'], ['rust'], []))
+        self.assertIs(autocomplete.get_autocomplete(), index)
+
+    def test_autocomplete_follows_shared_version_counters(self):
+        with mock.patch('jobs.changelog.counters_shared', return_value=True):
+            index = autocomplete.get_autocomplete()
+            JobPosting.objects.filter(pk=self.posting.pk).update(required_skills='Kotlin')
+            with self.captureOnCommitCallbacks(execute=True):
+                record_change(POSTINGS, self.posting.pk)
+            self.assertEqual(self.skills('kot'), ['kotlin'])
+            self.assertIs(autocomplete.get_autocomplete(), index)
+
+    def test_a_reset_rebuilds_the_autocomplete_index(self):
+        index = autocomplete.get_autocomplete()
+        record_change(POSTINGS)
+        self.assertIsNot(autocomplete.get_autocomplete(), index)
+
+    def candidate_ids(self):
+        weights = dict.fromkeys(self.profile.skill_tags.values_list('id', flat=True), 1.0)
+        return [pk for pk, _, _ in candidates.get_candidate_matrix().score(weights)]
+
+    def test_candidate_matrix_is_patched_and_replayed(self):
+        matrix = candidates.get_candidate_matrix()
+        self.assertEqual(self.candidate_ids(), [self.profile.pk])
+        other = JobSeekerProfile.objects.create(user=make_user('seek2'), skills='python')
+        self.assertEqual(self.candidate_ids(), [self.profile.pk, other.pk])
+        JobSeekerProfile.objects.filter(pk=self.profile.pk).update(profile_visible=False)
+        record_change(PROFILES, self.profile.pk)
+        self.assertEqual(self.candidate_ids(), [other.pk])
+        self.assertIs(candidates.get_candidate_matrix(), matrix)
+
+    def test_embedding_index_is_patched_and_replayed(self):
+        index = embeddings.get_job_index()
+        query = embeddings.embed_posting(self.posting)
+        self.assertEqual([pk for pk, _ in index.search(query)], [self.posting.pk])
+        self.posting.status = 'closed'
+        self.posting.save()
+        self.assertEqual(index.search(query), [])
+        JobPosting.objects.filter(pk=self.posting.pk).update(status='active')
+        record_change(POSTINGS, self.posting.pk)
+        self.assertIs(embeddings.get_job_index(), index)
+        self.assertEqual([pk for pk, _ in index.search(query)], [self.posting.pk])
+
+
+# -------------------------
+# SEARCH
+# -------------------------
+class KeywordSearchTests(InMemoryIndexMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.recruiter = make_user('rec', 'recruiter')
+
+    def post(self, title, skills='', **fields):
+        fields = {'description': '', 'location': '', 'status': 'active', 'moderation_status': 'approved', **fields}
+        return JobPosting.objects.create(recruiter=self.recruiter, title=title, required_skills=skills, **fields)
+
+    def test_the_index_follows_inserts_edits_moderation_and_deletes(self):
+        posting = self.post('Kotlin Developer')
+        hidden = self.post('Kotlin Engineer', status='pending', moderation_status='pending')
+        self.assertEqual(ranked_posting_ids('kotlin'), [posting.pk])
+        posting.title = 'Swift Developer'
+        posting.save()
+        self.assertEqual(ranked_posting_ids('kotlin'), [])
+        self.assertEqual(ranked_posting_ids('swift'), [posting.pk])
+        # A bulk moderation UPDATE bypasses the save signals; the triggers still fire.
+        JobPosting.objects.filter(pk=hidden.pk).update(status='active', moderation_status='approved')
+        self.assertEqual(ranked_posting_ids('kotlin'), [hidden.pk])
+        JobPosting.objects.filter(pk=posting.pk).update(moderation_status='rejected')
+        self.assertEqual(ranked_posting_ids('swift'), [])
+        hidden.delete()
+        self.assertEqual(ranked_posting_ids('kotlin'), [])
+
+    def test_title_matches_rank_above_description_matches(self):
+        described = self.post('Backend Developer', description='We use Kotlin daily')
+        skilled = self.post('Backend Developer', 'Kotlin')
+        titled = self.post('Kotlin Developer')
+        self.assertEqual(ranked_posting_ids('kotlin'), [titled.pk, skilled.pk, described.pk])
+
+    def test_words_match_as_prefixes_and_all_must_match(self):
+        posting = self.post('Kubernetes Engineer', location='Austin')
+        self.post('Kubernetes Engineer', location='Boston')
+        self.assertEqual(ranked_posting_ids('kube aus'), [posting.pk])
+
+    def test_rebuild_indexes_only_visible_postings(self):
+        posting = self.post('Kotlin Developer')
+        self.post('Kotlin Engineer', status='closed')
+        self.assertEqual(rebuild_index(), 1)
+        self.assertEqual(ranked_posting_ids('kotlin'), [posting.pk])
+
+    def test_a_quote_in_a_corrected_skill_is_escaped(self):
+        postings = [self.post(f'Zoo keeper {i}', 'zebra"x') for i in range(3)]
+        jobs, ranked_ids, corrections = filter_postings({'q': 'zebrax'}, autocomplete.get_autocomplete())
+        self.assertEqual(corrections, {'zebrax': 'zebra"x'})
+        self.assertEqual(set(ranked_ids), {posting.pk for posting in postings})
+        self.assertTrue(matches({'q': 'zebrax'}, postings[0].pk, autocomplete.get_autocomplete()))
+        self.client.force_login(self.recruiter)
+        for q in ('zebrax', 'zebra"x', '"'):
+            self.assertEqual(self.client.get(reverse('job_search'), {'q': q}).status_code, 200)
+
+
+class CursorPaginationTests(InMemoryIndexMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        recruiter = make_user('rec', 'recruiter')
+        self.postings = [
+            JobPosting.objects.create(
+                recruiter=recruiter, title=f'Python Developer {i}', description='', required_skills='',
+                location='', status='active', moderation_status='approved',
+            )
+            for i in range(5)
+        ]
+        # Ties on created_at are broken by id.
+        JobPosting.objects.filter(pk__in=[p.pk for p in self.postings[:3]]).update(
+            created_at=self.postings[0].created_at,
+        )
+
+    def pages(self, params):
+        pages, cursor = [], None
+        while True:
+            page = search_page({**params, 'page_size': '2', **({'cursor': cursor} if cursor else {})})
+            pages.append([job.pk for job in page['jobs']])
+            cursor = page['next_cursor']
+            if not cursor:
+                return pages
+
+    def test_cursors_are_signed(self):
+        token = encode_cursor({'o': 20})
+        self.assertEqual(decode_cursor(token), {'o': 20})
+        self.assertIsNone(decode_cursor(None))
+        self.assertIsNone(decode_cursor(token[:-1] + ('A' if token[-1] != 'A' else 'B')))
+        self.assertIsNone(decode_cursor(signing.dumps({'o': 20}, salt='other')))
+        self.assertIsNone(decode_cursor('not-a-cursor'))
+
+    def test_keyset_pages_cover_every_row_once_in_order(self):
+        expected = list(JobPosting.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+        pages = self.pages({})
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_pages_stay_stable_when_rows_are_inserted(self):
+        first = search_page({'page_size': '2'})
+        JobPosting.objects.create(
+            recruiter=self.postings[0].recruiter, title='Newest', description='', required_skills='',
+            location='', status='active', moderation_status='approved',
+        )
+        second = search_page({'page_size': '2', 'cursor': first['next_cursor']})
+        expected = list(JobPosting.objects.exclude(title='Newest').order_by('-created_at', '-id'))[2:4]
+        self.assertEqual(second['jobs'], expected)
+
+    def test_tampered_cursor_restarts_at_the_first_page(self):
+        first = search_page({'page_size': '2'})
+        tampered = first['next_cursor'][:-1] + ('A' if first['next_cursor'][-1] != 'A' else 'B')
+        self.assertEqual(search_page({'page_size': '2', 'cursor': tampered})['jobs'], first['jobs'])
+        forged = search_page({'page_size': '2', 'cursor': signing.dumps({'o': 2}, salt='other'), 'q': 'python'})
+        self.assertEqual(forged['jobs'], search_page({'page_size': '2', 'q': 'python'})['jobs'])
+
+    def test_keyword_results_page_through_the_ranking(self):
+        pages = self.pages({'q': 'python'})
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertCountEqual(sum(pages, []), [posting.pk for posting in self.postings])
+
+
+@override_settings(
+    JOB_SEARCH_SALARY_BANDS=[(None, 50000), (50000, 100000), (100000, None)],
+    JOB_SEARCH_FACET_LOCATIONS=2,
+)
+class FacetCountTests(InMemoryIndexMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.recruiter = make_user('rec', 'recruiter')
+
+    def post(self, location, salary_min=None, salary_max=None, **fields):
+        fields = {'status': 'active', 'moderation_status': 'approved', **fields}
+        return JobPosting.objects.create(
+            recruiter=self.recruiter, title='Developer', description='', required_skills='',
+            location=location, salary_min=salary_min, salary_max=salary_max, **fields,
+        )
+
+    def test_counts_in_one_query(self):
+        self.post('Austin', 40000, 60000, is_remote=True)
+        self.post('Austin', 120000, visa_sponsorship=True)
+        self.post('Boston', salary_max=45000, is_remote=True)
+        self.post('Chicago')
+        self.post('Austin', 70000, status='pending', moderation_status='pending')
+        jobs = filter_postings({})[0]
+        with self.assertNumQueries(1):
+            facets = facet_counts(jobs)
+        self.assertEqual(facets['is_remote'], 2)
+        self.assertEqual(facets['visa_sponsorship'], 1)
+        # A salary range counts in every band it overlaps; postings without one in none.
+        self.assertEqual(facets['salary_bands'], [
+            {'label': 'Under $50k', 'count': 2},
+            {'label': '$50k–$100k', 'count': 1},
+            {'label': '$100k+', 'count': 1},
+        ])
+        # The top locations by count, ties by name.
+        self.assertEqual(facets['locations'], [{'location': 'Austin', 'count': 2}, {'location': 'Boston', 'count': 1}])
+
+    def test_counts_follow_the_filters(self):
+        self.post('Austin', is_remote=True)
+        self.post('Boston')
+        facets = facet_counts(filter_postings({'is_remote': 'true'})[0])
+        self.assertEqual(facets['locations'], [{'location': 'Austin', 'count': 1}])
+        self.assertEqual([band['count'] for band in facets['salary_bands']], [0, 0, 0])
+
+
+class SearchApiTests(InMemoryIndexMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        recruiter = make_user('rec', 'recruiter')
+        self.postings = [
+            JobPosting.objects.create(
+                recruiter=recruiter, title=f'Python Developer {i}', description='', required_skills='',
+                location='Atlanta, GA', salary_min=1000 * i, status='active', moderation_status='approved',
+            )
+            for i in range(3)
+        ]
+        JobPosting.objects.create(
+            recruiter=recruiter, title='Hidden', description='', required_skills='',
+            location='', status='pending', moderation_status='pending',
+        )
+
+    def get(self, **params):
+        return self.client.get(reverse('api_search'), params)
+
+    def body(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    @mock.patch('jobs.views.API_STREAM_BATCH', 2)
+    def test_streams_every_visible_posting_as_ndjson(self):
+        response = self.get(fields='id,title,recruiter')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.body(response).splitlines()]
+        self.assertEqual(rows, [
+            {'id': posting.pk, 'title': posting.title, 'recruiter': 'rec'} for posting in reversed(self.postings)
+        ])
+
+    @mock.patch('jobs.views.API_STREAM_BATCH', 2)
+    def test_json_array_format(self):
+        rows = json.loads(self.body(self.get(format='json', fields='id', salary_min='1000')))
+        self.assertEqual(rows, [{'id': self.postings[2].pk}, {'id': self.postings[1].pk}])
+        self.assertEqual(json.loads(self.body(self.get(format='json', q='nomatch'))), [])
+
+    def test_default_fields_and_distances(self):
+        row = json.loads(self.body(self.get(q='python')).splitlines()[0])
+        self.assertEqual(set(row), set(DEFAULT_API_FIELDS))
+        row = json.loads(self.body(self.get(fields='id,distance_miles', near='33.75,-84.39')).splitlines()[0])
+        self.assertLess(row['distance_miles'], 1)
+
+    def test_rejects_unknown_fields_and_formats(self):
+        for params in ({'fields': 'id,password'}, {'fields': 'distance_miles'}, {'format': 'xml'}):
+            with self.subTest(**params):
+                response = self.get(**params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+
+class RadiusSearchTests(InMemoryIndexMixin, TestCase):
+    NEAR_ATLANTA = '33.75,-84.39'
+
+    def setUp(self):
+        super().setUp()
+        recruiter = make_user('rec', 'recruiter')
+        self.atlanta, self.boston = (
+            JobPosting.objects.create(
+                recruiter=recruiter, title='Developer', description='', required_skills='',
+                location=location, status='active', moderation_status='approved',
+            )
+            for location in ('Atlanta, GA', 'Boston, MA')
+        )
+
+    def near(self, **params):
+        jobs, _, _ = filter_postings({'near': self.NEAR_ATLANTA, **params})
+        return sorted(jobs.values_list('pk', flat=True))
+
+    def test_postings_are_geocoded_and_filtered_by_distance(self):
+        self.assertIsNotNone(self.atlanta.latitude)
+        self.assertEqual(self.near(), [self.atlanta.pk])
+        self.assertEqual(self.near(radius='1500'), [self.atlanta.pk, self.boston.pk])
+        self.assertEqual(self.near(radius='-5'), [])
+
+    def test_invalid_radius_falls_back_to_the_default(self):
+        for radius in ('inf', '-inf', 'nan', 'far'):
+            with self.subTest(radius=radius):
+                self.assertEqual(self.near(radius=radius), [self.atlanta.pk])
+                self.assertEqual(search_terms({'near': self.NEAR_ATLANTA, 'radius': radius}),
+                                 search_terms({'near': self.NEAR_ATLANTA}))
+                self.assertNotIn('radius', canonical_search_params({'near': self.NEAR_ATLANTA, 'radius': radius}))
+
+    def test_invalid_point_is_ignored(self):
+        for near in ('nan,nan', '91,0', 'inf,0', 'atlanta'):
+            with self.subTest(near=near):
+                jobs, _, _ = filter_postings({'near': near, 'radius': '1'})
+                self.assertEqual(jobs.count(), 2)
+
+
+class SearchCacheTests(InMemoryIndexMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        caches['default'].clear()
+        caches['search'].clear()
+        self.recruiter = make_user('rec', 'recruiter')
+        self.posting = JobPosting.objects.create(
+            recruiter=self.recruiter, title='Python Developer', description='', required_skills='Python',
+            location='', status='active', moderation_status='approved',
+        )
+        self.client.force_login(self.recruiter)
+
+    def search(self, **params):
+        return [job.pk for job in self.client.get(reverse('job_search'), params).context['jobs']]
+
+    def test_equivalent_queries_share_a_key(self):
+        a = canonical_search_params({'q': ' Python  DEV ', 'skills': 'SQL, python', 'salary_min': '050000'})
+        b = canonical_search_params({'salary_min': '50000', 'skills': 'Python,sql', 'q': 'python dev'})
+        self.assertEqual(a, b)
+        self.assertEqual(search_cache_key(a), search_cache_key(b))
+        self.assertNotEqual(search_cache_key(a), search_cache_key(dict(a, is_remote='true')))
+
+    def test_hits_and_misses_are_counted(self):
+        computed = []
+
+        def compute(params):
+            computed.append(params)
+            return {'q': params['q']}
+
+        self.assertEqual(cached_search_page({'q': 'Python'}, compute), {'q': 'python'})
+        self.assertEqual(cached_search_page({'q': ' python'}, compute), {'q': 'python'})
+        self.assertEqual(len(computed), 1)
+        stats = search_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
+
+    def test_saving_a_posting_invalidates(self):
+        self.assertEqual(self.search(q='python'), [self.posting.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            other = JobPosting.objects.create(
+                recruiter=self.recruiter, title='Python Engineer', description='', required_skills='',
+                location='', status='active', moderation_status='approved',
+            )
+        self.assertCountEqual(self.search(q='python'), [self.posting.pk, other.pk])
+
+    def test_moderation_invalidates(self):
+        self.assertEqual(self.search(q='python'), [self.posting.pk])
+        self.client.force_login(make_user('adm', 'admin'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('moderate_job', args=[self.posting.pk]), {'action': 'reject'})
+        self.assertEqual(self.search(q='python'), [])
+
+    def test_deleting_a_posting_invalidates(self):
+        self.assertEqual(self.search(q='python'), [self.posting.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posting.delete()
+        self.assertEqual(self.search(q='python'), [])
+
+    def test_profile_and_synonym_edits_invalidate(self):
+        """Both feed typo correction and skill matching, so they change the key too."""
+        canonical = canonical_search_params({'skills': 'pyhton'})
+        key = search_cache_key(canonical)
+        with self.captureOnCommitCallbacks(execute=True):
+            JobSeekerProfile.objects.create(user=make_user('seek'), skills='pyhton')
+        self.assertNotEqual(search_cache_key(canonical), key)
+        key = search_cache_key(canonical)
+        SkillSynonym.objects.create(alias='pyhton', canonical='python')
+        self.assertNotEqual(search_cache_key(canonical), key)
+
+
+# -------------------------
+# SAVED SEARCHES AND ALERTS
+# -------------------------
+class PercolationTests(InMemoryIndexMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.recruiter = make_user('rec', 'recruiter')
+        self.seeker = make_user('seek')
+
+    def post(self, skills='', **fields):
+        fields = {'title': 'Developer', 'description': '', 'location': '', 'status': 'active',
+                  'moderation_status': 'approved', **fields}
+        return JobPosting.objects.create(recruiter=self.recruiter, required_skills=skills, **fields)
+
+    def save_search(self, user=None, **params):
+        return SavedSearch.objects.create(user=user or self.seeker, params=params)
+
+    def alerted(self, posting):
+        return set(SearchAlert.objects.filter(posting=posting).values_list('search_id', flat=True))
+
+    def test_matching_searches_are_alerted_once(self):
+        by_skill = self.save_search(skills='Python')
+        by_keyword = self.save_search(q='django')
+        nearby = self.save_search(near='33.75,-84.39', radius='10', salary_min='90000')
+        self.save_search(skills='Go')
+        self.save_search(salary_min='200000')
+        self.save_search(q='gardener')
+        self.save_search(user=self.recruiter, skills='python')
+        posting = self.post('python', description='Django shop', location='Atlanta, GA', salary_min=100000)
+        with mock.patch('jobs.alerts.matches', wraps=matches) as checked:
+            self.assertEqual(percolate(posting), 3)
+        # Only the searches indexed under one of the posting's terms are run.
+        self.assertEqual(checked.call_count, 4)
+        self.assertEqual(self.alerted(posting), {by_skill.pk, by_keyword.pk, nearby.pk})
+        percolate(posting)
+        self.assertEqual(SearchAlert.objects.count(), 3)
+
+    def test_hidden_postings_alert_nobody(self):
+        self.save_search(skills='python')
+        posting = self.post('python', status='pending', moderation_status='pending')
+        self.assertEqual(percolate(posting), 0)
+        self.assertFalse(SearchAlert.objects.exists())
+
+    def test_a_misspelled_search_matches_the_corrected_skill(self):
+        self.post('python')
+        self.post('python')
+        search = self.save_search(skills='pyhton')
+        self.assertIn('skill:python', SavedSearchTerm.objects.filter(search=search).values_list('term', flat=True))
+        posting = self.post('python, sql')
+        self.assertEqual(percolate(posting), 1)
+        self.assertEqual(self.alerted(posting), {search.pk})
+
+    def test_creating_a_posting_percolates_it(self):
+        search = self.save_search(skills='python')
+        self.client.force_login(self.recruiter)
+        self.client.post(reverse('create_posting'), {
+            'title': 'Developer', 'description': 'Build things', 'required_skills': 'Python', 'location': 'Remote',
+            'status': 'active',
+        })
+        self.assertEqual(list(SearchAlert.objects.values_list('search_id', 'user_id')), [(search.pk, self.seeker.pk)])
+
+
+# -------------------------
+# QUERY PLANS
+# -------------------------
+class QueryPlanTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        out = StringIO()
+        call_command('check_query_plans', stdout=out)
+        self.assertIn('All query plans use indexes.', out.getvalue())
+
+    def test_broad_steps(self):
+        plans = import_module('jobs.management.commands.check_query_plans')
+        self.assertEqual(plans.broad_steps([
+            'SCAN jobs_message',
+            'SCAN jobs_jobposting USING COVERING INDEX jobs_posting_visible_idx',
+            'SEARCH jobs_jobposting USING INDEX jobs_posting_visible_idx (status=? AND moderation_status=?)',
+            'SEARCH jobs_message USING INDEX jobs_message_inbox_idx (recipient_id=?)',
+            'SEARCH jobs_jobposting USING INDEX jobs_posting_visible_idx (status=? AND moderation_status=? AND created_at<?)',
+        ]), ['jobs_message', 'jobs_jobposting', 'jobs_jobposting'])
+
+    def test_duplicate_applications_are_refused(self):
+        job = JobPosting.objects.create(
+            recruiter=make_user('rec', 'recruiter'), title='Developer', description='', required_skills='',
+            location='', status='active', moderation_status='approved',
+        )
+        seeker = make_user('seek')
+        JobApplication.objects.create(job=job, applicant=seeker)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            JobApplication.objects.create(job=job, applicant=seeker)
+
+
+class DuplicateApplicationMigrationTests(TransactionTestCase):
+    before = [('jobs', '0007_jobposting_fts')]
+    after = [('jobs', '0008_hot_path_indexes')]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+        super().tearDown()
+
+    def test_migration_keeps_the_earliest_application_and_a_cover_letter(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        old = executor.loader.project_state(self.before).apps
+        recruiter, seeker, other = (make_user(name) for name in ('rec', 'seek', 'other'))
+        job = old.get_model('jobs', 'JobPosting').objects.create(
+            recruiter_id=recruiter.pk, title='Developer', description='', location='',
+        )
+        Application = old.get_model('jobs', 'JobApplication')
+        kept = Application.objects.create(job=job, applicant_id=seeker.pk)
+        Application.objects.create(job=job, applicant_id=seeker.pk, cover_letter='First')
+        Application.objects.create(job=job, applicant_id=seeker.pk, cover_letter='Latest')
+        single = Application.objects.create(job=job, applicant_id=other.pk, cover_letter='Only')
+
+        executor = MigrationExecutor(connection)
+        with mock.patch('builtins.print') as report:
+            executor.migrate(self.after)
+        new = executor.loader.project_state(self.after).apps
+        rows = new.get_model('jobs', 'JobApplication').objects.order_by('id').values_list('id', 'cover_letter')
+        self.assertEqual(list(rows), [(kept.pk, 'Latest'), (single.pk, 'Only')])
+        self.assertIn('Removed 2 duplicate job application(s) for 1', report.call_args.args[0])
+
+
+# -------------------------
+# TRENDING
+# -------------------------
+@override_settings(JOB_TRENDING_HALF_LIFE_HOURS=1)
+class TrendingTests(TestCase):
+    HOUR = 3600
+
+    def setUp(self):
+        self.recruiter = make_user('rec', 'recruiter')
+        self.now = time.time()
+        self.first = self.post('First')
+        self.second = self.post('Second')
+
+    def post(self, title):
+        return JobPosting.objects.create(
+            recruiter=self.recruiter, title=title, description='', required_skills='', location='',
+            status='active', moderation_status='approved',
+        )
+
+    def apply(self, posting, hours_ago=0):
+        trending.record_application(posting.pk, self.now - hours_ago * self.HOUR)
+
+    def scores(self):
+        return {posting.title: round(posting.trend_score, 3) for posting in trending.trending_postings()}
+
+    def test_applications_decay_by_half_every_half_life(self):
+        self.apply(self.first)
+        self.apply(self.second, hours_ago=1)
+        self.apply(self.second, hours_ago=2)
+        self.assertEqual(self.scores(), {'First': 1.0, 'Second': 0.75})
+        self.assertEqual([p.title for p in trending.trending_postings()], ['First', 'Second'])
+
+    def test_hidden_postings_keep_their_score_but_are_not_listed(self):
+        self.apply(self.first)
+        self.apply(self.second)
+        self.second.status = 'closed'
+        self.second.save()
+        self.assertEqual(list(self.scores()), ['First'])
+        self.second.status = 'active'
+        self.second.save()
+        self.assertEqual(self.scores(), {'First': 1.0, 'Second': 1.0})
+
+    def test_compaction_keeps_decayed_scores_and_drops_negligible_ones(self):
+        self.apply(self.first)
+        self.apply(self.second, hours_ago=20)
+        self.assertEqual(trending.compact(now=self.now, min_score=0.01), (1, 1))
+        self.assertEqual(TrendingEpoch.objects.get().base, self.now)
+        row = PostingTrend.objects.get()
+        self.assertEqual((row.posting, row.base), (self.first, self.now))
+        self.assertAlmostEqual(row.score, 1.0)
+
+    def test_an_application_racing_a_compaction_is_rebased(self):
+        self.apply(self.first, hours_ago=1)
+        stale = TrendingEpoch.objects.get()
+        trending.compact(now=self.now)
+        # Both applications read the epoch before the compaction moved it.
+        with mock.patch.object(trending, '_epoch', side_effect=[stale, TrendingEpoch.objects.get()]):
+            self.apply(self.first)
+        with mock.patch.object(trending, '_epoch', side_effect=[stale, TrendingEpoch.objects.get()]):
+            self.apply(self.second)
+        self.assertEqual(set(PostingTrend.objects.values_list('base', flat=True)), {self.now})
+        self.assertEqual(self.scores(), {'First': 1.5, 'Second': 1.0})
+
+    def test_rebuild_matches_the_recorded_scores(self):
+        seeker = make_user('seek')
+        for posting in (self.first, self.second):
+            JobApplication.objects.create(job=posting, applicant=seeker)
+            trending.record_application(posting.pk)
+        recorded = self.scores()
+        self.assertEqual(trending.rebuild(), 2)
+        self.assertEqual(self.scores().keys(), recorded.keys())
+        for title, score in self.scores().items():
+            self.assertAlmostEqual(score, recorded[title], places=3)
+
+
+# -------------------------
+# MESSAGING
+# -------------------------
+class MessageThreadTests(TestCase):
+    def setUp(self):
+        self.recruiter = make_user('rec', 'recruiter')
+        self.seeker = make_user('seek')
+
+    def send(self, sender, recipient, body='Hello', **fields):
+        return send_message(Message(sender=sender, recipient=recipient, subject='Hi', body=body, **fields))
+
+    def test_the_first_message_creates_the_pairs_thread(self):
+        message = self.send(self.recruiter, self.seeker)
+        thread = Thread.objects.get()
+        self.assertEqual(message.thread, thread)
+        self.assertEqual((thread.user_low, thread.user_high), (self.recruiter, self.seeker))
+        self.assertIsNone(thread.posting)
+
+    def test_both_directions_share_one_thread(self):
+        first = self.send(self.recruiter, self.seeker)
+        second = self.send(self.seeker, self.recruiter)
+        self.assertEqual(Thread.objects.count(), 1)
+        self.assertEqual(first.thread_id, second.thread_id)
+
+    def test_a_posting_gets_its_own_thread(self):
+        posting = JobPosting.objects.create(
+            recruiter=self.recruiter, title='Backend', description='', required_skills='', location='',
+        )
+        general = self.send(self.recruiter, self.seeker)
+        about = send_message(Message(sender=self.recruiter, recipient=self.seeker, body='Re posting'), posting)
+        self.assertNotEqual(general.thread_id, about.thread_id)
+        self.assertEqual(about.thread.posting, posting)
+
+    def test_a_reply_stays_in_the_original_thread(self):
+        posting = JobPosting.objects.create(
+            recruiter=self.recruiter, title='Backend', description='', required_skills='', location='',
+        )
+        original = send_message(Message(sender=self.recruiter, recipient=self.seeker, body='Interested?'), posting)
+        reply = self.send(self.seeker, self.recruiter, reply_to=original)
+        self.assertEqual(reply.thread_id, original.thread_id)
+
+    def test_the_thread_summarizes_its_latest_message(self):
+        self.send(self.recruiter, self.seeker, body='First')
+        latest = self.send(self.seeker, self.recruiter, body='  Second\n  message ' + 'x' * 200)
+        thread = Thread.objects.get()
+        self.assertEqual(thread.last_message_at, latest.created_at)
+        self.assertEqual(thread.last_sender, self.seeker)
+        self.assertEqual(thread.preview, ('Second message ' + 'x' * 200)[:140])
+
+
+
+class ConversationViewTests(TestCase):
+    def setUp(self):
+        self.recruiter = make_user('rec', 'recruiter')
+        self.seeker = make_user('seek')
+        self.posting = JobPosting.objects.create(
+            recruiter=self.recruiter, title='Backend', description='', required_skills='', location='',
+        )
+        JobApplication.objects.create(job=self.posting, applicant=self.seeker)
+        self.client.force_login(self.recruiter)
+
+    def conversation(self):
+        url = reverse('conversation_view', args=[self.posting.pk, self.seeker.pk])
+        return self.client.get(url).context
+
+    def seeker_sends(self, body):
+        return send_message(Message(sender=self.seeker, recipient=self.recruiter, body=body))
+
+    def test_shows_migrated_general_and_posting_messages(self):
+        # Written before threads existed, then threaded by migration 0018.
+        Message.objects.bulk_create([
+            Message(sender=self.recruiter, recipient=self.seeker, body='Old question'),
+            Message(sender=self.seeker, recipient=self.recruiter, body='Old answer', is_read=True),
+        ])
+        import_module('jobs.migrations.0018_message_threads').thread_messages(apps, None)
+        # Sent from compose without ?posting=, so it lands in the general thread too.
+        self.seeker_sends('Follow-up')
+        send_message(Message(sender=self.recruiter, recipient=self.seeker, body='About the posting'), self.posting)
+        context = self.conversation()
+        self.assertEqual(
+            [m.body for m in context['conversation']],
+            ['Old question', 'Old answer', 'Follow-up', 'About the posting'],
+        )
+        self.assertEqual(context['thread'].posting, self.posting)
+
+    def test_opening_the_conversation_marks_both_threads_read(self):
+        self.seeker_sends('General')
+        send_message(Message(sender=self.seeker, recipient=self.recruiter, body='Specific'), self.posting)
+        self.assertEqual(unread_count(self.recruiter), 2)
+        self.conversation()
+        self.assertEqual(unread_count(self.recruiter), 0)
+        self.assertFalse(Thread.objects.filter(unread_low__gt=0).exists())
+        self.assertFalse(Thread.objects.filter(unread_high__gt=0).exists())
+
+    def test_other_postings_threads_are_not_shown(self):
+        other = JobPosting.objects.create(
+            recruiter=self.recruiter, title='Frontend', description='', required_skills='', location='',
+        )
+        send_message(Message(sender=self.recruiter, recipient=self.seeker, body='Other posting'), other)
+        context = self.conversation()
+        self.assertEqual(list(context['conversation']), [])
+        self.assertIsNone(context['thread'])
+
+class UnreadCountTests(TestCase):
+    def setUp(self):
+        self.seeker = make_user('seek')
+        self.recruiter = make_user('rec', 'recruiter')
+        self.other = make_user('other', 'recruiter')
+        self.first = self.receive(self.recruiter, 3)
+        self.second = self.receive(self.other, 2)
+
+    def receive(self, sender, count):
+        return [
+            send_message(Message(sender=sender, recipient=self.seeker, body=f'Message {i}'))
+            for i in range(count)
+        ]
+
+    def assertCounts(self, total, per_thread):
+        """The seeker's stored counts match both the expected values and the messages."""
+        self.assertEqual(unread_count(self.seeker), total)
+        self.assertEqual(
+            UnreadCount.objects.get(user=self.seeker).count,
+            Message.objects.filter(recipient=self.seeker, is_read=False).count(),
+        )
+        for messages, expected in zip((self.first, self.second), per_thread):
+            thread = Thread.objects.get(pk=messages[0].thread_id)
+            self.assertEqual(thread.unread_for(self.seeker), expected)
+            self.assertEqual(
+                expected, Message.objects.filter(thread=thread, recipient=self.seeker, is_read=False).count()
+            )
+
+    def test_received_messages_are_counted(self):
+        self.assertCounts(5, (3, 2))
+        self.assertEqual(unread_count(self.recruiter), 0)
+        thread = Thread.objects.get(pk=self.first[0].thread_id)
+        self.assertEqual(thread.unread_for(self.recruiter), 0)
+
+    def test_message_read(self):
+        message_read(self.first[0])
+        self.assertCounts(4, (2, 2))
+        # Reading it again changes nothing.
+        message_read(Message.objects.get(pk=self.first[0].pk))
+        self.assertCounts(4, (2, 2))
+
+    def test_thread_read(self):
+        thread = Thread.objects.get(pk=self.first[0].thread_id)
+        self.assertEqual(thread_read(thread, self.seeker), 3)
+        self.assertEqual(thread.unread_for(self.seeker), 0)
+        self.assertCounts(2, (0, 2))
+        self.assertEqual(thread_read(thread, self.seeker), 0)
+        self.assertCounts(2, (0, 2))
+
+    def test_thread_read_after_message_read(self):
+        message_read(self.second[0])
+        thread = Thread.objects.get(pk=self.second[0].thread_id)
+        self.assertEqual(thread_read(thread, self.seeker), 1)
+        self.assertCounts(3, (3, 0))
+
+    def test_mark_all_read(self):
+        message_read(self.first[0])
+        self.assertEqual(mark_all_read(self.seeker), 4)
+        self.assertCounts(0, (0, 0))
+        self.receive(self.recruiter, 1)
+        self.assertCounts(1, (1, 0))
+
+
+@override_settings(JOB_INBOX_PAGE_SIZE=2)
+class InboxPaginationTests(TestCase):
+    def setUp(self):
+        self.seeker = make_user('seek')
+        self.recruiter = make_user('rec', 'recruiter')
+        self.messages = [
+            send_message(Message(sender=self.recruiter, recipient=self.seeker, body=f'Message {i}'))
+            for i in range(5)
+        ]
+        # Messages sent in the same instant are ordered by id.
+        Message.objects.filter(pk__in=[m.pk for m in self.messages[1:4]]).update(
+            created_at=self.messages[1].created_at,
+        )
+        self.client.force_login(self.seeker)
+
+    def page(self, cursor=None):
+        response = self.client.get(reverse('inbox'), {'cursor': cursor} if cursor else {})
+        return [m.pk for m in response.context['inbox_messages']], response.context['next_cursor']
+
+    def test_pages_cover_every_message_once_newest_first(self):
+        seen, cursor = self.page()
+        while cursor:
+            ids, cursor = self.page(cursor)
+            self.assertLessEqual(len(ids), 2)
+            seen += ids
+        # The tied messages split across the first two pages.
+        self.assertEqual(seen, [m.pk for m in reversed(self.messages)])
+
+    def test_new_messages_do_not_shift_later_pages(self):
+        first, cursor = self.page()
+        second, _ = self.page(cursor)
+        send_message(Message(sender=self.recruiter, recipient=self.seeker, body='Newer'))
+        self.assertEqual(self.page(cursor)[0], second)
+        self.assertNotIn(first[-1], second)
+
+    def test_the_last_page_has_no_cursor(self):
+        cursor = self.page()[1]
+        cursor = self.page(cursor)[1]
+        ids, cursor = self.page(cursor)
+        self.assertEqual(ids, [self.messages[0].pk])
+        self.assertIsNone(cursor)
+
+
+class MessageSearchTests(TestCase):
+    def setUp(self):
+        self.seeker = make_user('seek')
+        self.recruiter = make_user('rec', 'recruiter')
+        self.other = make_user('other')
+
+    def send(self, body, recipient=None, subject=''):
+        recipient = recipient or self.seeker
+        return send_message(Message(sender=self.recruiter, recipient=recipient, subject=subject, body=body))
+
+    def found(self, user, text):
+        return [m.pk for m in search_messages(user, text)[0]]
+
+    def all_pages(self, user, text, limit):
+        seen, cursor = [], None
+        while True:
+            rows, cursor = search_messages(user, text, cursor, limit)
+            self.assertLessEqual(len(rows), limit)
+            seen += [m.pk for m in rows]
+            if cursor is None:
+                return seen
+
+    def test_only_the_users_own_messages_match(self):
+        mine = self.send('Interview on Monday')
+        theirs = self.send('Interview on Tuesday', recipient=self.other)
+        self.assertEqual(self.found(self.seeker, 'interview'), [mine.pk])
+        self.assertCountEqual(self.found(self.recruiter, 'interview'), [mine.pk, theirs.pk])
+
+    def test_the_index_follows_creates_edits_and_deletes(self):
+        message = self.send('Interview on Monday')
+        self.assertEqual(self.found(self.seeker, 'monday'), [message.pk])
+        message.body = 'Interview on Friday'
+        message.save()
+        self.assertEqual(self.found(self.seeker, 'monday'), [])
+        self.assertEqual(self.found(self.seeker, 'friday'), [message.pk])
+        message.delete()
+        self.assertEqual(self.found(self.seeker, 'friday'), [])
+
+    def test_subject_hits_rank_first(self):
+        body_hit = self.send('The offer is attached', subject='Next steps')
+        subject_hit = self.send('Details inside', subject='Offer')
+        self.assertEqual(self.found(self.seeker, 'offer'), [subject_hit.pk, body_hit.pk])
+
+    def test_pages_cover_every_match_once(self):
+        sent = [self.send('interview ' * (1 + i % 3) + 'notes') for i in range(7)]
+        self.assertCountEqual(self.all_pages(self.seeker, 'interview', 2), [m.pk for m in sent])
+
+    @override_settings(JOB_MESSAGE_SEARCH_CANDIDATES=3)
+    def test_only_the_newest_matches_are_ranked(self):
+        sent = [self.send(f'Interview {i}') for i in range(5)]
+        self.assertCountEqual(self.all_pages(self.seeker, 'interview', 2), [m.pk for m in sent[2:]])
+
+    def test_fallback_pages_newest_first(self):
+        sent = [self.send(f'Interview {i}') for i in range(5)]
+        self.send('Interview elsewhere', recipient=self.other)
+        with mock.patch('jobs.messaging.fts_available', return_value=False):
+            self.assertEqual(self.all_pages(self.seeker, 'interview', 2), [m.pk for m in reversed(sent)])
+
+
+class BulkMessageTests(TestCase):
+    def setUp(self):
+        self.recruiter = make_user('rec', 'recruiter')
+        self.posting = JobPosting.objects.create(
+            recruiter=self.recruiter, title='Backend', description='', required_skills='', location='',
+        )
+
+    def applicants(self, count, allow_contact=True, prefix='seek'):
+        users = []
+        for i in range(count):
+            user = make_user(f'{prefix}{i}')
+            JobSeekerProfile.objects.create(user=user, allow_contact=allow_contact)
+            JobApplication.objects.create(job=self.posting, applicant=user)
+            users.append(user)
+        return users
+
+    def test_skips_applicants_who_turned_off_contact(self):
+        reachable = self.applicants(2)
+        self.applicants(1, allow_contact=False, prefix='private')
+        no_profile = make_user('noprofile')
+        JobApplication.objects.create(job=self.posting, applicant=no_profile)
+        self.assertEqual(bulk_send(self.recruiter, self.posting, 'Update', 'Interviews next week'), (3, 1))
+        self.assertCountEqual(
+            Message.objects.values_list('recipient', flat=True), [user.pk for user in reachable + [no_profile]]
+        )
+
+    def test_chunks_keep_threads_and_counts_in_step(self):
+        users = self.applicants(5)
+        earlier = send_message(Message(sender=self.recruiter, recipient=users[0], body='Hello'), self.posting)
+        self.assertEqual(bulk_send(self.recruiter, self.posting, 'Update', 'Interviews  next week', chunk_size=2), (5, 0))
+        self.assertEqual(Thread.objects.filter(posting=self.posting).count(), 5)
+        self.assertEqual(Message.objects.get(recipient=users[0], subject='Update').thread_id, earlier.thread_id)
+        for user in users:
+            thread = Thread.objects.get(posting=self.posting, messages__recipient=user, messages__subject='Update')
+            self.assertEqual(thread.preview, 'Interviews next week')
+            self.assertEqual(thread.last_sender, self.recruiter)
+            self.assertEqual(thread.unread_for(user), 2 if user == users[0] else 1)
+            self.assertEqual(unread_count(user), 2 if user == users[0] else 1)
+
+    def test_query_count_does_not_grow_with_recipients(self):
+        def queries(count, prefix):
+            JobApplication.objects.filter(job=self.posting).delete()
+            self.applicants(count, prefix=prefix)
+            with CaptureQueriesContext(connection) as context:
+                bulk_send(self.recruiter, self.posting, 'Update', 'Hi')
+            return len(context)
+
+        self.assertEqual(queries(2, 'a'), queries(6, 'b'))
+
+
+
+# -------------------------
+# LIVE EVENTS
+# -------------------------
+class HubTests(TestCase):
+    EVENT = {'kind': 'unread', 'data': {'count': 1}}
+
+    async def test_events_reach_every_connection_of_their_user_only(self):
+        hub = Hub()
+        first, second, other = hub.subscribe(1), hub.subscribe(1), hub.subscribe(2)
+        hub.dispatch(1, self.EVENT)
+        self.assertEqual((first.get_nowait(), second.get_nowait()), (self.EVENT, self.EVENT))
+        self.assertTrue(other.empty())
+        hub.unsubscribe(1, first)
+        hub.unsubscribe(1, second)
+        self.assertEqual(hub.connections(), 1)
+
+    async def test_events_dispatched_from_another_thread_are_delivered(self):
+        hub = Hub()
+        queue = hub.subscribe(1)
+        await asyncio.to_thread(hub.dispatch, 1, self.EVENT)
+        self.assertEqual(await asyncio.wait_for(queue.get(), 1), self.EVENT)
+
+    async def test_a_stalled_connection_drops_its_oldest_events(self):
+        hub = Hub()
+        queue = hub.subscribe(1, maxsize=2)
+        for count in range(3):
+            hub.dispatch(1, {'kind': 'unread', 'data': {'count': count}})
+        self.assertEqual([queue.get_nowait()['data']['count'] for _ in range(2)], [1, 2])
+
+
+@override_settings(JOB_EVENTS_POLL_INTERVAL=0.01)
+class DatabaseBrokerTests(TestCase):
+    def test_events_are_read_back_in_order(self):
+        user = make_user('seek')
+        broker = DatabaseBroker(Hub())
+        broker.publish(user.pk, {'kind': 'unread', 'data': {'count': 1}})
+        broker.publish_many([(user.pk, {'kind': 'message', 'data': {'id': 7}})])
+        rows = broker._fetch(0)
+        self.assertEqual([(kind, data) for _, _, kind, data in rows], [('unread', {'count': 1}), ('message', {'id': 7})])
+        self.assertEqual(broker._fetch(rows[0][0])[0][0], rows[1][0])
+
+    @override_settings(JOB_EVENTS_RETENTION=-1)
+    def test_prune_drops_expired_events(self):
+        broker = DatabaseBroker(Hub())
+        broker.publish(make_user('seek').pk, {'kind': 'unread', 'data': {}})
+        broker.prune()
+        self.assertFalse(UserEvent.objects.exists())
+
+    async def test_polling_relays_new_events_to_the_hub(self):
+        user = await sync_to_async(make_user)('seek')
+        hub = Hub()
+        broker = DatabaseBroker(hub)
+        queue = hub.subscribe(user.pk)
+        await sync_to_async(broker.publish)(user.pk, {'kind': 'unread', 'data': {'count': 1}})
+        await broker.start()
+        try:
+            # Events from before the broker started are not replayed.
+            await sync_to_async(broker.publish)(user.pk, {'kind': 'unread', 'data': {'count': 2}})
+            event = await asyncio.wait_for(queue.get(), 2)
+        finally:
+            await broker.stop()
+        self.assertEqual(event, {'kind': 'unread', 'data': {'count': 2}})
+        self.assertTrue(queue.empty())
+
+
+@override_settings(JOB_EVENTS_ENABLED=True)
+class EventStreamTests(TestCase):
+    async def read(self, chunks, count):
+        return [(await asyncio.wait_for(anext(chunks), 2)).decode() for _ in range(count)]
+
+    async def test_the_stream_starts_with_the_unread_count_and_follows_publishes(self):
+        user = await sync_to_async(make_user)('seek')
+        client = AsyncClient()
+        await sync_to_async(client.force_login)(user)
+        response = await client.get(reverse('events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        try:
+            self.assertEqual(
+                await self.read(chunks, 2),
+                ['retry: 5000\n\n', 'event: unread\ndata: {"count": 0}\n\n'],
+            )
+            await sync_to_async(publish)(user.pk, 'unread', {'count': 3})
+            self.assertEqual(await self.read(chunks, 1), ['event: unread\ndata: {"count": 3}\n\n'])
+        finally:
+            await chunks.aclose()
+
+    def test_wsgi_requests_are_turned_away(self):
+        self.client.force_login(make_user('seek'))
+        self.assertEqual(self.client.get(reverse('events')).status_code, 204)
+        self.assertContains(self.client.get(reverse('dashboard')), 'EventSource')
+
+    @override_settings(JOB_EVENTS_ENABLED=False)
+    def test_disabled_without_asgi(self):
+        self.client.force_login(make_user('seek'))
+        self.assertEqual(self.client.get(reverse('events')).status_code, 404)
+        self.assertNotContains(self.client.get(reverse('dashboard')), 'EventSource')
@@ -0,0 +1,158 @@
+"""Trending postings: application counts that decay exponentially with age.
+
+A posting's trend is the number of applications it received, each counted with weight
+2^(-age / JOB_TRENDING_HALF_LIFE_HOURS). Storing that directly would mean rewriting
+every score as time passes, so scores are kept relative to a fixed epoch instead
+(forward decay): an application at time t adds exp(rate * (t - base)) to the stored
+score, where rate = ln 2 / half-life and base is TrendingEpoch.base. The decayed count
+at time `now` is the stored score times exp(-rate * (now - base)). That factor is the
+same for every posting, so stored scores rank postings exactly like decayed ones, and
+the trending page reads the top N straight from the index on PostingTrend.score. The
+row also keeps a copy of the posting's visibility (`posting_visibility_changed`), so
+hidden postings keep their counts without ever being read.
+
+Recording an application is one UPDATE of one row plus an unlocked read of the epoch
+row, so applications never wait on each other. Nothing groups JobApplication.
+
+Stored scores grow by a factor of 2 every half-life, so `manage.py compact_trending`
+moves the base up to now and rescales every score by the same factor. It also drops
+postings whose decayed score has become negligible. Run it periodically (e.g. daily);
+scores only overflow after hundreds of half-lives without it.
+
+Compaction is the only writer that locks the epoch row. Each PostingTrend row records
+the base its score is relative to, and an increment is only added to a row still on
+the base it was computed for (UPDATE ... WHERE base = ?). An application that read the
+epoch just before a compaction therefore misses the re-based row and recomputes its
+increment for the row's new base. A row it creates on the old base is re-based right
+away, and any that slips past is re-based by the next compaction.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import JobApplication, JobPosting, PostingTrend, TrendingEpoch
+
+
+def decay_rate():
+    """Decay per second, from settings.JOB_TRENDING_HALF_LIFE_HOURS."""
+    return math.log(2) / (getattr(settings, 'JOB_TRENDING_HALF_LIFE_HOURS', 24) * 3600)
+
+
+def _epoch(lock=False):
+    epochs = TrendingEpoch.objects.select_for_update() if lock else TrendingEpoch.objects
+    epoch, _ = epochs.get_or_create(pk=1, defaults={'base': time.time()})
+    return epoch
+
+
+def record_application(posting_id, at=None):
+    """Add one application (at Unix time `at`, default now) to a posting's trend score."""
+    at = time.time() if at is None else at
+    rate = decay_rate()
+    base = _epoch().base
+    while True:
+        increment = math.exp(rate * (at - base))
+        if PostingTrend.objects.filter(posting_id=posting_id, base=base).update(score=F('score') + increment):
+            return
+        row_base = PostingTrend.objects.filter(posting_id=posting_id).values_list('base', flat=True).first()
+        if row_base is not None:
+            # Re-based by a compaction since the epoch was read: add on the row's base.
+            base = row_base
+            continue
+        try:
+            with transaction.atomic():
+                PostingTrend.objects.create(posting_id=posting_id, score=increment, base=base)
+        except IntegrityError:
+            # Created concurrently by another application to the same posting.
+            continue
+        _rebase_if_stale(posting_id, base)
+        return
+
+
+def _rebase_if_stale(posting_id, base):
+    """Move a row created on `base` to the current epoch if a compaction moved it."""
+    current = _epoch().base
+    if current != base:
+        PostingTrend.objects.filter(posting_id=posting_id, base=base).update(
+            score=F('score') * math.exp(-decay_rate() * (current - base)), base=current,
+        )
+
+
+def trending_postings(limit=None):
+    """The visible postings with the highest decayed application counts, best first.
+
+    Each posting gets a `trend_score` attribute: its decayed application count now.
+    """
+    limit = limit or getattr(settings, 'JOB_TRENDING_SIZE', 20)
+    epoch = _epoch()
+    factor = math.exp(-decay_rate() * (time.time() - epoch.base))
+    rows = (
+        PostingTrend.objects.filter(visible=True, score__gt=0)
+        .select_related('posting__recruiter')
+        .order_by('-score', '-posting_id')[:limit]
+    )
+    postings = []
+    for row in rows:
+        row.posting.trend_score = row.score * factor
+        postings.append(row.posting)
+    return postings
+
+
+def posting_visibility_changed(posting, visible):
+    PostingTrend.objects.filter(posting=posting).exclude(visible=visible).update(visible=visible)
+
+
+def compact(now=None, min_score=None):
+    """Move the epoch to `now`, rescaling every stored score, and drop negligible ones.
+
+    Returns (scores kept, scores removed).
+    """
+    now = time.time() if now is None else now
+    min_score = getattr(settings, 'JOB_TRENDING_MIN_SCORE', 0.01) if min_score is None else min_score
+    kept = removed = 0
+    with transaction.atomic():
+        epoch = _epoch(lock=True)
+        # Normally every row is on epoch.base; a row created during the previous
+        # compaction may still be on the base before it.
+        bases = list(PostingTrend.objects.order_by().values_list('base', flat=True).distinct())
+        for base in bases:
+            factor = math.exp(-decay_rate() * (now - base))
+            rows = PostingTrend.objects.filter(base=base)
+            removed += rows.filter(score__lt=min_score / factor).delete()[0]
+            kept += rows.update(score=F('score') * factor, base=now)
+        epoch.base = now
+        epoch.save(update_fields=['base', 'updated_at'])
+    return kept, removed
+
+
+def rebuild(now=None, batch_size=1000):
+    """Recompute every score from JobApplication, relative to a new epoch at `now`.
+
+    One pass over the applications; meant for the first run and for repairs.
+    Returns the number of postings with a score.
+    """
+    now = time.time() if now is None else now
+    rate = decay_rate()
+    scores = {}
+    applications = JobApplication.objects.values_list('job_id', 'created_at')
+    for job_id, created_at in applications.iterator(chunk_size=batch_size):
+        scores[job_id] = scores.get(job_id, 0.0) + math.exp(rate * (created_at.timestamp() - now))
+    visible = set(
+        JobPosting.objects.filter(id__in=list(scores), status='active', moderation_status='approved')
+        .values_list('id', flat=True)
+    )
+    with transaction.atomic():
+        epoch = _epoch(lock=True)
+        PostingTrend.objects.all().delete()
+        PostingTrend.objects.bulk_create(
+            [
+                PostingTrend(posting_id=pk, score=score, base=now, visible=pk in visible)
+                for pk, score in scores.items()
+            ],
+            batch_size=batch_size,
+        )
+        epoch.base = now
+        epoch.save(update_fields=['base', 'updated_at'])
+    return len(scores)
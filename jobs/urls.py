@@ -8,6 +8,13 @@ urlpatterns = [
     path('view_profile/', views.view_profile_view, name='view_profile'),
     path('recommendations/', views.recommended_jobs_view, name='recommendations'),
     path('job_search/', views.job_search_view, name='job_search'),
+    path('trending/', views.trending_jobs_view, name='trending_jobs'),
+    path('saved_searches/', views.saved_searches_view, name='saved_searches'),
+    path('saved_searches/save/', views.save_search_view, name='save_search'),
+    path('saved_searches/<int:pk>/delete/', views.delete_saved_search_view, name='delete_saved_search'),
+    path('alerts/', views.search_alerts_view, name='search_alerts'),
+    path('api/search/', views.api_search_view, name='api_search'),
+    path('api/autocomplete/', views.autocomplete_view, name='autocomplete'),
     path('postings/<int:pk>/apply/', views.apply_to_posting_view, name='apply_to_posting'),
 
     # Recruiter routes
@@ -22,8 +29,13 @@ urlpatterns = [
 
     # Messaging
     path('messages/inbox/', views.inbox_view, name='inbox'),
+    path('messages/inbox/mark_all_read/', views.mark_all_read_view, name='mark_all_read'),
+    path('messages/events/', views.events_view, name='events'),
+    path('messages/search/', views.message_search_view, name='message_search'),
     path('messages/compose/', views.compose_message_view, name='compose_message'),
     path('messages/<int:pk>/', views.message_detail_view, name='message_detail'),
+    path('messages/threads/', views.threads_view, name='threads'),
+    path('messages/threads/<int:pk>/', views.thread_detail_view, name='thread_detail'),
 
     # Privacy settings for job seekers
     path('privacy_settings/', views.privacy_settings_view, name='privacy_settings'),
@@ -34,6 +46,7 @@ urlpatterns = [
     path('admin/moderate/<int:job_id>/', admin_views.moderate_job_view, name='moderate_job'),
     path('admin/export/', admin_views.export_data_view, name='export_data'),
     path('admin/bulk-moderation/', admin_views.bulk_moderation_view, name='bulk_moderation'),
+    path('admin/search-cache/', admin_views.search_cache_stats_view, name='search_cache_stats'),
 
     # Optionally, make dashboard the root
     path('', views.dashboard_view, name='home'),  
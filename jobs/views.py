@@ -1,15 +1,38 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .models import JobSeekerProfile, JobPosting, JobApplication
+from .models import JobSeekerProfile, JobPosting, JobApplication, Skill
 from .forms import JobSeekerProfileForm, PrivacySettingsForm
-from .forms import JobPostingForm, MessageForm
-from .models import Message
-from django.http import HttpResponseForbidden, HttpResponseRedirect
+from .forms import BulkMessageForm, JobPostingForm, MessageForm
+from .models import Message, SavedSearch, SearchAlert, Thread
+from .skills import parse_skills, get_skill_ids
+from .fuzzy import correct_skills
+from .search import search_page, iter_postings, parse_api_fields
+from .cache import cached_search_page
+from .autocomplete import FIELDS as AUTOCOMPLETE_FIELDS, get_autocomplete
+from .pagination import clamp_page_size, keyset_page
+from .recommendations import candidate_page, recommendation_page, scoring_mode, skill_weights
+from .candidates import coverage_pct
+from .similar import similar_postings
+from .trending import record_application, trending_postings
+from .alerts import clean_params, mark_alerts_read, percolate
+from .messaging import (
+    bulk_send, mark_all_read, message_read, posting_conversation, search_messages, send_message, thread_read,
+    threads_for, unread_count,
+)
+from .events import stream as event_stream
+from .embeddings import get_job_index, get_profile_index, semantic_candidate_page, semantic_job_page
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseForbidden, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
 from django import forms
+from django.conf import settings
 from django.urls import reverse
+from asgiref.sync import sync_to_async
+from django.utils.http import urlencode
 
 
 def recruiter_required(view_func):
@@ -91,7 +114,7 @@ def view_profile_view(request):
 def recommended_jobs_view(request):
     """
     Recommend active, approved jobs based on overlap between a job seeker's skills
-    and a job's required_skills. Uses simple case-insensitive token overlap.
+    and a job's required_skills. Scores are precomputed into JobRecommendation.
     """
     if getattr(request.user, 'user_type', None) != 'job_seeker':
         messages.error(request, 'Only job seekers receive recommendations.')
@@ -103,74 +126,222 @@ def recommended_jobs_view(request):
         messages.info(request, 'Create your profile to get recommendations.')
         return redirect('create_profile')
 
-    # Normalize skills from profile
-    raw_skills = profile.skills or ''
-    profile_skills = [s.strip().lower() for s in raw_skills.split(',') if s.strip()]
-    profile_skill_set = set(profile_skills)
-
-    jobs_qs = JobPosting.objects.filter(status='active', moderation_status='approved')
-
-    # Score jobs by number of overlapping skills; include jobs with at least one match
-    scored = []
-    for job in jobs_qs:
-        job_skills = [s.strip().lower() for s in (job.required_skills or '').split(',') if s.strip()]
-        overlap = profile_skill_set.intersection(job_skills)
-        score = len(overlap)
-        if score > 0 or not profile_skill_set:
-            scored.append((score, overlap, job))
-
-    # Sort by score desc, then recency via created_at which is desc in Meta ordering
-    scored.sort(key=lambda t: t[0], reverse=True)
-
-    # Take top N
-    top = scored[:25]
-    recommendations = [job for _, __, job in top]
+    # Stored top-N first (kept current by jobs/recommendations.py), then a live
+    # ranking in the database; only the requested page is loaded.
+    cursor = request.GET.get('cursor')
+    page_size = getattr(settings, 'JOB_RECOMMENDATIONS_PAGE_SIZE', 25)
+    # In 'semantic' mode rank by profile text instead (needs NumPy for the index).
+    index = get_job_index() if scoring_mode('recommended_jobs') == 'semantic' else None
+    if index is not None:
+        ranked, next_cursor = semantic_job_page(profile, index, cursor, page_size)
+    else:
+        ranked, next_cursor = recommendation_page(profile, cursor, page_size)
+    jobs = JobPosting.objects.select_related('recruiter').in_bulk([job_id for job_id, _ in ranked])
+    recommendations = []
+    for job_id, score in ranked:
+        if job_id in jobs:
+            jobs[job_id].score = score
+            recommendations.append(jobs[job_id])
 
     context = {
         'profile': profile,
         'recommendations': recommendations,
-        'profile_skills': profile_skills,
+        'profile_skills': parse_skills(profile.skills),
+        'semantic': index is not None,
+        'next_cursor': next_cursor,
+        'is_first_page': not cursor,
     }
     return render(request, 'jobs/recommendations.html', context)
 
 
+# -------------------------
+# TRENDING JOBS VIEW
+# -------------------------
+@login_required
+def trending_jobs_view(request):
+    """Visible postings with the most recent applications (decayed counts, see jobs/trending.py)."""
+    return render(request, 'jobs/trending.html', {'jobs': trending_postings()})
+
+
 # -------------------------
 # JOB SEARCH VIEW
 # -------------------------
+def _search_query(params, **changes):
+    """Query string for the search page with `changes` applied, starting from page one."""
+    query = params.copy()
+    query.pop('cursor', None)
+    for key, value in changes.items():
+        query[key] = value
+    return query.urlencode()
+
+
 def job_search_view(request):
-    jobs = JobPosting.objects.filter(status='active', moderation_status='approved')
-    
-    # Apply filters from GET parameters
-    title = request.GET.get('title', '')
-    location = request.GET.get('location', '')
-    skills = request.GET.get('skills', '')
-    salary_min = request.GET.get('salary_min', '')
-    is_remote = request.GET.get('is_remote', '')
-    visa_sponsorship = request.GET.get('visa_sponsorship', '')
-    
-    if title:
-        jobs = jobs.filter(title__icontains=title)
-    if location:
-        jobs = jobs.filter(location__icontains=location)
-    if skills:
-        jobs = jobs.filter(required_skills__icontains=skills)
-    if salary_min:
-        try:
-            jobs = jobs.filter(salary_min__gte=int(salary_min))
-        except ValueError:
-            pass
-    if is_remote == 'true':
-        jobs = jobs.filter(is_remote=True)
-    if visa_sponsorship == 'true':
-        jobs = jobs.filter(visa_sponsorship=True)
-    
+    page = cached_search_page(request.GET, search_page)
+
+    next_query = None
+    if page['next_cursor']:
+        next_query = _search_query(request.GET, cursor=page['next_cursor'])
+
+    # Each facet links to the current search narrowed by that facet
+    facets = page['facets']
+    facet_links = {
+        'is_remote': _search_query(request.GET, is_remote='true'),
+        'visa_sponsorship': _search_query(request.GET, visa_sponsorship='true'),
+        'locations': [
+            dict(entry, query=_search_query(request.GET, location=entry['location']))
+            for entry in facets['locations']
+        ],
+    }
+
+    # Coordinates are resolved on save, so the map needs no per-card lookups.
+    map_points = [
+        {
+            'id': job.pk,
+            'title': job.title,
+            'location': job.location,
+            'url': reverse('apply_to_posting', args=[job.pk]),
+            'lat': job.latitude,
+            'lng': job.longitude,
+        }
+        for job in page['jobs']
+        if job.latitude is not None and job.longitude is not None
+    ]
+
     context = {
-        'jobs': jobs,
+        'jobs': page['jobs'],
+        'map_points': map_points,
+        'facets': facets,
+        'facet_links': facet_links,
+        'corrections': page['corrections'],
+        'total': page['total'],
+        'total_capped': page['total_capped'],
+        'next_query': next_query,
+        'is_first_page': not request.GET.get('cursor'),
         'search_params': request.GET,
+        'saved_search_params': clean_params(request.GET),
     }
     return render(request, 'jobs/job_search.html', context)
 
 
+# -------------------------
+# SAVED SEARCHES & ALERTS
+# -------------------------
+@login_required
+def save_search_view(request):
+    """Store the search in the POSTed form fields; new matches show up under Alerts."""
+    if request.method != 'POST' or getattr(request.user, 'user_type', None) != 'job_seeker':
+        return redirect('job_search')
+    params = clean_params(request.POST)
+    if not params:
+        messages.error(request, 'Add a keyword or filter before saving a search.')
+        return redirect('job_search')
+    name = request.POST.get('name', '').strip()[:100]
+    # Indexed for alerts by the post_save signal.
+    SavedSearch.objects.create(user=request.user, name=name, params=params)
+    messages.success(request, 'Search saved. New matching jobs will appear under Alerts.')
+    return redirect('saved_searches')
+
+
+@login_required
+def saved_searches_view(request):
+    searches = list(SavedSearch.objects.filter(user=request.user))
+    for search in searches:
+        search.query = urlencode(search.params)
+    return render(request, 'jobs/saved_searches.html', {'searches': searches})
+
+
+@login_required
+def delete_saved_search_view(request, pk):
+    search = get_object_or_404(SavedSearch, pk=pk, user=request.user)
+    if request.method == 'POST':
+        search.delete()
+        messages.success(request, 'Saved search deleted.')
+    return redirect('saved_searches')
+
+
+@login_required
+def search_alerts_view(request):
+    """The user's alert feed, newest first; opening it marks every alert read."""
+    alerts = SearchAlert.objects.filter(user=request.user).select_related('posting__recruiter', 'search')
+    cursor = request.GET.get('cursor')
+    rows, next_cursor = keyset_page(alerts, cursor, getattr(settings, 'JOB_ALERTS_PAGE_SIZE', 25))
+    if not cursor:
+        mark_alerts_read(request.user)
+    context = {
+        'alerts': rows,
+        'next_cursor': next_cursor,
+        'is_first_page': not cursor,
+    }
+    return render(request, 'jobs/search_alerts.html', context)
+
+
+# -------------------------
+# JSON SEARCH API
+# -------------------------
+API_STREAM_BATCH = 500
+
+
+def _stream_ndjson(rows):
+    encoder = DjangoJSONEncoder()
+    batch = []
+    for row in rows:
+        batch.append(encoder.encode(row))
+        if len(batch) >= API_STREAM_BATCH:
+            yield '\n'.join(batch) + '\n'
+            batch = []
+    if batch:
+        yield '\n'.join(batch) + '\n'
+
+
+def _stream_json_array(rows):
+    encoder = DjangoJSONEncoder()
+    yield '['
+    separator = ''
+    batch = []
+    for row in rows:
+        batch.append(encoder.encode(row))
+        if len(batch) >= API_STREAM_BATCH:
+            yield separator + ','.join(batch)
+            separator = ','
+            batch = []
+    if batch:
+        yield separator + ','.join(batch)
+    yield ']'
+
+
+def api_search_view(request):
+    """Machine-readable job search.
+
+    Accepts the same filters as job_search_view plus `fields=` (comma-separated
+    projection) and `format=ndjson|json`, and streams every matching posting.
+    """
+    fields, unknown = parse_api_fields(request.GET)
+    if unknown:
+        return JsonResponse({'error': f"Unknown field(s): {', '.join(unknown)}"}, status=400)
+
+    output = request.GET.get('format', 'ndjson')
+    if output not in ('ndjson', 'json'):
+        return JsonResponse({'error': 'format must be "ndjson" or "json".'}, status=400)
+
+    rows = iter_postings(request.GET, fields)
+    if output == 'ndjson':
+        return StreamingHttpResponse(_stream_ndjson(rows), content_type='application/x-ndjson')
+    return StreamingHttpResponse(_stream_json_array(rows), content_type='application/json')
+
+
+def autocomplete_view(request):
+    """Prefix suggestions for the search form, answered from the in-memory index."""
+    field = request.GET.get('field', 'skills')
+    if field not in AUTOCOMPLETE_FIELDS:
+        return JsonResponse({'error': 'field must be "skills" or "locations".'}, status=400)
+    limit = clamp_page_size(request.GET.get('limit'), 10, 25)
+    results = get_autocomplete().complete(field, request.GET.get('q', ''), limit)
+    return JsonResponse({
+        'field': field,
+        'results': [{'value': value, 'count': count} for value, count in results],
+    })
+
+
 class ApplyForm(forms.Form):
     cover_letter = forms.CharField(
         widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 6, 'placeholder': 'Optional cover letter'}),
@@ -195,17 +366,28 @@ def apply_to_posting_view(request, pk):
     if request.method == 'POST':
         form = ApplyForm(request.POST)
         if form.is_valid():
-            JobApplication.objects.create(
-                job=posting,
-                applicant=request.user,
-                cover_letter=form.cleaned_data.get('cover_letter', '')
-            )
+            try:
+                with transaction.atomic():
+                    JobApplication.objects.create(
+                        job=posting,
+                        applicant=request.user,
+                        cover_letter=form.cleaned_data.get('cover_letter', '')
+                    )
+                    record_application(posting.pk)
+            except IntegrityError:
+                # A concurrent submit got there first (unique job/applicant constraint)
+                messages.info(request, 'You have already applied to this job.')
+                return redirect('job_search')
             messages.success(request, 'Application submitted successfully.')
             return HttpResponseRedirect(reverse('job_search'))
     else:
         form = ApplyForm()
 
-    return render(request, 'jobs/apply.html', {'posting': posting, 'form': form})
+    return render(request, 'jobs/apply.html', {
+        'posting': posting,
+        'form': form,
+        'similar_postings': similar_postings(posting),
+    })
 
 
 # -------------------------
@@ -224,61 +406,93 @@ def posting_applicants_view(request, pk):
     posting = get_object_or_404(JobPosting, pk=pk)
     if posting.recruiter != request.user:
         return HttpResponseForbidden('You do not have permission to view applicants for this posting.')
+
+    if request.method == 'POST':
+        bulk_form = BulkMessageForm(request.POST)
+        if bulk_form.is_valid():
+            sent, skipped = bulk_send(
+                request.user, posting, bulk_form.cleaned_data['subject'], bulk_form.cleaned_data['body'],
+            )
+            note = f'Message sent to {sent} applicant{"s" if sent != 1 else ""}.'
+            if skipped:
+                note += f' {skipped} skipped because they have disabled direct contact.'
+            messages.success(request, note)
+            return redirect('posting_applicants', pk=posting.pk)
+    else:
+        bulk_form = BulkMessageForm()
+
     applications = JobApplication.objects.filter(job=posting).select_related('applicant')
-    return render(request, 'jobs/applicants_list.html', {'posting': posting, 'applications': applications})
+    return render(request, 'jobs/applicants_list.html', {
+        'posting': posting, 'applications': applications, 'bulk_form': bulk_form,
+    })
 
 
 @login_required
 @recruiter_required
 def posting_recommendations_view(request, pk):
-    """Recommend job seeker profiles for a specific posting based on skill overlap."""
+    """Recommend job seeker profiles for a specific posting based on skill overlap
+    (optionally weighted by skill rarity, see JOB_RECOMMENDATION_SCORING)."""
     posting = get_object_or_404(JobPosting, pk=pk)
     if posting.recruiter != request.user:
         return HttpResponseForbidden('You do not have permission to view recommendations for this posting.')
 
-    # Normalize required skills for the job
-    job_skill_set = set(
-        s.strip().lower()
-        for s in (posting.required_skills or '').split(',')
-        if s.strip()
+    job_skills = dict(posting.skill_tags.values_list('id', 'name'))
+    # Likely-misspelled job skills also match candidates with the corrected skill
+    corrected = correct_skills(get_autocomplete(), job_skills.values())
+    skill_names = dict(job_skills)
+    skill_names.update(
+        (skill_id, name) for name, skill_id in get_skill_ids(corrected.values(), create=False).items()
     )
-
-    # Exclude people who already applied to this posting
-    applied_ids = JobApplication.objects.filter(job=posting).values_list('applicant_id', flat=True)
-
-    profiles = JobSeekerProfile.objects.filter(profile_visible=True).exclude(user_id__in=applied_ids)
-
+    weights = skill_weights(skill_names, scoring_mode('posting_recommendations'))
+    # Coverage is the share of the posting's own skill weight a candidate matches.
+    total_weight = sum(weights.get(skill_id, 0) for skill_id in job_skills)
+
+    cursor = request.GET.get('cursor')
+    page_size = getattr(settings, 'JOB_CANDIDATES_PAGE_SIZE', 25)
+    profiles = JobSeekerProfile.objects.select_related('user')
+    index = get_profile_index() if scoring_mode('posting_recommendations') == 'semantic' else None
+    if index is not None or job_skills:
+        # Rank, exclude applicants/hidden profiles and cut the page in one pass; then
+        # load just that page with the skills it matched.
+        if index is not None:
+            # Ranked by text similarity; the badge then shows the similarity itself.
+            ranked, next_cursor = semantic_candidate_page(posting, index, cursor, page_size)
+            total_weight = 1.0
+        else:
+            ranked, next_cursor = candidate_page(posting, weights, cursor, page_size)
+        page = profiles.prefetch_related(Prefetch(
+            'skill_tags',
+            queryset=Skill.objects.filter(id__in=weights),
+            to_attr='matched_skills',
+        )).in_bulk([pk for pk, _ in ranked])
+        ranked = [(page[pk], score) for pk, score in ranked if pk in page]
+    else:
+        # Nothing to score on: most recently updated visible candidates first.
+        applied_ids = JobApplication.objects.filter(job=posting).values_list('applicant_id', flat=True)
+        rows, next_cursor = keyset_page(
+            profiles.filter(profile_visible=True).exclude(user_id__in=applied_ids),
+            cursor, page_size, field='updated_at',
+        )
+        ranked = [(profile, 0) for profile in rows]
+
+    coverage = coverage_pct([score for _, score in ranked], total_weight)
     recommendations = []
-    for profile in profiles:
-        seeker_skills = [
-            s.strip().lower() for s in (profile.skills or '').split(',') if s.strip()
-        ]
-        overlap = job_skill_set.intersection(seeker_skills) if job_skill_set else set()
-        score = len(overlap)
-
-        # If the job lists skills, keep only profiles with at least one match
-        if job_skill_set and score == 0:
-            continue
-
-        coverage_pct = 0
-        if job_skill_set:
-            coverage_pct = round((score / len(job_skill_set)) * 100)
-
+    for (profile, score), coverage_value in zip(ranked, coverage):
         recommendations.append({
             'profile': profile,
-            'overlap': sorted(overlap),
+            'overlap': sorted(skill.name for skill in getattr(profile, 'matched_skills', [])),
             'score': score,
-            'coverage_pct': coverage_pct,
-            'allow_contact': getattr(profile, 'allow_contact', True),
+            'coverage_pct': int(coverage_value),
+            'allow_contact': profile.allow_contact,
         })
 
-    # Sort by score desc, then coverage, then most recently updated profile
-    recommendations.sort(key=lambda r: (r['score'], r['coverage_pct'], r['profile'].updated_at), reverse=True)
-
     context = {
         'posting': posting,
         'recommendations': recommendations,
-        'job_skill_set': sorted(job_skill_set),
+        'job_skill_set': sorted(job_skills.values()),
+        'semantic': index is not None,
+        'next_cursor': next_cursor,
+        'is_first_page': not cursor,
     }
     return render(request, 'jobs/posting_recommendations.html', context)
 
@@ -298,13 +512,15 @@ def conversation_view(request, posting_pk, applicant_pk):
         messages.error(request, 'That user has not applied to this posting.')
         return redirect('posting_applicants', pk=posting.pk)
 
-    # Fetch messages between recruiter (request.user) and applicant
-    convo = Message.objects.filter(
-        (Q(sender=request.user) & Q(recipient=applicant)) |
-        (Q(sender=applicant) & Q(recipient=request.user))
-    ).order_by('created_at')
+    # The posting's thread and the pair's general thread: one index range read each.
+    thread, threads = posting_conversation(request.user.pk, applicant.pk, posting.pk)
+    for each in threads:
+        thread_read(each, request.user)
+    convo = Message.objects.filter(thread__in=threads).select_related('sender').order_by('created_at', 'id')
 
-    return render(request, 'jobs/conversation.html', {'posting': posting, 'applicant': applicant, 'messages': convo})
+    return render(request, 'jobs/conversation.html', {
+        'posting': posting, 'applicant': applicant, 'thread': thread, 'conversation': convo,
+    })
 
 
 # -------------------------
@@ -329,6 +545,7 @@ def create_posting_view(request):
             except Exception:
                 pass
             posting.save()
+            percolate(posting)
             messages.success(request, 'Job posting created successfully.')
             return redirect('my_postings')
     else:
@@ -362,8 +579,66 @@ def edit_posting_view(request, pk):
 # -------------------------
 @login_required
 def inbox_view(request):
-    messages_qs = Message.objects.filter(recipient=request.user)
-    return render(request, 'jobs/messages/inbox.html', {'messages': messages_qs})
+    """Received messages, newest first, one keyset page at a time with their senders."""
+    inbox = Message.objects.filter(recipient=request.user).select_related('sender')
+    cursor = request.GET.get('cursor')
+    rows, next_cursor = keyset_page(inbox, cursor, getattr(settings, 'JOB_INBOX_PAGE_SIZE', 25))
+    context = {
+        'inbox_messages': rows,
+        'next_cursor': next_cursor,
+        'is_first_page': not cursor,
+    }
+    # The unread count comes from the unread_messages context processor.
+    return render(request, 'jobs/messages/inbox.html', context)
+
+
+async def events_view(request):
+    """Server-sent events for the signed-in user: unread count and new messages.
+
+    Async so that open connections are coroutines, not threads; see jobs/events.py.
+    Only served when JOB_EVENTS_ENABLED and running under ASGI.
+    """
+    if not getattr(settings, 'JOB_EVENTS_ENABLED', False):
+        raise Http404
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI the stream would hold a worker; 204 stops EventSource reconnecting.
+        return HttpResponse(status=204)
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+    count = await sync_to_async(unread_count)(user)
+    response = StreamingHttpResponse(
+        event_stream(user.pk, initial=[{'kind': 'unread', 'data': {'count': count}}]),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop proxies such as nginx from buffering the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@login_required
+def message_search_view(request):
+    """Full-text search over the messages the user sent or received, best match first."""
+    q = request.GET.get('q', '').strip()
+    cursor = request.GET.get('cursor')
+    page_size = getattr(settings, 'JOB_MESSAGE_SEARCH_PAGE_SIZE', 20)
+    results, next_cursor = search_messages(request.user, q, cursor, page_size) if q else ([], None)
+    context = {
+        'q': q,
+        'results': results,
+        'next_cursor': next_cursor,
+        'is_first_page': not cursor,
+    }
+    return render(request, 'jobs/messages/search.html', context)
+
+
+@login_required
+def mark_all_read_view(request):
+    if request.method == 'POST':
+        count = mark_all_read(request.user)
+        messages.success(request, f'Marked {count} message{"s" if count != 1 else ""} as read.')
+    return redirect('inbox')
 
 
 @login_required
@@ -371,12 +646,61 @@ def message_detail_view(request, pk):
     msg = get_object_or_404(Message, pk=pk)
     if msg.recipient != request.user and msg.sender != request.user:
         return HttpResponseForbidden('You do not have permission to view this message.')
-    if msg.recipient == request.user and not msg.is_read:
-        msg.is_read = True
-        msg.save(update_fields=['is_read'])
+    if msg.recipient == request.user:
+        message_read(msg)
     return render(request, 'jobs/messages/detail.html', {'message': msg})
 
 
+def _contact_blocked(sender, recipient):
+    """Whether a recruiter may not message this job seeker (allow_contact is off)."""
+    if getattr(sender, 'user_type', None) != 'recruiter':
+        return False
+    return JobSeekerProfile.objects.filter(user=recipient, allow_contact=False).exists()
+
+
+@login_required
+def threads_view(request):
+    """The user's conversations, most recent first; reads only Thread rows."""
+    cursor = request.GET.get('cursor')
+    page_size = getattr(settings, 'JOB_THREADS_PAGE_SIZE', 25)
+    threads, next_cursor = keyset_page(threads_for(request.user), cursor, page_size, field='last_message_at')
+    for thread in threads:
+        thread.other = thread.other_participant(request.user)
+        thread.unread = thread.unread_for(request.user)
+    return render(request, 'jobs/messages/threads.html', {
+        'threads': threads,
+        'next_cursor': next_cursor,
+        'is_first_page': not cursor,
+    })
+
+
+@login_required
+def thread_detail_view(request, pk):
+    thread = get_object_or_404(Thread.objects.select_related('user_low', 'user_high', 'posting'), pk=pk)
+    if request.user.pk not in (thread.user_low_id, thread.user_high_id):
+        return HttpResponseForbidden('You do not have permission to view this conversation.')
+    other = thread.other_participant(request.user)
+
+    if request.method == 'POST':
+        body = request.POST.get('body', '').strip()
+        if not body:
+            messages.error(request, 'Write a message first.')
+        elif _contact_blocked(request.user, other):
+            messages.error(request, 'This candidate has disabled direct contact.')
+        else:
+            last = thread.messages.order_by('-created_at', '-id').first()
+            subject = last.subject if last else ''
+            if subject and not subject.startswith('Re: '):
+                subject = f"Re: {subject}"
+            send_message(Message(sender=request.user, recipient=other, subject=subject[:255], body=body, reply_to=last))
+            messages.success(request, 'Message sent.')
+        return redirect('thread_detail', pk=thread.pk)
+
+    thread_read(thread, request.user)
+    convo = thread.messages.select_related('sender').order_by('created_at', 'id')
+    return render(request, 'jobs/messages/thread.html', {'thread': thread, 'other': other, 'conversation': convo})
+
+
 @login_required
 def compose_message_view(request):
     # Allow any authenticated user to compose messages. Job seekers may ONLY reply
@@ -384,6 +708,10 @@ def compose_message_view(request):
     # initiate new conversations to arbitrary recruiters.
     recipient_prefill = request.GET.get('recipient')
     reply_to = request.GET.get('reply_to')
+    # Messages about one of the recruiter's postings go to that posting's thread.
+    posting = None
+    if request.GET.get('posting', '').isdigit():
+        posting = JobPosting.objects.filter(pk=int(request.GET['posting']), recruiter=request.user).first()
     orig_msg = None
     if reply_to:
         try:
@@ -417,9 +745,10 @@ def compose_message_view(request):
             except JobSeekerProfile.DoesNotExist:
                 pass
 
-            m.save()
+            m.reply_to = orig_msg
+            send_message(m, posting=posting)
             messages.success(request, 'Message sent.')
-            return redirect('inbox')
+            return redirect('thread_detail', pk=m.thread_id)
     else:
         initial = {}
         preset_recipient = None